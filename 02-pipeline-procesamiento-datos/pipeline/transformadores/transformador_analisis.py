@@ -2,19 +2,374 @@
 Transformador de Análisis - Pipeline ETL
 Transformador para análisis estadístico y feature engineering
 """
+import asyncio
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple, Union
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 import structlog
-from sklearn.preprocessing import StandardScaler, MinMaxScaler, LabelEncoder
+from sklearn.preprocessing import StandardScaler, MinMaxScaler
 from sklearn.feature_selection import SelectKBest, f_regression, f_classif
-from sklearn.decomposition import PCA
-from sklearn.cluster import KMeans
+from sklearn.decomposition import PCA, IncrementalPCA
+from sklearn.cluster import KMeans, MiniBatchKMeans
 
-from .transformador_base import TransformadorBase
+from .transformador_base import TransformadorBase, _combinar_configuracion
 from ..excepciones.excepciones_pipeline import ErrorTransformacion, ErrorConfiguracion
 
+try:
+    from numba import njit
+    NUMBA_DISPONIBLE = True
+except ImportError:  # Numba es opcional: sin él se usan los cálculos NumPy
+    NUMBA_DISPONIBLE = False
+
+
+# Filas a partir de las cuales el clustering usa MiniBatchKMeans
+_UMBRAL_MINIBATCH = 10_000
+
+# Magnitud a partir de la cual la varianza NumPy vuelve a la fórmula de dos
+# pasadas para evitar cancelación catastrófica
+_UMBRAL_VARIANZA_UNA_PASADA = 1e6
+
+# fastmath sin 'nnan'/'ninf': los kernels necesitan detectar NaN de forma fiable
+_FASTMATH_SEGURO = {'reassoc', 'contract', 'arcp', 'nsz'}
+
+
+if NUMBA_DISPONIBLE:
+    # nogil permite que los kernels corran en paralelo desde el ThreadPoolExecutor
+    # del feature engineering sin depender de la capa de hilos de Numba
+    @njit(nogil=True, cache=True, fastmath=_FASTMATH_SEGURO)
+    def _kernel_estadisticas_fila(arr):
+        n, n_cols = arr.shape
+        suma = np.zeros(n)
+        media = np.full(n, np.nan)
+        std = np.full(n, np.nan)
+        minimo = np.full(n, np.nan)
+        maximo = np.full(n, np.nan)
+        
+        for i in range(n):
+            acumulado = 0.0
+            conteo = 0
+            menor = np.inf
+            mayor = -np.inf
+            # Welford: media y suma de cuadrados de desviaciones en una pasada
+            promedio = 0.0
+            m2 = 0.0
+            for j in range(n_cols):
+                x = arr[i, j]
+                if not np.isnan(x):
+                    acumulado += x
+                    conteo += 1
+                    delta = x - promedio
+                    promedio += delta / conteo
+                    m2 += delta * (x - promedio)
+                    if x < menor:
+                        menor = x
+                    if x > mayor:
+                        mayor = x
+            
+            suma[i] = acumulado
+            if conteo == 0:
+                continue
+            
+            media[i] = acumulado / conteo
+            minimo[i] = menor
+            maximo[i] = mayor
+            if conteo > 1:
+                std[i] = np.sqrt(m2 / (conteo - 1))
+        
+        return suma, media, std, minimo, maximo
+    
+    @njit(nogil=True, cache=True, fastmath=_FASTMATH_SEGURO)
+    def _kernel_interacciones(arr):
+        n, n_cols = arr.shape
+        salida = np.empty((n, n_cols * (n_cols - 1) // 2))
+        
+        for i in range(n):
+            k = 0
+            for a in range(n_cols):
+                for b in range(a + 1, n_cols):
+                    salida[i, k] = arr[i, a] * arr[i, b]
+                    k += 1
+        
+        return salida
+
+
+def _calcular_polinomios(arr: np.ndarray, grado: int) -> np.ndarray:
+    """
+    Calcular potencias 2..grado de un bloque numérico
+
+    Args:
+        arr: Matriz (n, N) de valores float64
+        grado: Grado máximo del polinomio
+
+    Returns:
+        Matriz (n, N * (grado - 1)) con las potencias de cada columna contiguas
+    """
+    n, n_cols = arr.shape
+    n_potencias = grado - 1
+    salida = np.empty((n, n_cols * n_potencias), dtype=np.float64)
+
+    # Multiplicación incremental: cada potencia reutiliza la anterior
+    actual = arr.copy()
+    for k in range(n_potencias):
+        actual *= arr
+        salida[:, k::n_potencias] = actual
+
+    return salida
+
+
+def _crear_columnas_polinomios(
+    arr: np.ndarray,
+    columnas: List[str],
+    grado: int
+) -> Dict[str, np.ndarray]:
+    """Crear columnas {col}_grado_{g} a partir del bloque numérico"""
+    polinomios = _calcular_polinomios(arr, grado)
+    nombres = [f"{col}_grado_{g}" for col in columnas for g in range(2, grado + 1)]
+    return {nombre: polinomios[:, i] for i, nombre in enumerate(nombres)}
+
+
+def _calcular_interacciones(arr: np.ndarray, columnas: List[str]) -> Dict[str, np.ndarray]:
+    """
+    Calcular el producto de cada par de columnas numéricas
+
+    Args:
+        arr: Matriz (n, N) de valores float64
+        columnas: Nombres de las N columnas
+
+    Returns:
+        Diccionario {col1}_x_{col2} -> array de longitud n
+    """
+    if NUMBA_DISPONIBLE:
+        productos = _kernel_interacciones(arr)
+        nombres = [
+            f"{col1}_x_{columnas[j]}"
+            for i, col1 in enumerate(columnas)
+            for j in range(i + 1, len(columnas))
+        ]
+        return {nombre: productos[:, k] for k, nombre in enumerate(nombres)}
+    
+    interacciones = {}
+    for i, col1 in enumerate(columnas):
+        for j in range(i + 1, len(columnas)):
+            interacciones[f"{col1}_x_{columnas[j]}"] = arr[:, i] * arr[:, j]
+    return interacciones
+
+
+def _codificar_categoricas(
+    df: pd.DataFrame,
+    columnas: List[str]
+) -> Tuple[Dict[str, np.ndarray], Dict[str, pd.Index]]:
+    """
+    Codificar columnas categóricas como enteros
+
+    Args:
+        df: DataFrame con las columnas a codificar, ya con dtype category
+        columnas: Columnas categóricas
+
+    Returns:
+        Tupla (columnas {col}_encoded, categorías por columna para la
+        transformación inversa)
+    """
+    codificadas = {}
+    valores_unicos = {}
+    for col in columnas:
+        categorica = df[col].cat
+        codificadas[f"{col}_encoded"] = categorica.codes.to_numpy().astype(np.int32, copy=False)
+        valores_unicos[col] = categorica.categories
+    return codificadas, valores_unicos
+
+
+def _calcular_estadisticas_fila(arr: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Calcular suma, media, desviación estándar, mínimo y máximo por fila
+
+    Ignora valores NaN igual que las reducciones de pandas (skipna=True).
+
+    Args:
+        arr: Matriz (n, N) de valores float64
+
+    Returns:
+        Diccionario columna_salida -> array de longitud n
+    """
+    n, n_cols = arr.shape
+    if n_cols == 0:
+        return {
+            'suma_numerica': np.zeros(n),
+            'media_numerica': np.full(n, np.nan),
+            'std_numerica': np.full(n, np.nan),
+            'min_numerica': np.full(n, np.nan),
+            'max_numerica': np.full(n, np.nan)
+        }
+
+    if NUMBA_DISPONIBLE:
+        suma, media, std, minimo, maximo = _kernel_estadisticas_fila(arr)
+        return {
+            'suma_numerica': suma,
+            'media_numerica': media,
+            'std_numerica': std,
+            'min_numerica': minimo,
+            'max_numerica': maximo
+        }
+
+    validos = ~np.isnan(arr)
+    rellenos = np.where(validos, arr, 0.0)
+    conteo = validos.sum(axis=1)
+    suma = rellenos.sum(axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media = suma / conteo
+        if max(rellenos.max(), -rellenos.min()) > _UMBRAL_VARIANZA_UNA_PASADA:
+            # Con magnitudes grandes la fórmula de una pasada pierde precisión
+            desviaciones = np.where(validos, arr - media[:, None], 0.0)
+            suma_cuadrados = (desviaciones * desviaciones).sum(axis=1)
+        else:
+            # Una pasada: var = (Σx² - (Σx)²/n) / (n - 1), sin matriz de desviaciones
+            suma_cuadrados = np.einsum('ij,ij->i', rellenos, rellenos) - suma * suma / conteo
+        varianza = np.maximum(suma_cuadrados, 0.0) / (conteo - 1)
+    varianza[conteo < 2] = np.nan
+
+    return {
+        'suma_numerica': suma,
+        'media_numerica': media,
+        'std_numerica': np.sqrt(varianza),
+        # fmin/fmax ignoran NaN salvo que toda la fila sea NaN
+        'min_numerica': np.fmin.reduce(arr, axis=1),
+        'max_numerica': np.fmax.reduce(arr, axis=1)
+    }
+
+
+def _desplazar_bloque(arr: np.ndarray, lag: int) -> np.ndarray:
+    """
+    Desplazar todas las columnas de un bloque, equivalente a DataFrame.shift(lag)
+
+    Args:
+        arr: Matriz (n, N) de valores float64
+        lag: Número de filas a desplazar (negativo = adelantar)
+
+    Returns:
+        Nueva matriz (n, N) con NaN en las posiciones sin valor previo
+    """
+    desplazado = np.empty_like(arr)
+    n = arr.shape[0]
+    if lag >= n or -lag >= n:
+        desplazado[:] = np.nan
+    elif lag > 0:
+        desplazado[:lag] = np.nan
+        desplazado[lag:] = arr[:-lag]
+    elif lag < 0:
+        desplazado[lag:] = np.nan
+        desplazado[:lag] = arr[-lag:]
+    else:
+        desplazado[:] = arr
+    return desplazado
+
+
+def _crear_scaler(metodo: str):
+    """Crear el scaler de sklearn correspondiente al método de normalización"""
+    if metodo == "standard":
+        return StandardScaler()
+    if metodo == "minmax":
+        return MinMaxScaler()
+    from sklearn.preprocessing import RobustScaler
+    return RobustScaler()
+
+
+def _crear_pca(n_componentes: Union[int, float], n_filas: int, n_columnas: int) -> PCA:
+    """
+    Crear un PCA eligiendo el solver SVD según el tamaño del problema
+
+    Con un número entero de componentes pequeño frente a la matriz se usa
+    SVD aleatorizado (O(n·p·k)) en lugar de la descomposición completa. Una
+    fracción de varianza exige el solver completo.
+
+    Args:
+        n_componentes: Número de componentes o fracción de varianza a conservar
+        n_filas: Número de filas de la matriz
+        n_columnas: Número de columnas de la matriz
+
+    Returns:
+        Instancia de PCA sin ajustar
+    """
+    es_entero = isinstance(n_componentes, (int, np.integer)) and not isinstance(n_componentes, bool)
+    if es_entero and n_componentes < 0.8 * min(n_filas, n_columnas):
+        return PCA(n_components=n_componentes, svd_solver='randomized', random_state=42)
+    if es_entero:
+        return PCA(n_components=n_componentes)
+    return PCA(n_components=n_componentes, svd_solver='full')
+
+
+def _crear_kmeans(n_clusters: int, n_filas: int) -> Union[KMeans, MiniBatchKMeans]:
+    """
+    Crear el modelo de clustering según el número de filas
+
+    Por encima de _UMBRAL_MINIBATCH filas se usa MiniBatchKMeans, que procesa
+    lotes fijos en lugar de releer todo el dataset en cada iteración; por
+    debajo, KMeans con el algoritmo de Elkan.
+
+    Args:
+        n_clusters: Número de clusters
+        n_filas: Número de filas a agrupar
+
+    Returns:
+        Instancia de KMeans o MiniBatchKMeans sin ajustar
+    """
+    if n_filas > _UMBRAL_MINIBATCH:
+        return MiniBatchKMeans(
+            n_clusters=n_clusters,
+            batch_size=1024,
+            n_init='auto',
+            max_iter=100,
+            random_state=42
+        )
+    return KMeans(n_clusters=n_clusters, algorithm='elkan', n_init='auto', random_state=42)
+
+
+def _anexar_columnas(df: pd.DataFrame, columnas: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """
+    Anexar columnas nuevas con una única concatenación
+
+    Las columnas que ya existían (p. ej. al reprocesar una salida previa) se
+    reemplazan en lugar de duplicarse.
+
+    Args:
+        df: DataFrame de trabajo
+        columnas: Diccionario nombre -> valores de longitud len(df)
+
+    Returns:
+        DataFrame con las columnas anexadas
+    """
+    existentes = [col for col in columnas if col in df.columns]
+    if existentes:
+        df = df.drop(columns=existentes)
+    return pd.concat([df, pd.DataFrame(columnas, index=df.index)], axis=1)
+
+
+def _actualizar_columnas_numericas(
+    df: pd.DataFrame,
+    columnas_numericas: List[str]
+) -> List[str]:
+    """
+    Actualizar la lista de columnas numéricas tras una etapa del análisis
+
+    Solo inspecciona el dtype de las columnas que no estaban en la lista,
+    evitando recorrer todo el DataFrame con select_dtypes.
+
+    Args:
+        df: DataFrame resultante de la etapa
+        columnas_numericas: Columnas numéricas conocidas antes de la etapa
+
+    Returns:
+        Columnas numéricas presentes en el DataFrame, en su orden
+    """
+    conocidas = set(columnas_numericas)
+    dtypes = df.dtypes
+    return [
+        col for col in df.columns
+        if col in conocidas or pd.api.types.is_numeric_dtype(dtypes[col])
+    ]
+
 
 class TransformadorAnalisis(TransformadorBase):
     """
@@ -78,11 +433,22 @@ class TransformadorAnalisis(TransformadorBase):
                 "metodo": "kmeans",  # "kmeans", "dbscan"
                 "n_clusters": 3,
                 "columnas_numericas": None
-            }
+            },
+            # Precisión de las matrices que se entregan a sklearn
+            # (normalización, PCA y clustering): "float32" o "float64"
+            "precision_calculo": "float32",
+            # "batch": cada llamada ajusta scaler/PCA/KMeans desde cero
+            # "streaming": los modelos se actualizan con partial_fit entre lotes
+            "modo": "batch",
+            # Formato devuelto por transformar(): "records" (lista de registros),
+            # "columns" (columna -> lista), "arrow" (pyarrow.Table) o
+            # "numpy" (columna -> array). Los formatos columnares evitan crear
+            # un diccionario por fila.
+            "salida_formato": "records"
         }
         
         # Combinar configuración
-        self.configuracion_final = {**self.configuracion_default, **self.configuracion}
+        self.configuracion_final = _combinar_configuracion(self.configuracion_default, self.configuracion)
         
         # Inicializar objetos de sklearn
         self.scaler = None
@@ -90,6 +456,31 @@ class TransformadorAnalisis(TransformadorBase):
         self.feature_selector = None
         self.pca = None
         self.kmeans = None
+        
+        # Columnas con las que se ajustaron los modelos en modo streaming
+        self._columnas_scaler = None
+        self._columnas_pca = None
+        self._columnas_kmeans = None
+    
+    @property
+    def configuracion_final(self) -> Dict[str, Any]:
+        """Configuración combinada (usuario sobre valores por defecto)"""
+        return self._configuracion_final
+    
+    @configuracion_final.setter
+    def configuracion_final(self, configuracion: Dict[str, Any]) -> None:
+        # Reemplazar la configuración obliga a validarla de nuevo
+        self._configuracion_final = configuracion
+        self._configuracion_validada = False
+    
+    def reiniciar_modelos(self) -> None:
+        """Descartar los modelos ajustados para empezar un nuevo flujo de datos"""
+        self.scaler = None
+        self.pca = None
+        self.kmeans = None
+        self._columnas_scaler = None
+        self._columnas_pca = None
+        self._columnas_kmeans = None
     
     def validar_configuracion(self) -> bool:
         """
@@ -106,6 +497,31 @@ class TransformadorAnalisis(TransformadorBase):
         if self.configuracion_final['normalizacion']['metodo'] not in metodos_norm:
             raise ErrorConfiguracion(f"Método de normalización inválido: {self.configuracion_final['normalizacion']['metodo']}")
         
+        # Validar precisión de cálculo
+        precisiones = ["float32", "float64"]
+        if self.configuracion_final['precision_calculo'] not in precisiones:
+            raise ErrorConfiguracion(f"Precisión de cálculo inválida: {self.configuracion_final['precision_calculo']}")
+        
+        # Validar formato de salida
+        formatos = ["records", "columns", "arrow", "numpy"]
+        if self.configuracion_final['salida_formato'] not in formatos:
+            raise ErrorConfiguracion(f"Formato de salida inválido: {self.configuracion_final['salida_formato']}")
+        
+        # Validar modo de ajuste de los modelos
+        modos = ["batch", "streaming"]
+        if self.configuracion_final['modo'] not in modos:
+            raise ErrorConfiguracion(f"Modo inválido: {self.configuracion_final['modo']}")
+        
+        if self.configuracion_final['modo'] == "streaming":
+            if (self.configuracion_final['normalizacion']['habilitada'] and
+                    self.configuracion_final['normalizacion']['metodo'] == "robust"):
+                raise ErrorConfiguracion("La normalización robust no admite modo streaming")
+            
+            n_componentes = self.configuracion_final['reduccion_dimensionalidad']['n_componentes']
+            if (self.configuracion_final['reduccion_dimensionalidad']['habilitada'] and
+                    not isinstance(n_componentes, int)):
+                raise ErrorConfiguracion("El modo streaming requiere un número entero de componentes")
+        
         # Validar método de selección de características
         if self.configuracion_final['seleccion_caracteristicas']['habilitada']:
             metodos_sel = ["f_regression", "f_classif", "mutual_info"]
@@ -120,15 +536,71 @@ class TransformadorAnalisis(TransformadorBase):
         
         return True
     
-    async def transformar(self, datos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    async def transformar(
+        self,
+        datos: Union[List[Dict[str, Any]], Dict[str, Any], pd.DataFrame]
+    ) -> Any:
         """
         Transformar datos aplicando análisis
         
         Args:
-            datos: Lista de registros a transformar
+            datos: Lista de registros a transformar. También acepta un DataFrame,
+                un diccionario columna -> valores o una tabla Arrow, que se usan
+                sin pasar por registros intermedios
+            
+        Returns:
+            Datos transformados en el formato de 'salida_formato': lista de
+            registros (por defecto), diccionario columna -> lista, tabla Arrow
+            o diccionario columna -> array NumPy
+            
+        Raises:
+            ErrorTransformacion: Si hay error en la transformación
+        """
+        try:
+            # Un DataFrame recibido se copia en superficie: las etapas reemplazan
+            # columnas del marco de trabajo y el del llamador no debe cambiar
+            if isinstance(datos, pd.DataFrame):
+                df = datos.copy(deep=False)
+            elif hasattr(datos, 'to_pandas'):
+                df = datos.to_pandas()
+            else:
+                df = pd.DataFrame(datos)
+            
+            df_analizado = await self.transformar_df(df)
+            
+            return self._formatear_salida(df_analizado)
+            
+        except ErrorTransformacion:
+            raise
+        except Exception as e:
+            error_msg = f"Error en transformación de análisis: {str(e)}"
+            self.logger.error("Error de transformación", error=error_msg)
+            raise ErrorTransformacion(error_msg) from e
+    
+    def _formatear_salida(self, df: pd.DataFrame) -> Any:
+        """Convertir el DataFrame resultante al formato de salida configurado"""
+        formato = self.configuracion_final['salida_formato']
+        
+        if formato == "columns":
+            return df.to_dict('list')
+        if formato == "arrow":
+            return self.convertir_a_arrow(df)
+        if formato == "numpy":
+            return {col: df[col].to_numpy() for col in df.columns}
+        return df.to_dict('records')
+    
+    async def transformar_df(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Transformar un DataFrame aplicando análisis sin convertir a registros
+        
+        El DataFrame recibido se usa como marco de trabajo de las etapas,
+        por lo que puede quedar modificado.
+        
+        Args:
+            df: DataFrame a transformar
             
         Returns:
-            Lista de registros transformados
+            DataFrame transformado
             
         Raises:
             ErrorTransformacion: Si hay error en la transformación
@@ -136,116 +608,175 @@ class TransformadorAnalisis(TransformadorBase):
         try:
             self.logger.info(
                 "Iniciando transformación de análisis",
-                registros_entrada=len(datos)
+                registros_entrada=len(df)
             )
             
-            # Validar configuración
-            self.validar_configuracion()
+            # Validar configuración (solo la primera vez o si se reemplazó)
+            if not self._configuracion_validada:
+                self.validar_configuracion()
+                self._configuracion_validada = True
             
-            if not datos:
+            if df.empty:
                 self.logger.warning("No hay datos para transformar")
-                return []
-            
-            # Convertir a DataFrame
-            df = pd.DataFrame(datos)
+                return df
             
-            # Aplicar transformaciones
-            df_analizado = await self._aplicar_analisis(df)
+            registros_entrada = len(df)
+            columnas_entrada = len(df.columns)
             
-            # Convertir de vuelta a lista de diccionarios
-            registros_analizados = df_analizado.to_dict('records')
+            # Aplicar transformaciones: el cálculo es CPU puro, se ejecuta en
+            # un hilo para no bloquear el event loop durante sklearn/NumPy
+            loop = asyncio.get_running_loop()
+            df_analizado = await loop.run_in_executor(None, self._aplicar_analisis, df)
             
             self.logger.info(
                 "Transformación de análisis completada",
-                registros_entrada=len(datos),
-                registros_salida=len(registros_analizados),
-                columnas_entrada=len(df.columns),
+                registros_entrada=registros_entrada,
+                registros_salida=len(df_analizado),
+                columnas_entrada=columnas_entrada,
                 columnas_salida=len(df_analizado.columns)
             )
             
-            return registros_analizados
+            return df_analizado
             
         except Exception as e:
             error_msg = f"Error en transformación de análisis: {str(e)}"
             self.logger.error("Error de transformación", error=error_msg)
             raise ErrorTransformacion(error_msg) from e
     
-    async def _aplicar_analisis(self, df: pd.DataFrame) -> pd.DataFrame:
+    def convertir_a_arrow(self, df: pd.DataFrame):
+        """
+        Convertir el resultado a una tabla Arrow columnar
+        
+        Es el formato preferido para entregar datos a otro transformador
+        basado en pandas: evita crear un objeto Python por celda.
+        
+        Args:
+            df: DataFrame transformado
+            
+        Returns:
+            pyarrow.Table con los mismos datos
+        """
+        import pyarrow as pa
+        return pa.Table.from_pandas(df, preserve_index=False)
+    
+    def _aplicar_analisis(self, df: pd.DataFrame) -> pd.DataFrame:
         """Aplicar todas las transformaciones de análisis"""
-        df_analizado = df.copy()
+        # Las etapas trabajan sobre el mismo DataFrame: transformar() pasa uno
+        # propio (construido desde los registros o copia del DataFrame recibido)
+        df_analizado = df
+        
+        # Columnas numéricas calculadas una sola vez y actualizadas
+        # únicamente cuando una etapa agrega o elimina columnas
+        columnas_numericas = df_analizado.select_dtypes(include=[np.number]).columns.tolist()
         
         # 1. Feature Engineering
         if self.configuracion_final['feature_engineering']['habilitado']:
-            df_analizado = await self._aplicar_feature_engineering(df_analizado)
+            df_analizado = self._aplicar_feature_engineering(df_analizado, columnas_numericas)
+            columnas_numericas = _actualizar_columnas_numericas(df_analizado, columnas_numericas)
         
         # 2. Análisis temporal
         if self.configuracion_final['analisis_temporal']['habilitado']:
-            df_analizado = await self._aplicar_analisis_temporal(df_analizado)
+            df_analizado = self._aplicar_analisis_temporal(df_analizado, columnas_numericas)
+            # La columna de fecha deja de ser numérica tras convertirla a datetime
+            columna_fecha = self.configuracion_final['analisis_temporal']['columna_fecha']
+            columnas_numericas = _actualizar_columnas_numericas(
+                df_analizado,
+                [col for col in columnas_numericas if col != columna_fecha]
+            )
         
         # 3. Normalización
         if self.configuracion_final['normalizacion']['habilitada']:
-            df_analizado = await self._aplicar_normalizacion(df_analizado)
+            df_analizado = self._aplicar_normalizacion(df_analizado, columnas_numericas)
         
         # 4. Selección de características
         if self.configuracion_final['seleccion_caracteristicas']['habilitada']:
-            df_analizado = await self._aplicar_seleccion_caracteristicas(df_analizado)
+            df_analizado = self._aplicar_seleccion_caracteristicas(df_analizado, columnas_numericas)
+            columnas_numericas = _actualizar_columnas_numericas(df_analizado, columnas_numericas)
         
         # 5. Reducción de dimensionalidad
         if self.configuracion_final['reduccion_dimensionalidad']['habilitada']:
-            df_analizado = await self._aplicar_reduccion_dimensionalidad(df_analizado)
+            df_analizado = self._aplicar_reduccion_dimensionalidad(df_analizado, columnas_numericas)
+            columnas_numericas = _actualizar_columnas_numericas(df_analizado, columnas_numericas)
         
         # 6. Clustering
         if self.configuracion_final['clustering']['habilitado']:
-            df_analizado = await self._aplicar_clustering(df_analizado)
+            df_analizado = self._aplicar_clustering(df_analizado, columnas_numericas)
         
         return df_analizado
     
-    async def _aplicar_feature_engineering(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _aplicar_feature_engineering(
+        self,
+        df: pd.DataFrame,
+        columnas_numericas: List[str]
+    ) -> pd.DataFrame:
         """Aplicar feature engineering"""
         config_fe = self.configuracion_final['feature_engineering']
-        df_fe = df.copy()
+        df_fe = df
+        
+        columnas_categoricas = config_fe['columnas_categoricas']
+        if columnas_categoricas is None:
+            columnas_categoricas = df_fe.select_dtypes(include=['object', 'category']).columns.tolist()
+        columnas_categoricas = [col for col in columnas_categoricas if col in df_fe.columns]
+        
+        # dtype category: los códigos enteros quedan disponibles sin rehashear
+        # strings y la columna ocupa mucha menos memoria que un object
+        for col in columnas_categoricas:
+            if not isinstance(df_fe[col].dtype, pd.CategoricalDtype):
+                df_fe[col] = df_fe[col].astype('category')
+        
+        # Bloque numérico compartido (solo lectura) por todas las tareas
+        bloque = df_fe[columnas_numericas].to_numpy(dtype=np.float64)
         
-        # Obtener columnas numéricas
-        columnas_numericas = df_fe.select_dtypes(include=[np.number]).columns.tolist()
+        # Cada tarea es independiente y devuelve columna -> valores
+        tareas = []
         
         # Crear interacciones
         if config_fe['crear_interacciones'] and len(columnas_numericas) >= 2:
-            for i, col1 in enumerate(columnas_numericas):
-                for col2 in columnas_numericas[i+1:]:
-                    df_fe[f"{col1}_x_{col2}"] = df_fe[col1] * df_fe[col2]
+            tareas.append((_calcular_interacciones, bloque, columnas_numericas))
         
         # Crear polinomios
         if config_fe['crear_polinomios'] and len(columnas_numericas) >= 1:
             grado = config_fe['grado_polinomio']
-            for col in columnas_numericas:
-                for g in range(2, grado + 1):
-                    df_fe[f"{col}_grado_{g}"] = df_fe[col] ** g
+            if grado >= 2:
+                tareas.append((_crear_columnas_polinomios, bloque, columnas_numericas, grado))
         
-        # Crear agregaciones
+        # Crear agregaciones por fila
         if config_fe['crear_agregaciones']:
-            # Agregaciones por fila
-            df_fe['suma_numerica'] = df_fe[columnas_numericas].sum(axis=1)
-            df_fe['media_numerica'] = df_fe[columnas_numericas].mean(axis=1)
-            df_fe['std_numerica'] = df_fe[columnas_numericas].std(axis=1)
-            df_fe['min_numerica'] = df_fe[columnas_numericas].min(axis=1)
-            df_fe['max_numerica'] = df_fe[columnas_numericas].max(axis=1)
-        
-        # Codificar variables categóricas
-        columnas_categoricas = config_fe['columnas_categoricas']
-        if columnas_categoricas is None:
-            columnas_categoricas = df_fe.select_dtypes(include=['object']).columns.tolist()
+            tareas.append((_calcular_estadisticas_fila, bloque))
         
-        for col in columnas_categoricas:
-            if col in df_fe.columns:
-                # Label encoding
-                le = LabelEncoder()
-                df_fe[f"{col}_encoded"] = le.fit_transform(df_fe[col].astype(str))
-                self.label_encoders[col] = le
+        # Codificar variables categóricas (siempre la última tarea)
+        if columnas_categoricas:
+            tareas.append((_codificar_categoricas, df_fe, columnas_categoricas))
+        
+        if len(tareas) > 1:
+            # NumPy y pandas liberan el GIL en los cálculos pesados
+            with ThreadPoolExecutor(max_workers=len(tareas)) as executor:
+                futuros = [executor.submit(*tarea) for tarea in tareas]
+                resultados = [futuro.result() for futuro in futuros]
+        else:
+            resultados = [funcion(*args) for funcion, *args in tareas]
+        
+        if columnas_categoricas:
+            codificadas, valores_unicos = resultados.pop()
+            resultados.append(codificadas)
+            # Los valores únicos permiten la transformación inversa
+            self.label_encoders.update(valores_unicos)
+        
+        columnas_nuevas = {}
+        for resultado in resultados:
+            columnas_nuevas.update(resultado)
+        
+        if columnas_nuevas:
+            df_fe = _anexar_columnas(df_fe, columnas_nuevas)
         
         self.logger.info("Feature engineering aplicado")
         return df_fe
     
-    async def _aplicar_analisis_temporal(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _aplicar_analisis_temporal(
+        self,
+        df: pd.DataFrame,
+        columnas_numericas: List[str]
+    ) -> pd.DataFrame:
         """Aplicar análisis temporal"""
         config_temp = self.configuracion_final['analisis_temporal']
         columna_fecha = config_temp['columna_fecha']
@@ -254,40 +785,61 @@ class TransformadorAnalisis(TransformadorBase):
             self.logger.warning(f"Columna de fecha no encontrada: {columna_fecha}")
             return df
         
-        df_temp = df.copy()
+        df_temp = df
         df_temp[columna_fecha] = pd.to_datetime(df_temp[columna_fecha])
-        df_temp = df_temp.sort_values(columna_fecha)
+        
+        # Los datos suelen llegar ya ordenados: evitar el sort y su copia
+        if not df_temp[columna_fecha].is_monotonic_increasing:
+            df_temp = df_temp.sort_values(columna_fecha, kind='mergesort')
+        
+        columnas_creadas = []
         
         # Crear tendencias
         if config_temp['crear_tendencias']:
             df_temp['tendencia'] = range(len(df_temp))
+            columnas_creadas.append('tendencia')
         
         # Crear estacionalidad
         if config_temp['crear_estacionalidad']:
-            df_temp['dia_semana'] = df_temp[columna_fecha].dt.dayofweek
-            df_temp['mes'] = df_temp[columna_fecha].dt.month
-            df_temp['trimestre'] = df_temp[columna_fecha].dt.quarter
-            df_temp['año'] = df_temp[columna_fecha].dt.year
+            # Un único DatetimeIndex comparte el array int64 entre los cuatro campos
+            fechas = pd.DatetimeIndex(df_temp[columna_fecha])
+            df_temp['dia_semana'] = fechas.dayofweek
+            df_temp['mes'] = fechas.month
+            df_temp['trimestre'] = fechas.quarter
+            df_temp['año'] = fechas.year
+            columnas_creadas.extend(['dia_semana', 'mes', 'trimestre', 'año'])
         
         # Crear lags
         if config_temp['crear_lags']:
-            columnas_numericas = df_temp.select_dtypes(include=[np.number]).columns.tolist()
+            columnas_lag = [
+                col for col in columnas_numericas
+                if col != columna_fecha and col not in columnas_creadas
+            ] + columnas_creadas
+            bloque = df_temp[columnas_lag].to_numpy(dtype=np.float64)
+            lags_creados = {}
             for lag in config_temp['lags']:
-                for col in columnas_numericas:
-                    if col != columna_fecha:
-                        df_temp[f"{col}_lag_{lag}"] = df_temp[col].shift(lag)
+                desplazado = _desplazar_bloque(bloque, lag)
+                for j, col in enumerate(columnas_lag):
+                    lags_creados[f"{col}_lag_{lag}"] = desplazado[:, j]
+            
+            if lags_creados:
+                df_temp = _anexar_columnas(df_temp, lags_creados)
         
         self.logger.info("Análisis temporal aplicado")
         return df_temp
     
-    async def _aplicar_normalizacion(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _aplicar_normalizacion(
+        self,
+        df: pd.DataFrame,
+        columnas_numericas: List[str]
+    ) -> pd.DataFrame:
         """Aplicar normalización a columnas numéricas"""
         config_norm = self.configuracion_final['normalizacion']
         columnas = config_norm['columnas_numericas']
         excluir = config_norm['excluir_columnas']
         
         if columnas is None:
-            columnas = df.select_dtypes(include=[np.number]).columns.tolist()
+            columnas = columnas_numericas
         
         # Excluir columnas especificadas
         columnas = [col for col in columnas if col not in excluir and col in df.columns]
@@ -296,25 +848,30 @@ class TransformadorAnalisis(TransformadorBase):
             self.logger.warning("No hay columnas numéricas para normalizar")
             return df
         
-        df_norm = df.copy()
+        df_norm = df
         metodo = config_norm['metodo']
         
-        # Inicializar scaler
-        if metodo == "standard":
-            self.scaler = StandardScaler()
-        elif metodo == "minmax":
-            self.scaler = MinMaxScaler()
-        elif metodo == "robust":
-            from sklearn.preprocessing import RobustScaler
-            self.scaler = RobustScaler()
-        
         # Aplicar normalización
-        df_norm[columnas] = self.scaler.fit_transform(df_norm[columnas])
+        X = df_norm[columnas].to_numpy(dtype=self.configuracion_final['precision_calculo'])
+        if self.configuracion_final['modo'] == "streaming":
+            # Actualizar el scaler existente salvo que cambien las columnas
+            if self.scaler is None or self._columnas_scaler != columnas:
+                self.scaler = _crear_scaler(metodo)
+                self._columnas_scaler = columnas
+            self.scaler.partial_fit(X)
+            df_norm[columnas] = self.scaler.transform(X)
+        else:
+            self.scaler = _crear_scaler(metodo)
+            df_norm[columnas] = self.scaler.fit_transform(X)
         
         self.logger.info(f"Normalización {metodo} aplicada a {len(columnas)} columnas")
         return df_norm
     
-    async def _aplicar_seleccion_caracteristicas(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _aplicar_seleccion_caracteristicas(
+        self,
+        df: pd.DataFrame,
+        columnas_numericas: List[str]
+    ) -> pd.DataFrame:
         """Aplicar selección de características"""
         config_sel = self.configuracion_final['seleccion_caracteristicas']
         columna_objetivo = config_sel['columna_objetivo']
@@ -326,15 +883,13 @@ class TransformadorAnalisis(TransformadorBase):
             return df
         
         # Obtener características numéricas
-        columnas_numericas = df.select_dtypes(include=[np.number]).columns.tolist()
-        if columna_objetivo in columnas_numericas:
-            columnas_numericas.remove(columna_objetivo)
+        columnas_numericas = [col for col in columnas_numericas if col != columna_objetivo]
         
         if len(columnas_numericas) == 0:
             self.logger.warning("No hay características numéricas para seleccionar")
             return df
         
-        X = df[columnas_numericas]
+        X = df[columnas_numericas].to_numpy(dtype=self.configuracion_final['precision_calculo'])
         y = df[columna_objetivo]
         
         # Seleccionar características
@@ -344,13 +899,16 @@ class TransformadorAnalisis(TransformadorBase):
             self.feature_selector = SelectKBest(score_func=f_classif, k=k)
         elif metodo == "mutual_info":
             from sklearn.feature_selection import mutual_info_regression, mutual_info_classif
-            if df[columna_objetivo].dtype in ['int64', 'float64']:
+            # Cualquier dtype numérico (int32, float32, Int64...) salvo bool es regresión
+            tipo_objetivo = y.dtype
+            if pd.api.types.is_numeric_dtype(tipo_objetivo) and not pd.api.types.is_bool_dtype(tipo_objetivo):
                 score_func = mutual_info_regression
             else:
                 score_func = mutual_info_classif
             self.feature_selector = SelectKBest(score_func=score_func, k=k)
         
-        X_selected = self.feature_selector.fit_transform(X, y)
+        # Solo se necesita la máscara de soporte, no la matriz reducida
+        self.feature_selector.fit(X, y)
         
         # Crear DataFrame con características seleccionadas
         columnas_seleccionadas = [columnas_numericas[i] for i in self.feature_selector.get_support(indices=True)]
@@ -359,7 +917,11 @@ class TransformadorAnalisis(TransformadorBase):
         self.logger.info(f"Seleccionadas {len(columnas_seleccionadas)} características de {len(columnas_numericas)}")
         return df_sel
     
-    async def _aplicar_reduccion_dimensionalidad(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _aplicar_reduccion_dimensionalidad(
+        self,
+        df: pd.DataFrame,
+        columnas_numericas: List[str]
+    ) -> pd.DataFrame:
         """Aplicar reducción de dimensionalidad"""
         config_red = self.configuracion_final['reduccion_dimensionalidad']
         columnas = config_red['columnas_numericas']
@@ -367,32 +929,43 @@ class TransformadorAnalisis(TransformadorBase):
         metodo = config_red['metodo']
         
         if columnas is None:
-            columnas = df.select_dtypes(include=[np.number]).columns.tolist()
+            columnas = columnas_numericas
         
         if len(columnas) == 0:
             self.logger.warning("No hay columnas numéricas para reducir dimensionalidad")
             return df
         
-        X = df[columnas]
+        X = df[columnas].to_numpy(dtype=self.configuracion_final['precision_calculo'])
         
         # Aplicar reducción de dimensionalidad
         if metodo == "pca":
-            self.pca = PCA(n_components=n_componentes)
-            X_reduced = self.pca.fit_transform(X)
+            if self.configuracion_final['modo'] == "streaming":
+                if self.pca is None or self._columnas_pca != columnas:
+                    self.pca = IncrementalPCA(n_components=n_componentes)
+                    self._columnas_pca = columnas
+                self.pca.partial_fit(X)
+                X_reduced = self.pca.transform(X)
+            else:
+                self.pca = _crear_pca(n_componentes, *X.shape)
+                X_reduced = self.pca.fit_transform(X)
             
             # Crear nombres de componentes
             n_comp = X_reduced.shape[1]
             nombres_componentes = [f"PC_{i+1}" for i in range(n_comp)]
             
             # Crear DataFrame con componentes principales
-            df_red = df.drop(columns=columnas).copy()
+            df_red = df.drop(columns=columnas)
             for i, nombre in enumerate(nombres_componentes):
                 df_red[nombre] = X_reduced[:, i]
         
         self.logger.info(f"Reducción de dimensionalidad aplicada: {len(columnas)} -> {n_comp} componentes")
         return df_red
     
-    async def _aplicar_clustering(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _aplicar_clustering(
+        self,
+        df: pd.DataFrame,
+        columnas_numericas: List[str]
+    ) -> pd.DataFrame:
         """Aplicar clustering"""
         config_cluster = self.configuracion_final['clustering']
         columnas = config_cluster['columnas_numericas']
@@ -400,21 +973,28 @@ class TransformadorAnalisis(TransformadorBase):
         metodo = config_cluster['metodo']
         
         if columnas is None:
-            columnas = df.select_dtypes(include=[np.number]).columns.tolist()
+            columnas = columnas_numericas
         
         if len(columnas) == 0:
             self.logger.warning("No hay columnas numéricas para clustering")
             return df
         
-        X = df[columnas]
+        X = df[columnas].to_numpy(dtype=self.configuracion_final['precision_calculo'])
         
         # Aplicar clustering
         if metodo == "kmeans":
-            self.kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-            clusters = self.kmeans.fit_predict(X)
+            if self.configuracion_final['modo'] == "streaming":
+                if self.kmeans is None or self._columnas_kmeans != columnas:
+                    self.kmeans = MiniBatchKMeans(n_clusters=n_clusters, n_init='auto', random_state=42)
+                    self._columnas_kmeans = columnas
+                self.kmeans.partial_fit(X)
+                clusters = self.kmeans.predict(X)
+            else:
+                self.kmeans = _crear_kmeans(n_clusters, X.shape[0])
+                clusters = self.kmeans.fit_predict(X)
         
         # Agregar clusters al DataFrame
-        df_cluster = df.copy()
+        df_cluster = df
         df_cluster['cluster'] = clusters
         
         self.logger.info(f"Clustering aplicado: {n_clusters} clusters")
@@ -3,10 +3,45 @@ Transformador Base - Pipeline ETL
 Clase base abstracta para transformadores de datos
 """
 from abc import ABC, abstractmethod
+from collections import ChainMap
 from typing import Dict, Any, List, Optional
 import structlog
 
 
+def _combinar_configuracion(
+    default: Dict[str, Any],
+    usuario: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Combinar la configuración del usuario con la configuración por defecto
+
+    Cada sección es un ChainMap que consulta primero los valores del usuario
+    y después los por defecto, así una sección parcial (p. ej.
+    {"normalizacion": {"metodo": "robust"}}) conserva el resto de claves
+    sin copiar diccionarios.
+
+    Args:
+        default: Configuración por defecto
+        usuario: Configuración específica del usuario
+
+    Returns:
+        Configuración combinada
+    """
+    combinada = {}
+    for seccion, valor_default in default.items():
+        valor_usuario = usuario.get(seccion, valor_default)
+        if isinstance(valor_default, dict) and isinstance(valor_usuario, dict):
+            combinada[seccion] = ChainMap(valor_usuario, valor_default)
+        else:
+            combinada[seccion] = valor_usuario
+    
+    # Claves adicionales no contempladas en la configuración por defecto
+    for seccion, valor in usuario.items():
+        combinada.setdefault(seccion, valor)
+    
+    return combinada
+
+
 class TransformadorBase(ABC):
     """
     Clase base abstracta para transformadores de datos
@@ -2,16 +2,199 @@
 Transformador de Limpieza - Pipeline ETL
 Transformador para limpieza y normalización de datos
 """
+import asyncio
 import pandas as pd
 import numpy as np
 import re
-from typing import Dict, Any, List, Optional
+import unicodedata
+import warnings
+from typing import Dict, Any, List, Optional, Union, AsyncIterator, Set
 from datetime import datetime
 import structlog
+from sklearn.ensemble import IsolationForest
 
-from .transformador_base import TransformadorBase
+from .transformador_base import TransformadorBase, _combinar_configuracion
 from ..excepciones.excepciones_pipeline import ErrorTransformacion, ErrorConfiguracion
 
+try:
+    from numba import njit
+    NUMBA_DISPONIBLE = True
+except ImportError:  # Numba es opcional: sin él se usan los cálculos NumPy
+    NUMBA_DISPONIBLE = False
+
+
+# Caracteres eliminados con eliminar_caracteres_especiales, compilado una vez
+_PATRON_CARACTERES_ESPECIALES = re.compile(r'[^a-zA-Z0-9\s]')
+
+
+# Formatos probados, en orden, para detectar el formato de una columna de fechas.
+# 'ISO8601' usa el parser C de pandas para cualquier variante ISO; las fechas con
+# barras priorizan mes/día como hacía la inferencia de dateutil
+_FORMATOS_FECHA = (
+    'ISO8601',
+    '%m/%d/%Y',
+    '%d/%m/%Y',
+    '%m/%d/%Y %H:%M:%S',
+    '%d/%m/%Y %H:%M:%S'
+)
+
+# Valores no nulos usados para detectar el formato de fecha
+_TAMANO_MUESTRA_FECHAS = 32
+
+
+def _detectar_formato_fecha(serie: pd.Series) -> Optional[str]:
+    """
+    Detectar el formato de fecha de una serie a partir de una muestra
+
+    Args:
+        serie: Serie de texto
+
+    Returns:
+        Primer formato de _FORMATOS_FECHA que parsea toda la muestra, o None
+    """
+    muestra = serie.dropna().head(_TAMANO_MUESTRA_FECHAS)
+    if muestra.empty:
+        return None
+    
+    for formato in _FORMATOS_FECHA:
+        try:
+            pd.to_datetime(muestra, format=formato)
+        except (ValueError, TypeError):
+            continue
+        return formato
+    
+    return None
+
+
+# Proporción de valores distintos por debajo de la cual el texto se normaliza
+# sobre sus valores únicos en lugar de celda a celda
+_UMBRAL_CARDINALIDAD_TEXTO = 0.5
+
+# Valores usados para estimar la cardinalidad de una columna de texto
+_TAMANO_MUESTRA_CARDINALIDAD = 1000
+
+
+def _es_baja_cardinalidad(serie: pd.Series) -> bool:
+    """Estimar con una muestra si una serie tiene pocos valores distintos"""
+    muestra = serie.iloc[:_TAMANO_MUESTRA_CARDINALIDAD]
+    return muestra.nunique(dropna=False) < len(muestra) * _UMBRAL_CARDINALIDAD_TEXTO
+
+
+class _TablaAcentos(dict):
+    """
+    Tabla para str.translate que elimina acentos y caracteres no ASCII
+
+    Cada carácter se traduce como NFD + encode('ascii', errors='ignore') la
+    primera vez que aparece y el resultado queda cacheado, por lo que el texto
+    se recorre una sola vez sin conversiones a bytes por celda.
+    """
+
+    def __missing__(self, codigo: int) -> str:
+        reemplazo = unicodedata.normalize('NFD', chr(codigo)).encode('ascii', 'ignore').decode('ascii')
+        self[codigo] = reemplazo
+        return reemplazo
+
+
+# Los caracteres ASCII se mantienen; el resto se resuelve bajo demanda
+_TABLA_ACENTOS = _TablaAcentos({codigo: chr(codigo) for codigo in range(128)})
+
+
+if NUMBA_DISPONIBLE:
+    @njit(nogil=True, cache=True)
+    def _kernel_fuera_de_limites(arr, limite_inferior, limite_superior):
+        n, n_cols = arr.shape
+        mascara = np.zeros(n, dtype=np.bool_)
+        
+        for i in range(n):
+            for j in range(n_cols):
+                x = arr[i, j]
+                # NaN en el valor o en los límites nunca cumple la comparación
+                if x < limite_inferior[j] or x > limite_superior[j]:
+                    mascara[i] = True
+                    break
+        
+        return mascara
+
+
+def _fuera_de_limites(
+    arr: np.ndarray,
+    limite_inferior: np.ndarray,
+    limite_superior: np.ndarray
+) -> np.ndarray:
+    """Marcar las filas con algún valor fuera de los límites de su columna"""
+    if NUMBA_DISPONIBLE:
+        # Una pasada por fila, sin matrices booleanas intermedias (n, N)
+        return _kernel_fuera_de_limites(arr, limite_inferior, limite_superior)
+    return ((arr < limite_inferior) | (arr > limite_superior)).any(axis=1)
+
+
+def _mascara_isolation_forest(arr: np.ndarray) -> np.ndarray:
+    """
+    Marcar outliers multivariantes con un Isolation Forest sobre toda la matriz
+
+    Los árboles de sklearn trabajan en float32, así que la matriz se convierte
+    una sola vez. Los NaN se sustituyen por la mediana de su columna para que
+    un valor ausente no aísle la fila; las columnas sin datos se ignoran.
+    """
+    datos = arr[:, ~np.isnan(arr).all(axis=0)].astype(np.float32)
+    if datos.shape[1] == 0:
+        return np.zeros(arr.shape[0], dtype=bool)
+
+    nulos = np.isnan(datos)
+    if nulos.any():
+        medianas = np.nanmedian(datos, axis=0)
+        datos[nulos] = np.take(medianas, np.nonzero(nulos)[1])
+
+    modelo = IsolationForest(
+        n_estimators=100,
+        max_samples=min(256, datos.shape[0]),
+        contamination='auto',
+        n_jobs=-1,
+        random_state=42
+    )
+    return modelo.fit_predict(datos) == -1
+
+
+def _mascara_outliers(arr: np.ndarray, metodo: str, factor: float) -> np.ndarray:
+    """
+    Calcular qué filas contienen un outlier en alguna columna
+
+    Los límites se calculan por columna ignorando NaN, como Series.quantile,
+    Series.mean y Series.std; un NaN nunca se considera outlier.
+
+    Args:
+        arr: Matriz (n, N) de valores float64
+        metodo: "iqr", "zscore" o "isolation_forest"
+        factor: Factor IQR o umbral de z-score (no se usa con isolation_forest)
+
+    Returns:
+        Array booleano de longitud n
+    """
+    n, n_cols = arr.shape
+    if n_cols == 0 or n == 0:
+        return np.zeros(n, dtype=bool)
+
+    with warnings.catch_warnings():
+        # Columnas completamente NaN: límites NaN, ninguna fila marcada
+        warnings.simplefilter('ignore', RuntimeWarning)
+        if metodo == "iqr":
+            q1, q3 = np.nanquantile(arr, [0.25, 0.75], axis=0)
+            iqr = q3 - q1
+            return _fuera_de_limites(arr, q1 - factor * iqr, q3 + factor * iqr)
+
+        if metodo == "zscore":
+            media = np.nanmean(arr, axis=0)
+            std = np.nanstd(arr, axis=0, ddof=1)
+            # Columnas constantes no tienen outliers por z-score
+            std[std == 0] = np.nan
+            # |x - media| / std > factor equivale a salir de media ± factor * std
+            return _fuera_de_limites(arr, media - factor * std, media + factor * std)
+
+        if metodo == "isolation_forest":
+            return _mascara_isolation_forest(arr)
+
+    return np.zeros(n, dtype=bool)
+
 
 class TransformadorLimpieza(TransformadorBase):
     """
@@ -19,6 +202,11 @@ class TransformadorLimpieza(TransformadorBase):
     Maneja valores nulos, outliers, duplicados y normalización
     """
     
+    # Valores admitidos por validar_configuracion
+    _ESTRATEGIAS_NULOS = frozenset(("eliminar", "imputar", "marcar"))
+    _METODOS_IMPUTACION = frozenset(("media", "mediana", "moda", "valor_fijo"))
+    _METODOS_OUTLIERS = frozenset(("iqr", "zscore", "isolation_forest"))
+    
     def __init__(
         self, 
         nombre: str = "LimpiezaDatos",
@@ -70,11 +258,39 @@ class TransformadorLimpieza(TransformadorBase):
                 "rangos_numericos": {},
                 "valores_permitidos": {},
                 "longitud_texto": {}
-            }
+            },
+            # Registros por lote al transformar listas grandes; None = un solo
+            # DataFrame. Con lotes, nulos y outliers usan estadísticas del lote
+            "tamano_lote": None
         }
         
         # Combinar configuración
-        self.configuracion_final = {**self.configuracion_default, **self.configuracion}
+        self.configuracion_final = _combinar_configuracion(self.configuracion_default, self.configuracion)
+        
+        # Formato de fecha detectado por columna, reutilizado entre lotes
+        self._formatos_fecha: Dict[str, str] = {}
+        
+        # Hashes de filas ya emitidas durante transformar_por_lotes, para
+        # eliminar duplicados entre lotes; None fuera de ese modo
+        self._claves_vistas: Optional[Set[int]] = None
+    
+    @property
+    def configuracion_final(self) -> Dict[str, Any]:
+        """Configuración combinada (usuario sobre valores por defecto)"""
+        return self._configuracion_final
+    
+    @configuracion_final.setter
+    def configuracion_final(self, configuracion: Dict[str, Any]) -> None:
+        # Reemplazar la configuración obliga a validarla de nuevo
+        self._configuracion_final = configuracion
+        self._configuracion_validada = False
+        self._valores_permitidos = None
+    
+    def _validar_configuracion_una_vez(self) -> None:
+        """Validar la configuración solo la primera vez o si se reemplazó"""
+        if not self._configuracion_validada:
+            self.validar_configuracion()
+            self._configuracion_validada = True
     
     def validar_configuracion(self) -> bool:
         """
@@ -86,103 +302,195 @@ class TransformadorLimpieza(TransformadorBase):
         Raises:
             ErrorConfiguracion: Si la configuración es inválida
         """
+        config_nulos = self.configuracion_final['manejo_nulos']
+        
         # Validar estrategia de manejo de nulos
-        estrategias_validas = ["eliminar", "imputar", "marcar"]
-        if self.configuracion_final['manejo_nulos']['estrategia'] not in estrategias_validas:
-            raise ErrorConfiguracion(f"Estrategia de nulos inválida: {self.configuracion_final['manejo_nulos']['estrategia']}")
+        if config_nulos['estrategia'] not in self._ESTRATEGIAS_NULOS:
+            raise ErrorConfiguracion(f"Estrategia de nulos inválida: {config_nulos['estrategia']}")
         
         # Validar método de imputación
-        if self.configuracion_final['manejo_nulos']['estrategia'] == "imputar":
-            metodos_validos = ["media", "mediana", "moda", "valor_fijo"]
-            if self.configuracion_final['manejo_nulos']['imputacion'] not in metodos_validos:
-                raise ErrorConfiguracion(f"Método de imputación inválido: {self.configuracion_final['manejo_nulos']['imputacion']}")
+        if config_nulos['estrategia'] == "imputar":
+            if config_nulos['imputacion'] not in self._METODOS_IMPUTACION:
+                raise ErrorConfiguracion(f"Método de imputación inválido: {config_nulos['imputacion']}")
         
         # Validar método de detección de outliers
-        metodos_outliers = ["iqr", "zscore", "isolation_forest"]
-        if self.configuracion_final['manejo_outliers']['metodo'] not in metodos_outliers:
+        if self.configuracion_final['manejo_outliers']['metodo'] not in self._METODOS_OUTLIERS:
             raise ErrorConfiguracion(f"Método de outliers inválido: {self.configuracion_final['manejo_outliers']['metodo']}")
         
+        # Validar tamaño de lote
+        tamano_lote = self.configuracion_final['tamano_lote']
+        if tamano_lote is not None:
+            if not isinstance(tamano_lote, int) or tamano_lote <= 0:
+                raise ErrorConfiguracion(f"Tamaño de lote inválido: {tamano_lote}")
+            # Entre lotes solo puede conservarse la primera aparición de cada fila
+            if (self.configuracion_final['manejo_duplicados']['habilitado']
+                    and self.configuracion_final['manejo_duplicados']['mantener'] != "primero"):
+                raise ErrorConfiguracion("El procesamiento por lotes solo admite mantener='primero' en duplicados")
+        
         return True
     
-    async def transformar(self, datos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    async def transformar(
+        self,
+        datos: Union[List[Dict[str, Any]], Dict[str, Any], pd.DataFrame]
+    ) -> List[Dict[str, Any]]:
         """
         Transformar datos aplicando limpieza
         
         Args:
-            datos: Lista de registros a transformar
+            datos: Lista de registros a transformar. También acepta un DataFrame,
+                un diccionario columna -> valores o una tabla Arrow
             
         Returns:
             Lista de registros transformados
             
+        Raises:
+            ErrorTransformacion: Si hay error en la transformación
+        """
+        try:
+            tamano_lote = self.configuracion_final['tamano_lote']
+            if isinstance(datos, list) and tamano_lote is not None and len(datos) > tamano_lote:
+                registros = []
+                async for lote in self.transformar_por_lotes(datos):
+                    registros.extend(lote)
+                return registros
+            
+            # Un DataFrame recibido se usa directamente como marco de trabajo
+            if isinstance(datos, pd.DataFrame):
+                df = datos
+            elif hasattr(datos, 'to_pandas'):
+                df = datos.to_pandas()
+            else:
+                df = pd.DataFrame(datos)
+            
+            df_limpio = await self.transformar_df(df)
+            
+            # Convertir de vuelta a lista de diccionarios
+            return df_limpio.to_dict('records')
+            
+        except ErrorTransformacion:
+            raise
+        except Exception as e:
+            error_msg = f"Error en transformación de limpieza: {str(e)}"
+            self.logger.error("Error de transformación", error=error_msg)
+            raise ErrorTransformacion(error_msg) from e
+    
+    async def transformar_por_lotes(
+        self,
+        datos: List[Dict[str, Any]]
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Transformar una lista de registros por lotes de tamano_lote
+        
+        Solo un lote está materializado como DataFrame a la vez. Los duplicados
+        se eliminan también entre lotes mediante el hash de cada fila; nulos y
+        outliers se calculan con las estadísticas de cada lote.
+        
+        Args:
+            datos: Lista de registros a transformar
+            
+        Yields:
+            Registros transformados de cada lote
+            
+        Raises:
+            ErrorTransformacion: Si hay error en la transformación
+        """
+        self._validar_configuracion_una_vez()
+        tamano_lote = self.configuracion_final['tamano_lote'] or len(datos) or 1
+        
+        self._claves_vistas = set()
+        try:
+            for inicio in range(0, len(datos), tamano_lote):
+                df = pd.DataFrame(datos[inicio:inicio + tamano_lote])
+                df_limpio = await self.transformar_df(df)
+                yield df_limpio.to_dict('records')
+        finally:
+            self._claves_vistas = None
+    
+    async def transformar_df(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Transformar un DataFrame aplicando limpieza sin convertir a registros
+        
+        Permite encadenar este transformador con TransformadorAnalisis.transformar_df
+        sin materializar un diccionario por fila entre ambos.
+        
+        Args:
+            df: DataFrame a transformar
+            
+        Returns:
+            DataFrame limpio
+            
         Raises:
             ErrorTransformacion: Si hay error en la transformación
         """
         try:
             self.logger.info(
                 "Iniciando transformación de limpieza",
-                registros_entrada=len(datos)
+                registros_entrada=len(df)
             )
             
-            # Validar configuración
-            self.validar_configuracion()
+            # Validar configuración (solo la primera vez o si se reemplazó)
+            self._validar_configuracion_una_vez()
             
-            if not datos:
+            if df.empty:
                 self.logger.warning("No hay datos para transformar")
-                return []
+                return df
             
-            # Convertir a DataFrame para facilitar el procesamiento
-            df = pd.DataFrame(datos)
+            registros_entrada = len(df)
             
-            # Aplicar transformaciones
-            df_limpio = await self._aplicar_limpieza(df)
-            
-            # Convertir de vuelta a lista de diccionarios
-            registros_limpios = df_limpio.to_dict('records')
+            # Aplicar transformaciones fuera del event loop: las etapas son
+            # cálculo pandas/NumPy síncrono
+            loop = asyncio.get_running_loop()
+            df_limpio = await loop.run_in_executor(None, self._aplicar_limpieza, df)
             
             self.logger.info(
                 "Transformación de limpieza completada",
-                registros_entrada=len(datos),
-                registros_salida=len(registros_limpios),
-                registros_eliminados=len(datos) - len(registros_limpios)
+                registros_entrada=registros_entrada,
+                registros_salida=len(df_limpio),
+                registros_eliminados=registros_entrada - len(df_limpio)
             )
             
-            return registros_limpios
+            return df_limpio
             
         except Exception as e:
             error_msg = f"Error en transformación de limpieza: {str(e)}"
             self.logger.error("Error de transformación", error=error_msg)
             raise ErrorTransformacion(error_msg) from e
     
-    async def _aplicar_limpieza(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Aplicar todas las transformaciones de limpieza"""
-        df_limpio = df.copy()
+    def _aplicar_limpieza(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Aplicar todas las transformaciones de limpieza
         
+        Ninguna etapa escribe sobre los arrays recibidos: las que filtran filas
+        devuelven un DataFrame nuevo y las que reemplazan columnas trabajan sobre
+        una copia superficial, así que el DataFrame de entrada no se modifica y
+        los datos solo se copian cuando una etapa realmente los cambia.
+        """
         # 1. Manejo de valores nulos
-        df_limpio = await self._manejar_valores_nulos(df_limpio)
+        df_limpio = self._manejar_valores_nulos(df)
         
         # 2. Normalización de texto
         if self.configuracion_final['normalizacion_texto']['habilitada']:
-            df_limpio = await self._normalizar_texto(df_limpio)
+            df_limpio = self._normalizar_texto(df_limpio)
         
         # 3. Normalización de fechas
         if self.configuracion_final['normalizacion_fechas']['habilitada']:
-            df_limpio = await self._normalizar_fechas(df_limpio)
+            df_limpio = self._normalizar_fechas(df_limpio)
         
         # 4. Manejo de duplicados
         if self.configuracion_final['manejo_duplicados']['habilitado']:
-            df_limpio = await self._manejar_duplicados(df_limpio)
+            df_limpio = self._manejar_duplicados(df_limpio)
         
         # 5. Manejo de outliers
         if self.configuracion_final['manejo_outliers']['habilitado']:
-            df_limpio = await self._manejar_outliers(df_limpio)
+            df_limpio = self._manejar_outliers(df_limpio)
         
         # 6. Validación de datos
         if self.configuracion_final['validacion_datos']['habilitada']:
-            df_limpio = await self._validar_datos(df_limpio)
+            df_limpio = self._validar_datos(df_limpio)
         
         return df_limpio
     
-    async def _manejar_valores_nulos(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _manejar_valores_nulos(self, df: pd.DataFrame) -> pd.DataFrame:
         """Manejar valores nulos en el DataFrame"""
         config_nulos = self.configuracion_final['manejo_nulos']
         estrategia = config_nulos['estrategia']
@@ -193,108 +501,147 @@ class TransformadorLimpieza(TransformadorBase):
             self.logger.info(f"Eliminadas {len(df) - len(df_limpio)} filas con valores nulos")
         
         elif estrategia == "imputar":
-            # Imputar valores nulos
-            df_limpio = df.copy()
+            # Imputar valores nulos con un único fillna sobre todo el DataFrame
             metodo = config_nulos['imputacion']
             
-            for columna in df.columns:
-                if df[columna].dtype in ['int64', 'float64']:
-                    if metodo == "media":
-                        df_limpio[columna].fillna(df[columna].mean(), inplace=True)
-                    elif metodo == "mediana":
-                        df_limpio[columna].fillna(df[columna].median(), inplace=True)
-                    elif metodo == "moda":
-                        df_limpio[columna].fillna(df[columna].mode()[0], inplace=True)
-                    elif metodo == "valor_fijo":
-                        valor = config_nulos['valor_fijo']
-                        if valor is not None:
-                            df_limpio[columna].fillna(valor, inplace=True)
+            # Solo las columnas que tienen nulos necesitan valor de relleno
+            nulos_por_columna = df.isna().sum()
+            columnas_con_nulos = nulos_por_columna.index[nulos_por_columna.to_numpy() > 0]
+            
+            valores_relleno: Dict[Any, Any] = {}
+            if metodo == "valor_fijo":
+                valor = config_nulos['valor_fijo']
+                if valor is not None:
+                    valores_relleno = dict.fromkeys(columnas_con_nulos, valor)
+            elif metodo == "moda":
+                # La moda aplica tanto a columnas numéricas como no numéricas
+                for columna in columnas_con_nulos:
+                    moda = df[columna].mode()
+                    if not moda.empty:
+                        valores_relleno[columna] = moda.iat[0]
+            else:
+                numericas = df[columnas_con_nulos].select_dtypes(include=[np.number])
+                if metodo == "media":
+                    valores_relleno = numericas.mean().to_dict()
                 else:
-                    # Para columnas no numéricas, usar moda o valor fijo
-                    if metodo == "moda":
-                        moda = df[columna].mode()
-                        if not moda.empty:
-                            df_limpio[columna].fillna(moda[0], inplace=True)
-                    elif metodo == "valor_fijo":
-                        valor = config_nulos['valor_fijo']
-                        if valor is not None:
-                            df_limpio[columna].fillna(valor, inplace=True)
+                    valores_relleno = numericas.median().to_dict()
+            
+            df_limpio = df.fillna(valores_relleno) if valores_relleno else df
             
-            self.logger.info("Valores nulos imputados")
+            self.logger.info("Valores nulos imputados", columnas_imputadas=len(valores_relleno))
         
         elif estrategia == "marcar":
-            # Marcar valores nulos con un indicador
-            df_limpio = df.copy()
-            for columna in df.columns:
-                df_limpio[f"{columna}_es_nulo"] = df[columna].isnull()
+            # Marcar valores nulos con un indicador por columna en una sola concatenación
+            indicadores = df.isnull().add_suffix("_es_nulo")
+            df_limpio = pd.concat([df, indicadores], axis=1)
             self.logger.info("Valores nulos marcados")
         
         return df_limpio
     
-    async def _normalizar_texto(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _normalizar_texto(self, df: pd.DataFrame) -> pd.DataFrame:
         """Normalizar columnas de texto"""
+        columnas_texto = df.select_dtypes(include='object').columns
+        if len(columnas_texto) == 0:
+            return df
+        
         config_texto = self.configuracion_final['normalizacion_texto']
-        df_limpio = df.copy()
+        # Copia superficial: solo se reemplazan columnas, no se modifican datos
+        df_limpio = df.copy(deep=False)
         
-        for columna in df.columns:
-            if df[columna].dtype == 'object':
-                # Convertir a string y manejar nulos
-                serie = df[columna].astype(str)
-                
-                # Aplicar normalizaciones
-                if config_texto['minusculas']:
-                    serie = serie.str.lower()
-                
-                if config_texto['eliminar_espacios']:
-                    serie = serie.str.strip()
-                
-                if config_texto['eliminar_caracteres_especiales']:
-                    serie = serie.str.replace(r'[^a-zA-Z0-9\s]', '', regex=True)
-                
-                if config_texto['normalizar_acentos']:
-                    # Normalizar acentos (simplificado)
-                    serie = serie.str.normalize('NFD').str.encode('ascii', errors='ignore').str.decode('utf-8')
-                
-                df_limpio[columna] = serie
+        for columna in columnas_texto:
+            # Convertir a string y manejar nulos
+            serie = df[columna].astype(str)
+            
+            if _es_baja_cardinalidad(serie):
+                # Normalizar solo los valores distintos y expandir por código
+                codigos, valores_unicos = pd.factorize(serie)
+                normalizados = self._normalizar_valores_texto(
+                    pd.Series(valores_unicos, dtype=object),
+                    config_texto
+                ).to_numpy()
+                df_limpio[columna] = pd.Series(normalizados.take(codigos), index=df.index)
+            else:
+                df_limpio[columna] = self._normalizar_valores_texto(serie, config_texto)
         
         self.logger.info("Texto normalizado")
         return df_limpio
     
-    async def _normalizar_fechas(self, df: pd.DataFrame) -> pd.DataFrame:
+    @staticmethod
+    def _normalizar_valores_texto(serie: pd.Series, config_texto: Dict[str, Any]) -> pd.Series:
+        """Aplicar las normalizaciones de texto configuradas a una serie de strings"""
+        if config_texto['minusculas']:
+            serie = serie.str.lower()
+        
+        if config_texto['eliminar_espacios']:
+            serie = serie.str.strip()
+        
+        if config_texto['eliminar_caracteres_especiales']:
+            serie = serie.str.replace(_PATRON_CARACTERES_ESPECIALES, '', regex=True)
+        
+        if config_texto['normalizar_acentos']:
+            # Quitar acentos con una sola pasada de str.translate
+            serie = serie.str.translate(_TABLA_ACENTOS)
+        
+        return serie
+    
+    def _normalizar_fechas(self, df: pd.DataFrame) -> pd.DataFrame:
         """Normalizar columnas de fechas"""
+        columnas_texto = df.select_dtypes(include='object').columns
+        if len(columnas_texto) == 0:
+            return df
+        
         config_fechas = self.configuracion_final['normalizacion_fechas']
-        df_limpio = df.copy()
-        
-        for columna in df.columns:
-            if df[columna].dtype == 'object':
-                try:
-                    # Intentar convertir a datetime
-                    if config_fechas['formato_entrada'] == "auto":
-                        df_limpio[columna] = pd.to_datetime(df[columna], infer_datetime_format=True)
-                    else:
-                        df_limpio[columna] = pd.to_datetime(df[columna], format=config_fechas['formato_entrada'])
-                    
-                    # Aplicar zona horaria si se especifica
-                    if config_fechas['zona_horaria']:
-                        df_limpio[columna] = df_limpio[columna].dt.tz_localize(config_fechas['zona_horaria'])
-                    
-                    # Formatear según el formato de salida
-                    df_limpio[columna] = df_limpio[columna].dt.strftime(config_fechas['formato_salida'])
-                    
-                except Exception as e:
-                    self.logger.warning(f"No se pudo normalizar fecha en columna {columna}: {str(e)}")
+        df_limpio = df.copy(deep=False)
+        
+        for columna in columnas_texto:
+            try:
+                # Intentar convertir a datetime
+                if config_fechas['formato_entrada'] == "auto":
+                    df_limpio[columna] = self._parsear_fechas_auto(columna, df[columna])
+                else:
+                    df_limpio[columna] = pd.to_datetime(df[columna], format=config_fechas['formato_entrada'])
+                
+                # Aplicar zona horaria si se especifica
+                if config_fechas['zona_horaria']:
+                    df_limpio[columna] = df_limpio[columna].dt.tz_localize(config_fechas['zona_horaria'])
+                
+                # Formatear según el formato de salida
+                df_limpio[columna] = df_limpio[columna].dt.strftime(config_fechas['formato_salida'])
+                
+            except Exception as e:
+                self.logger.warning(f"No se pudo normalizar fecha en columna {columna}: {str(e)}")
         
         self.logger.info("Fechas normalizadas")
         return df_limpio
     
-    async def _manejar_duplicados(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _parsear_fechas_auto(self, columna: str, serie: pd.Series) -> pd.Series:
+        """
+        Parsear una columna de fechas con formato explícito detectado por muestra
+        
+        El formato se cachea por columna; si un lote posterior ya no lo cumple
+        se vuelve a detectar. Sin formato conocido se usa la inferencia de pandas.
+        """
+        formato = self._formatos_fecha.get(columna)
+        if formato is not None:
+            try:
+                return pd.to_datetime(serie, format=formato, cache=True)
+            except (ValueError, TypeError):
+                del self._formatos_fecha[columna]
+        
+        formato = _detectar_formato_fecha(serie)
+        if formato is None:
+            return pd.to_datetime(serie, cache=True)
+        
+        fechas = pd.to_datetime(serie, format=formato, cache=True)
+        self._formatos_fecha[columna] = formato
+        return fechas
+    
+    def _manejar_duplicados(self, df: pd.DataFrame) -> pd.DataFrame:
         """Manejar registros duplicados"""
         config_duplicados = self.configuracion_final['manejo_duplicados']
         subset = config_duplicados['subset']
         mantener = config_duplicados['mantener']
         
-        duplicados_antes = df.duplicated(subset=subset).sum()
-        
         if mantener == "primero":
             df_limpio = df.drop_duplicates(subset=subset, keep='first')
         elif mantener == "ultimo":
@@ -304,12 +651,24 @@ class TransformadorLimpieza(TransformadorBase):
         else:
             df_limpio = df
         
-        duplicados_eliminados = duplicados_antes - df_limpio.duplicated(subset=subset).sum()
+        # drop_duplicates ya construyó el hash de filas: el conteo sale de las longitudes
+        duplicados_eliminados = len(df) - len(df_limpio)
         self.logger.info(f"Eliminados {duplicados_eliminados} registros duplicados")
         
+        if self._claves_vistas is not None and not df_limpio.empty:
+            # Descartar filas ya emitidas en lotes anteriores
+            columnas_clave = df_limpio if subset is None else df_limpio[subset]
+            claves = pd.util.hash_pandas_object(columnas_clave, index=False).to_numpy()
+            vistas = self._claves_vistas
+            repetidas = np.fromiter((clave in vistas for clave in claves), dtype=bool, count=len(claves))
+            vistas.update(claves[~repetidas].tolist())
+            if repetidas.any():
+                df_limpio = df_limpio[~repetidas]
+                self.logger.info(f"Eliminados {int(repetidas.sum())} registros duplicados de lotes anteriores")
+        
         return df_limpio
     
-    async def _manejar_outliers(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _manejar_outliers(self, df: pd.DataFrame) -> pd.DataFrame:
         """Manejar valores atípicos (outliers)"""
         config_outliers = self.configuracion_final['manejo_outliers']
         metodo = config_outliers['metodo']
@@ -319,56 +678,70 @@ class TransformadorLimpieza(TransformadorBase):
         if columnas is None:
             columnas = df.select_dtypes(include=[np.number]).columns.tolist()
         
-        df_limpio = df.copy()
-        outliers_eliminados = 0
+        columnas = [
+            columna for columna in columnas
+            if columna in df.columns and df[columna].dtype in ['int64', 'float64']
+        ]
         
-        for columna in columnas:
-            if columna in df.columns and df[columna].dtype in ['int64', 'float64']:
-                if metodo == "iqr":
-                    Q1 = df[columna].quantile(0.25)
-                    Q3 = df[columna].quantile(0.75)
-                    IQR = Q3 - Q1
-                    limite_inferior = Q1 - factor * IQR
-                    limite_superior = Q3 + factor * IQR
-                    
-                    outliers = (df[columna] < limite_inferior) | (df[columna] > limite_superior)
-                    df_limpio = df_limpio[~outliers]
-                    outliers_eliminados += outliers.sum()
-                
-                elif metodo == "zscore":
-                    z_scores = np.abs((df[columna] - df[columna].mean()) / df[columna].std())
-                    outliers = z_scores > factor
-                    df_limpio = df_limpio[~outliers]
-                    outliers_eliminados += outliers.sum()
+        if not columnas:
+            return df
+        
+        # Una sola máscara sobre la matriz numérica y un único filtrado de filas
+        arr = df[columnas].to_numpy(dtype=np.float64)
+        outliers = _mascara_outliers(arr, metodo, factor)
+        outliers_eliminados = int(outliers.sum())
+        df_limpio = df[~outliers] if outliers_eliminados else df
         
         self.logger.info(f"Eliminados {outliers_eliminados} outliers")
         return df_limpio
     
-    async def _validar_datos(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _obtener_valores_permitidos(self) -> Dict[str, pd.Index]:
+        """
+        Valores permitidos por columna, convertidos a Index una vez por configuración
+        
+        isin usa directamente el array del Index sin volver a convertir la lista
+        en cada lote; en columnas con dtype Arrow pandas resuelve isin con
+        pyarrow.compute.is_in.
+        """
+        if self._valores_permitidos is None:
+            self._valores_permitidos = {
+                columna: pd.Index(list(valores))
+                for columna, valores in self.configuracion_final['validacion_datos']['valores_permitidos'].items()
+            }
+        return self._valores_permitidos
+    
+    def _validar_datos(self, df: pd.DataFrame) -> pd.DataFrame:
         """Validar datos según reglas configuradas"""
         config_validacion = self.configuracion_final['validacion_datos']
-        df_limpio = df.copy()
+        
+        # Todas las reglas se combinan en una máscara y se filtra una sola vez
+        mascara = np.ones(len(df), dtype=bool)
         
         # Validar rangos numéricos
         for columna, rango in config_validacion['rangos_numericos'].items():
             if columna in df.columns and df[columna].dtype in ['int64', 'float64']:
+                valores = df[columna].to_numpy()
                 if 'min' in rango:
-                    df_limpio = df_limpio[df_limpio[columna] >= rango['min']]
+                    mascara &= valores >= rango['min']
                 if 'max' in rango:
-                    df_limpio = df_limpio[df_limpio[columna] <= rango['max']]
+                    mascara &= valores <= rango['max']
         
         # Validar valores permitidos
-        for columna, valores in config_validacion['valores_permitidos'].items():
+        for columna, valores in self._obtener_valores_permitidos().items():
             if columna in df.columns:
-                df_limpio = df_limpio[df_limpio[columna].isin(valores)]
+                mascara &= df[columna].isin(valores).to_numpy()
         
         # Validar longitud de texto
         for columna, longitud in config_validacion['longitud_texto'].items():
             if columna in df.columns and df[columna].dtype == 'object':
+                # NaN en la longitud (valores no texto) no cumple ninguna regla
+                longitudes = df[columna].str.len().to_numpy(dtype=np.float64, na_value=np.nan)
                 if 'min' in longitud:
-                    df_limpio = df_limpio[df_limpio[columna].str.len() >= longitud['min']]
+                    mascara &= longitudes >= longitud['min']
                 if 'max' in longitud:
-                    df_limpio = df_limpio[df_limpio[columna].str.len() <= longitud['max']]
+                    mascara &= longitudes <= longitud['max']
+        
+        df_limpio = df if mascara.all() else df[mascara]
         
         self.logger.info("Validación de datos aplicada")
         return df_limpio
@@ -2,13 +2,24 @@
 Helpers del Pipeline - Utilidades
 Funciones auxiliares para el pipeline de procesamiento de datos
 """
+import re
 import pandas as pd
 import numpy as np
 from typing import Dict, Any, List, Optional
 from datetime import datetime
+from pathlib import Path
+import jinja2
 import structlog
 
 
+# Caracteres que normalizar_texto elimina (todo salvo letras, números y espacios)
+_PATRON_CARACTERES_ESPECIALES = re.compile(r'[^a-zA-Z0-9\s]')
+
+
+# Proporción de valores distintos por debajo de la cual el texto pasa a category
+_UMBRAL_CARDINALIDAD_CATEGORIA = 0.5
+
+
 def calcular_metricas_calidad(datos: List[Dict[str, Any]]) -> Dict[str, float]:
     """
     Calcular métricas de calidad de los datos
@@ -28,19 +39,39 @@ def calcular_metricas_calidad(datos: List[Dict[str, Any]]) -> Dict[str, float]:
         }
     
     df = pd.DataFrame(datos)
+    return _calcular_metricas_df(df, _escanear_dataframe(df))
+
+
+def _escanear_dataframe(df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Recorrer el DataFrame una vez para los conteos que comparten las métricas
     
+    Args:
+        df: DataFrame a analizar
+        
+    Returns:
+        Diccionario con nulos por columna y número de filas duplicadas
+    """
+    return {
+        'nulos_por_columna': df.isnull().sum(),
+        'registros_duplicados': df.duplicated().sum()
+    }
+
+
+def _calcular_metricas_df(df: pd.DataFrame, escaneo: Dict[str, Any]) -> Dict[str, float]:
+    """Calcular métricas de calidad a partir de un escaneo ya realizado"""
     # Completitud: porcentaje de valores no nulos
     total_celdas = df.size
-    celdas_nulas = df.isnull().sum().sum()
+    celdas_nulas = escaneo['nulos_por_columna'].sum()
     completitud = ((total_celdas - celdas_nulas) / total_celdas) * 100 if total_celdas > 0 else 0
     
     # Consistencia: porcentaje de registros sin duplicados
-    registros_duplicados = df.duplicated().sum()
+    registros_duplicados = escaneo['registros_duplicados']
     total_registros = len(df)
     consistencia = ((total_registros - registros_duplicados) / total_registros) * 100 if total_registros > 0 else 0
     
     # Precisión: métrica basada en tipos de datos y rangos
-    precision = _calcular_precision_datos(df)
+    precision = _calcular_precision_datos(df, escaneo['nulos_por_columna'])
     
     return {
         'completitud': round(completitud, 2),
@@ -52,12 +83,13 @@ def calcular_metricas_calidad(datos: List[Dict[str, Any]]) -> Dict[str, float]:
     }
 
 
-def _calcular_precision_datos(df: pd.DataFrame) -> float:
+def _calcular_precision_datos(df: pd.DataFrame, nulos_por_columna: Optional[pd.Series] = None) -> float:
     """
     Calcular precisión de los datos basada en tipos y rangos
     
     Args:
         df: DataFrame a analizar
+        nulos_por_columna: Conteo de nulos ya calculado; se calcula si es None
         
     Returns:
         Puntuación de precisión (0-100)
@@ -68,11 +100,14 @@ def _calcular_precision_datos(df: pd.DataFrame) -> float:
     if total_columnas == 0:
         return 0.0
     
-    for columna in df.columns:
+    if nulos_por_columna is None:
+        nulos_por_columna = df.isnull().sum()
+    
+    for columna, nulos in zip(df.columns, nulos_por_columna.to_numpy()):
         col_puntuacion = 0
         
         # Verificar si la columna tiene datos
-        if df[columna].notna().sum() == 0:
+        if nulos == len(df):
             continue
         
         # Verificar consistencia de tipos
@@ -91,7 +126,7 @@ def _calcular_precision_datos(df: pd.DataFrame) -> float:
                 col_puntuacion += 1
         
         # Verificar que no haya valores nulos inesperados
-        if df[columna].isnull().sum() / len(df) < 0.5:  # Menos del 50% nulos
+        if nulos / len(df) < 0.5:  # Menos del 50% nulos
             col_puntuacion += 1
         
         puntuacion += col_puntuacion
@@ -104,8 +139,13 @@ def _tiene_outliers_extremos(serie: pd.Series) -> bool:
     if serie.dtype not in ['int64', 'float64']:
         return False
     
-    Q1 = serie.quantile(0.25)
-    Q3 = serie.quantile(0.75)
+    # Reducciones NumPy sobre el array sin NaN, sin el despacho de Series
+    valores = serie.to_numpy(dtype=np.float64)
+    valores = valores[~np.isnan(valores)]
+    if valores.size == 0:
+        return False
+    
+    Q1, Q3 = np.percentile(valores, [25, 75])
     IQR = Q3 - Q1
     
     if IQR == 0:
@@ -114,19 +154,18 @@ def _tiene_outliers_extremos(serie: pd.Series) -> bool:
     limite_inferior = Q1 - 3 * IQR
     limite_superior = Q3 + 3 * IQR
     
-    return (serie < limite_inferior).any() or (serie > limite_superior).any()
+    return bool(valores.min() < limite_inferior or valores.max() > limite_superior)
 
 
 def _es_texto_consistente(serie: pd.Series) -> bool:
     """Verificar si una serie de texto es consistente"""
-    # Verificar que no haya mezcla de tipos
-    valores_unicos = serie.dropna().unique()
-    
-    if len(valores_unicos) == 0:
+    # Los dtypes de texto de pandas/Arrow solo pueden contener strings
+    if isinstance(serie.dtype, pd.StringDtype):
         return True
     
-    # Verificar que todos los valores sean strings
-    return all(isinstance(v, str) for v in valores_unicos)
+    # infer_dtype recorre la serie en C: 'string' si todos los valores no nulos
+    # son strings, 'empty' si no hay ninguno
+    return pd.api.types.infer_dtype(serie, skipna=True) in ('string', 'empty')
 
 
 def detectar_outliers_iqr(serie: pd.Series, factor: float = 1.5) -> pd.Series:
@@ -161,11 +200,16 @@ def detectar_outliers_zscore(serie: pd.Series, umbral: float = 3.0) -> pd.Series
     Returns:
         Serie booleana indicando outliers
     """
-    if serie.std() == 0:
-        return pd.Series([False] * len(serie), index=serie.index)
+    valores = serie.to_numpy(dtype=np.float64)
+    validos = valores[~np.isnan(valores)]
+    
+    # Con menos de dos valores la desviación no está definida (como Series.std)
+    std = validos.std(ddof=1) if validos.size > 1 else 0.0
+    if std == 0:
+        return pd.Series(np.zeros(len(serie), dtype=bool), index=serie.index)
     
-    z_scores = np.abs((serie - serie.mean()) / serie.std())
-    return z_scores > umbral
+    z_scores = np.abs((valores - validos.mean()) / std)
+    return pd.Series(z_scores > umbral, index=serie.index)
 
 
 def normalizar_texto(texto: str) -> str:
@@ -188,8 +232,7 @@ def normalizar_texto(texto: str) -> str:
     texto = ' '.join(texto.split())
     
     # Eliminar caracteres especiales (mantener letras, números y espacios)
-    import re
-    texto = re.sub(r'[^a-zA-Z0-9\s]', '', texto)
+    texto = _PATRON_CARACTERES_ESPECIALES.sub('', texto)
     
     return texto
 
@@ -200,7 +243,8 @@ def convertir_tipos_datos(df: pd.DataFrame, configuracion: Dict[str, str]) -> pd
     
     Args:
         df: DataFrame a convertir
-        configuracion: Diccionario con mapeo columna -> tipo
+        configuracion: Diccionario con mapeo columna -> tipo. El tipo 'auto'
+            elige el tipo más compacto que conserva los valores
         
     Returns:
         DataFrame con tipos convertidos
@@ -216,6 +260,8 @@ def convertir_tipos_datos(df: pd.DataFrame, configuracion: Dict[str, str]) -> pd
                     df_convertido[columna] = pd.to_numeric(df_convertido[columna], errors='coerce')
                 elif tipo == 'category':
                     df_convertido[columna] = df_convertido[columna].astype('category')
+                elif tipo == 'auto':
+                    df_convertido[columna] = _convertir_tipo_compacto(df_convertido[columna])
                 else:
                     df_convertido[columna] = df_convertido[columna].astype(tipo)
             except Exception as e:
@@ -224,6 +270,26 @@ def convertir_tipos_datos(df: pd.DataFrame, configuracion: Dict[str, str]) -> pd
     return df_convertido
 
 
+def _convertir_tipo_compacto(serie: pd.Series) -> pd.Series:
+    """
+    Convertir una serie al tipo más compacto sin perder valores
+    
+    El texto de baja cardinalidad pasa a category y el resto a string de
+    Arrow; los enteros se reducen al menor tamaño que los contiene. Los
+    flotantes se mantienen para no perder precisión.
+    """
+    if pd.api.types.is_integer_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        return pd.to_numeric(serie, downcast='integer')
+    
+    if serie.dtype == 'object' and len(serie) > 0:
+        if serie.nunique() < len(serie) * _UMBRAL_CARDINALIDAD_CATEGORIA:
+            return serie.astype('category')
+        if pd.api.types.infer_dtype(serie, skipna=True) == 'string':
+            return serie.astype('string[pyarrow]')
+    
+    return serie
+
+
 def calcular_estadisticas_resumen(df: pd.DataFrame) -> Dict[str, Any]:
     """
     Calcular estadísticas resumen del DataFrame
@@ -234,6 +300,14 @@ def calcular_estadisticas_resumen(df: pd.DataFrame) -> Dict[str, Any]:
     Returns:
         Diccionario con estadísticas resumen
     """
+    return _calcular_estadisticas_df(df, _escanear_dataframe(df))
+
+
+def _calcular_estadisticas_df(df: pd.DataFrame, escaneo: Dict[str, Any]) -> Dict[str, Any]:
+    """Calcular estadísticas resumen a partir de un escaneo ya realizado"""
+    nulos_por_columna = escaneo['nulos_por_columna']
+    registros_duplicados = escaneo['registros_duplicados']
+    
     return {
         'informacion_general': {
             'total_registros': len(df),
@@ -242,15 +316,75 @@ def calcular_estadisticas_resumen(df: pd.DataFrame) -> Dict[str, Any]:
             'tipos_datos': df.dtypes.value_counts().to_dict()
         },
         'calidad_datos': {
-            'valores_nulos': df.isnull().sum().to_dict(),
-            'porcentaje_nulos': (df.isnull().sum() / len(df) * 100).to_dict(),
-            'valores_duplicados': df.duplicated().sum(),
-            'porcentaje_duplicados': (df.duplicated().sum() / len(df) * 100)
+            'valores_nulos': nulos_por_columna.to_dict(),
+            'porcentaje_nulos': (nulos_por_columna / len(df) * 100).to_dict(),
+            'valores_duplicados': registros_duplicados,
+            'porcentaje_duplicados': (registros_duplicados / len(df) * 100)
         },
         'estadisticas_numericas': df.describe().to_dict() if len(df.select_dtypes(include=[np.number]).columns) > 0 else {}
     }
 
 
+# Plantilla del reporte de calidad, compilada una vez al importar el módulo.
+# autoescape escapa los valores interpolados en el HTML
+_PLANTILLA_REPORTE = jinja2.Environment(autoescape=True).from_string("""<!DOCTYPE html>
+<html>
+<head>
+    <title>Reporte de Calidad de Datos</title>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 40px; }
+        .header { background-color: #f4f4f4; padding: 20px; border-radius: 5px; }
+        .metric { margin: 20px 0; padding: 15px; border-left: 4px solid #007acc; }
+        .metric h3 { margin-top: 0; color: #007acc; }
+        .value { font-size: 24px; font-weight: bold; color: #333; }
+        .table { width: 100%; border-collapse: collapse; margin: 20px 0; }
+        .table th, .table td { border: 1px solid #ddd; padding: 8px; text-align: left; }
+        .table th { background-color: #f2f2f2; }
+    </style>
+</head>
+<body>
+    <div class="header">
+        <h1>Reporte de Calidad de Datos</h1>
+        <p>Generado el: {{ fecha_generacion }}</p>
+    </div>
+
+    <div class="metric">
+        <h3>Completitud</h3>
+        <div class="value">{{ metricas.completitud }}%</div>
+        <p>Porcentaje de valores no nulos en el dataset</p>
+    </div>
+
+    <div class="metric">
+        <h3>Consistencia</h3>
+        <div class="value">{{ metricas.consistencia }}%</div>
+        <p>Porcentaje de registros únicos (sin duplicados)</p>
+    </div>
+
+    <div class="metric">
+        <h3>Precisión</h3>
+        <div class="value">{{ metricas.precision }}%</div>
+        <p>Puntuación de precisión basada en tipos y rangos</p>
+    </div>
+
+    <h2>Información General</h2>
+    <table class="table">
+        <tr><th>Métrica</th><th>Valor</th></tr>
+        <tr><td>Total de Registros</td><td>{{ estadisticas.informacion_general.total_registros }}</td></tr>
+        <tr><td>Total de Columnas</td><td>{{ estadisticas.informacion_general.total_columnas }}</td></tr>
+        <tr><td>Uso de Memoria (MB)</td><td>{{ '%.2f'|format(estadisticas.informacion_general.memoria_uso_mb) }}</td></tr>
+    </table>
+
+    <h2>Calidad de Datos</h2>
+    <table class="table">
+        <tr><th>Métrica</th><th>Valor</th></tr>
+        <tr><td>Registros Duplicados</td><td>{{ estadisticas.calidad_datos.valores_duplicados }}</td></tr>
+        <tr><td>% Duplicados</td><td>{{ '%.2f'|format(estadisticas.calidad_datos.porcentaje_duplicados) }}%</td></tr>
+    </table>
+</body>
+</html>
+""")
+
+
 def generar_reporte_calidad(datos: List[Dict[str, Any]], nombre_archivo: str = "reporte_calidad") -> str:
     """
     Generar reporte de calidad de datos
@@ -265,74 +399,22 @@ def generar_reporte_calidad(datos: List[Dict[str, Any]], nombre_archivo: str = "
     logger = structlog.get_logger()
     
     try:
-        # Calcular métricas
-        metricas = calcular_metricas_calidad(datos)
+        # Calcular métricas y estadísticas sobre un único DataFrame y escaneo
         df = pd.DataFrame(datos)
-        estadisticas = calcular_estadisticas_resumen(df)
+        escaneo = _escanear_dataframe(df)
+        metricas = _calcular_metricas_df(df, escaneo) if datos else calcular_metricas_calidad(datos)
+        estadisticas = _calcular_estadisticas_df(df, escaneo)
         
-        # Crear reporte HTML
-        reporte_html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Reporte de Calidad de Datos</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 40px; }}
-                .header {{ background-color: #f4f4f4; padding: 20px; border-radius: 5px; }}
-                .metric {{ margin: 20px 0; padding: 15px; border-left: 4px solid #007acc; }}
-                .metric h3 {{ margin-top: 0; color: #007acc; }}
-                .value {{ font-size: 24px; font-weight: bold; color: #333; }}
-                .table {{ width: 100%; border-collapse: collapse; margin: 20px 0; }}
-                .table th, .table td {{ border: 1px solid #ddd; padding: 8px; text-align: left; }}
-                .table th {{ background-color: #f2f2f2; }}
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>Reporte de Calidad de Datos</h1>
-                <p>Generado el: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-            </div>
-            
-            <div class="metric">
-                <h3>Completitud</h3>
-                <div class="value">{metricas['completitud']}%</div>
-                <p>Porcentaje de valores no nulos en el dataset</p>
-            </div>
-            
-            <div class="metric">
-                <h3>Consistencia</h3>
-                <div class="value">{metricas['consistencia']}%</div>
-                <p>Porcentaje de registros únicos (sin duplicados)</p>
-            </div>
-            
-            <div class="metric">
-                <h3>Precisión</h3>
-                <div class="value">{metricas['precision']}%</div>
-                <p>Puntuación de precisión basada en tipos y rangos</p>
-            </div>
-            
-            <h2>Información General</h2>
-            <table class="table">
-                <tr><th>Métrica</th><th>Valor</th></tr>
-                <tr><td>Total de Registros</td><td>{estadisticas['informacion_general']['total_registros']}</td></tr>
-                <tr><td>Total de Columnas</td><td>{estadisticas['informacion_general']['total_columnas']}</td></tr>
-                <tr><td>Uso de Memoria (MB)</td><td>{estadisticas['informacion_general']['memoria_uso_mb']:.2f}</td></tr>
-            </table>
-            
-            <h2>Calidad de Datos</h2>
-            <table class="table">
-                <tr><th>Métrica</th><th>Valor</th></tr>
-                <tr><td>Registros Duplicados</td><td>{estadisticas['calidad_datos']['valores_duplicados']}</td></tr>
-                <tr><td>% Duplicados</td><td>{estadisticas['calidad_datos']['porcentaje_duplicados']:.2f}%</td></tr>
-            </table>
-        </body>
-        </html>
-        """
+        # Renderizar la plantilla precompilada
+        reporte_html = _PLANTILLA_REPORTE.render(
+            fecha_generacion=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            metricas=metricas,
+            estadisticas=estadisticas
+        )
         
         # Guardar reporte
         ruta_archivo = f"{nombre_archivo}.html"
-        with open(ruta_archivo, 'w', encoding='utf-8') as f:
-            f.write(reporte_html)
+        Path(ruta_archivo).write_text(reporte_html, encoding='utf-8')
         
         logger.info(f"Reporte de calidad generado: {ruta_archivo}")
         return ruta_archivo
@@ -0,0 +1,87 @@
+"""
+Caché de Resultados - Capa de Aplicación
+Caché LRU en memoria con expiración por TTL para los servicios NLP
+"""
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+
+class CacheResultados:
+    """
+    Caché LRU con tiempo de vida para resultados de análisis
+    Las operaciones no ceden el control al event loop, por lo que son
+    atómicas dentro de una corrutina
+    """
+    
+    def __init__(self, ttl: float, tamano_maximo: int):
+        """
+        Inicializar caché
+        
+        Args:
+            ttl: Tiempo de vida de cada entrada en segundos
+            tamano_maximo: Número máximo de entradas
+        """
+        self.ttl = ttl
+        self.tamano_maximo = tamano_maximo
+        self._entradas: "OrderedDict[Tuple[str, str, str], Tuple[float, Any]]" = OrderedDict()
+    
+    @staticmethod
+    def generar_clave(algoritmo: str, idioma: str, texto: str) -> Tuple[str, str, str]:
+        """
+        Generar clave de caché para un texto
+        
+        Args:
+            algoritmo: Nombre del algoritmo
+            idioma: Idioma del texto
+            texto: Texto analizado
+            
+        Returns:
+            Tupla (algoritmo, idioma, hash del texto)
+        """
+        huella = hashlib.blake2b(texto.encode("utf-8"), digest_size=16).hexdigest()
+        return algoritmo, idioma, huella
+    
+    def obtener(self, clave: Tuple[str, str, str]) -> Optional[Any]:
+        """
+        Obtener un valor si existe y no ha expirado
+        
+        Args:
+            clave: Clave de caché
+            
+        Returns:
+            Valor almacenado o None
+        """
+        entrada = self._entradas.get(clave)
+        if entrada is None:
+            return None
+        
+        expiracion, valor = entrada
+        if expiracion < time.monotonic():
+            del self._entradas[clave]
+            return None
+        
+        self._entradas.move_to_end(clave)
+        return valor
+    
+    def guardar(self, clave: Tuple[str, str, str], valor: Any) -> None:
+        """
+        Guardar un valor, desalojando el menos usado si se supera el tamaño
+        
+        Args:
+            clave: Clave de caché
+            valor: Valor a almacenar
+        """
+        self._entradas[clave] = (time.monotonic() + self.ttl, valor)
+        self._entradas.move_to_end(clave)
+        
+        while len(self._entradas) > self.tamano_maximo:
+            self._entradas.popitem(last=False)
+    
+    def limpiar(self) -> None:
+        """Eliminar todas las entradas"""
+        self._entradas.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entradas)
@@ -0,0 +1,77 @@
+"""
+Procesamiento en Cola - Capa de Aplicación
+Grupo fijo de trabajadores alimentado por una cola acotada
+"""
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, List, Tuple, TypeVar, Union
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+async def procesar_en_cola(
+    elementos: Iterable[T],
+    procesar: Callable[[T], Awaitable[R]],
+    num_trabajadores: int
+) -> AsyncIterator[Tuple[int, Union[R, Exception]]]:
+    """
+    Procesar elementos con un número fijo de trabajadores
+    Solo hay O(num_trabajadores) elementos en vuelo y los resultados se
+    entregan en cuanto terminan, junto a su índice original
+    
+    Args:
+        elementos: Elementos a procesar
+        procesar: Corrutina que procesa un elemento
+        num_trabajadores: Número de trabajadores concurrentes
+    
+    Yields:
+        Tuplas (índice, resultado); los errores se entregan como la excepción
+    """
+    num_trabajadores = max(1, num_trabajadores)
+    entrada: asyncio.Queue = asyncio.Queue(maxsize=2 * num_trabajadores)
+    salida: asyncio.Queue = asyncio.Queue(maxsize=2 * num_trabajadores)
+    
+    errores_productor: List[Exception] = []
+    
+    async def _productor() -> None:
+        try:
+            for indice, elemento in enumerate(elementos):
+                await entrada.put((indice, elemento))
+        except Exception as e:
+            # Un fallo del iterable se propaga al consumidor tras vaciar la cola
+            errores_productor.append(e)
+        
+        # Una marca de fin por trabajador
+        for _ in range(num_trabajadores):
+            await entrada.put(None)
+    
+    async def _trabajador() -> None:
+        while (item := await entrada.get()) is not None:
+            indice, elemento = item
+            try:
+                resultado: Any = await procesar(elemento)
+            except Exception as e:
+                resultado = e
+            await salida.put((indice, resultado))
+        await salida.put(None)
+    
+    tareas = [asyncio.create_task(_productor())]
+    tareas.extend(asyncio.create_task(_trabajador()) for _ in range(num_trabajadores))
+    
+    try:
+        activos = num_trabajadores
+        while activos:
+            item = await salida.get()
+            if item is None:
+                activos -= 1
+            else:
+                yield item
+        
+        if errores_productor:
+            raise errores_productor[0]
+    finally:
+        # Si el consumidor abandona la iteración no quedan tareas colgadas
+        for tarea in tareas:
+            tarea.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
@@ -3,12 +3,20 @@ Servicio de Extracción de Entidades - Capa de Aplicación
 Servicio principal para extracción de entidades nombradas
 """
 import asyncio
-from typing import Dict, Any, List, Optional, Tuple
+import copy
+import heapq
+import logging
+from contextlib import aclosing
+from operator import itemgetter
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, Iterable, List, Optional, Tuple, Union
+import numpy as np
 import structlog
 from datetime import datetime
 
-from dominio.entidades.entidad_nombrada import EntidadNombrada, TipoEntidad
+from dominio.entidades.entidad_nombrada import EntidadNombrada, EntidadBatch, TipoEntidad
 from dominio.algoritmos.algoritmo_entidades import AlgoritmoEntidades
+from .cache_resultados import CacheResultados
+from .procesamiento_cola import procesar_en_cola
 from ...utilidades.decoradores.decorador_logging import logging_metodo
 from ...utilidades.decoradores.decorador_validacion import validar_parametros
 
@@ -32,13 +40,18 @@ class ServicioEntidades:
         # Algoritmos disponibles
         self.algoritmos: Dict[str, AlgoritmoEntidades] = {}
         
+        # Rutas especializadas por algoritmo habilitado para llamadas con valores por defecto
+        self._dispatch: Dict[str, Callable[[str, str], Awaitable[List[EntidadNombrada]]]] = {}
+        
         # Configuración por defecto
         self.configuracion_default = {
             "algoritmo_por_defecto": "spacy",
             "algoritmos_habilitados": ["spacy"],
             "cache_habilitado": True,
             "cache_ttl": 3600,  # 1 hora
+            "cache_tamano_maximo": 1000,
             "timeout_extraccion": 30,  # segundos
+            "max_concurrencia": 10,
             "filtro_duplicados": True,
             "umbral_confianza": 0.5,
             "incluir_contexto": True,
@@ -47,6 +60,66 @@ class ServicioEntidades:
         
         # Combinar configuración
         self.configuracion_final = {**self.configuracion_default, **self.configuracion}
+        
+        # Parámetros de uso frecuente y caché de resultados por (algoritmo, idioma, texto)
+        self._cargar_parametros()
+        self._cache = self._crear_cache()
+    
+    def _cargar_parametros(self) -> None:
+        """Copiar a atributos los parámetros que se consultan en cada llamada"""
+        self._algoritmo_default = self.configuracion_final["algoritmo_por_defecto"]
+        self._habilitados = frozenset(self.configuracion_final["algoritmos_habilitados"])
+        self._timeout = self.configuracion_final["timeout_extraccion"]
+        self._umbral = self.configuracion_final["umbral_confianza"]
+        self._filtrar_dup = self.configuracion_final["filtro_duplicados"]
+        self._cache_habilitado = self.configuracion_final["cache_habilitado"]
+        self._compilar_rutas_rapidas()
+    
+    def _compilar_rutas_rapidas(self) -> None:
+        """Reconstruir las rutas especializadas tras registrar algoritmos o cambiar la configuración"""
+        self._dispatch = {
+            nombre: self._compilar_ruta_rapida(nombre, algoritmo_instancia)
+            for nombre, algoritmo_instancia in self.algoritmos.items()
+            if nombre in self._habilitados
+        }
+    
+    def _compilar_ruta_rapida(
+        self, 
+        nombre: str, 
+        algoritmo_instancia: AlgoritmoEntidades
+    ) -> Callable[[str, str], Awaitable[List[EntidadNombrada]]]:
+        """
+        Crear la extracción de un algoritmo ya validado con la configuración actual
+        
+        Args:
+            nombre: Nombre del algoritmo
+            algoritmo_instancia: Instancia del algoritmo
+        
+        Returns:
+            Corrutina (texto, idioma) -> entidades filtradas
+        """
+        # Variables locales del cierre en lugar de búsquedas en self por llamada
+        extraer_fast = self._extraer_fast
+        filtrar_entidades = self._filtrar_entidades
+        umbral_confianza = self._umbral
+        
+        async def _extraer_default(texto: str, idioma: str) -> List[EntidadNombrada]:
+            entidades = await extraer_fast(texto, idioma, nombre, algoritmo_instancia)
+            return filtrar_entidades(entidades, None, umbral_confianza)
+        
+        return _extraer_default
+    
+    def _crear_cache(self) -> CacheResultados:
+        """
+        Crear la caché de resultados según la configuración
+        
+        Returns:
+            Caché vacía
+        """
+        return CacheResultados(
+            ttl=self.configuracion_final["cache_ttl"],
+            tamano_maximo=self.configuracion_final["cache_tamano_maximo"]
+        )
     
     def registrar_algoritmo(self, nombre: str, algoritmo: AlgoritmoEntidades) -> None:
         """
@@ -57,6 +130,7 @@ class ServicioEntidades:
             algoritmo: Instancia del algoritmo
         """
         self.algoritmos[nombre] = algoritmo
+        self._compilar_rutas_rapidas()
         self.logger.info(f"Algoritmo de entidades registrado: {nombre}")
     
     def obtener_algoritmo(self, nombre: str) -> Optional[AlgoritmoEntidades]:
@@ -110,58 +184,105 @@ class ServicioEntidades:
             
             # Usar configuración por defecto si no se especifica
             if algoritmo is None:
-                algoritmo = self.configuracion_final["algoritmo_por_defecto"]
+                algoritmo = self._algoritmo_default
             
-            if umbral_confianza is None:
-                umbral_confianza = self.configuracion_final["umbral_confianza"]
+            # Con tipos y umbral por defecto se usa la ruta ya especializada
+            ruta_rapida = None
+            if tipos_entidades is None and umbral_confianza is None:
+                ruta_rapida = self._dispatch.get(algoritmo)
             
-            # Obtener algoritmo
-            algoritmo_instancia = self.obtener_algoritmo(algoritmo)
-            if not algoritmo_instancia:
-                raise ValueError(f"Algoritmo no encontrado: {algoritmo}")
+            if ruta_rapida is None:
+                if umbral_confianza is None:
+                    umbral_confianza = self._umbral
+                
+                algoritmo_instancia = self._resolver_algoritmo(algoritmo)
             
-            # Verificar si está habilitado
-            if algoritmo not in self.configuracion_final["algoritmos_habilitados"]:
-                raise ValueError(f"Algoritmo no habilitado: {algoritmo}")
+            # Evitar construir el preview y los campos si INFO está filtrado
+            registrar_info = self._info_habilitado()
             
-            self.logger.info(
-                "Iniciando extracción de entidades",
-                texto_preview=texto[:100] + "..." if len(texto) > 100 else texto,
-                idioma=idioma,
-                algoritmo=algoritmo
-            )
+            if registrar_info:
+                self.logger.info(
+                    "Iniciando extracción de entidades",
+                    texto_preview=texto[:100] + "..." if len(texto) > 100 else texto,
+                    idioma=idioma,
+                    algoritmo=algoritmo
+                )
             
-            # Ejecutar extracción con timeout
-            timeout = self.configuracion_final["timeout_extraccion"]
-            entidades = await asyncio.wait_for(
-                algoritmo_instancia.extraer(texto, idioma),
-                timeout=timeout
-            )
+            if ruta_rapida is not None:
+                entidades = await ruta_rapida(texto, idioma)
+            else:
+                entidades = await self._extraer_fast(texto, idioma, algoritmo, algoritmo_instancia)
+                
+                entidades = self._filtrar_entidades(
+                    entidades, tipos_entidades, umbral_confianza
+                )
             
-            # Filtrar por tipos si se especifica
-            if tipos_entidades:
-                entidades = [
-                    entidad for entidad in entidades
-                    if entidad.tipo.value in tipos_entidades
-                ]
+            if registrar_info:
+                self.logger.info(
+                    "Extracción de entidades completada",
+                    entidades_encontradas=len(entidades),
+                    tipos_unicos=len(set(entidad.tipo for entidad in entidades))
+                )
             
-            # Filtrar por confianza
-            entidades = [
-                entidad for entidad in entidades
-                if entidad.confianza >= umbral_confianza
-            ]
+            return entidades
             
-            # Filtrar duplicados si está habilitado
-            if self.configuracion_final["filtro_duplicados"]:
-                entidades = algoritmo_instancia._filtrar_entidades_duplicadas(entidades)
+        except asyncio.TimeoutError:
+            self.logger.error(f"Timeout en extracción de entidades: {algoritmo}")
+            raise ValueError(f"Timeout en extracción de entidades con {algoritmo}")
+        
+        except Exception as e:
+            self.logger.error(f"Error en extracción de entidades: {str(e)}")
+            raise
+    
+    @logging_metodo(nombre_logger="servicio_entidades", incluir_tiempo=True)
+    async def extraer_entidades_doc(
+        self, 
+        doc: Any, 
+        idioma: str = "es",
+        algoritmo: Optional[str] = None,
+        tipos_entidades: Optional[List[str]] = None,
+        umbral_confianza: Optional[float] = None
+    ) -> List[EntidadNombrada]:
+        """
+        Extraer entidades de un documento ya procesado
+        Permite reutilizar el mismo Doc de spaCy en varios análisis y procesar
+        el texto una sola vez; no usa la caché porque el resultado depende del
+        pipeline que produjo el documento
+        
+        Args:
+            doc: Documento procesado (p. ej. spacy.tokens.Doc)
+            idioma: Idioma del texto
+            algoritmo: Algoritmo específico a usar (opcional)
+            tipos_entidades: Tipos de entidades a extraer (opcional)
+            umbral_confianza: Umbral mínimo de confianza
             
-            self.logger.info(
-                "Extracción de entidades completada",
-                entidades_encontradas=len(entidades),
-                tipos_unicos=len(set(entidad.tipo for entidad in entidades))
-            )
+        Returns:
+            Lista de entidades extraídas
+        """
+        if algoritmo is None:
+            algoritmo = self._algoritmo_default
+        
+        try:
+            if not doc.text.strip():
+                raise ValueError("El texto no puede estar vacío")
             
-            return entidades
+            if umbral_confianza is None:
+                umbral_confianza = self._umbral
+            
+            algoritmo_instancia = self._resolver_algoritmo(algoritmo)
+            if not algoritmo_instancia.soporta_doc:
+                raise ValueError(f"El algoritmo {algoritmo} no admite documentos procesados")
+            
+            # Construcción de las entidades en un hilo para no bloquear el event loop
+            extraccion = asyncio.to_thread(algoritmo_instancia.extraer_doc, doc, idioma)
+            
+            # Un timeout no positivo desactiva wait_for y su temporizador
+            if self._timeout and self._timeout > 0:
+                entidades = await asyncio.wait_for(extraccion, timeout=self._timeout)
+            else:
+                entidades = await extraccion
+            
+            return self._filtrar_entidades(entidades, tipos_entidades, umbral_confianza)
             
         except asyncio.TimeoutError:
             self.logger.error(f"Timeout en extracción de entidades: {algoritmo}")
@@ -193,25 +314,44 @@ class ServicioEntidades:
         """
         self.logger.info(f"Iniciando extracción de lote: {len(textos)} textos")
         
-        # Procesar en paralelo
-        tareas = [
-            self.extraer_entidades(texto, idioma, algoritmo, tipos_entidades)
-            for texto in textos
-        ]
-        
-        resultados = await asyncio.gather(*tareas, return_exceptions=True)
+        # El algoritmo se valida una sola vez para todo el lote
+        nombre_algoritmo = algoritmo or self._algoritmo_default
+        try:
+            algoritmo_instancia = self._resolver_algoritmo(nombre_algoritmo)
+        except ValueError as e:
+            self.logger.error(f"Error en extracción de lote: {str(e)}")
+            return [[] for _ in textos]
+        
+        # Conjunto de tipos construido una vez para todos los textos
+        if tipos_entidades:
+            tipos_entidades = frozenset(tipos_entidades)
+        
+        # Ruta por lotes: una sola pasada del modelo para todos los textos
+        if algoritmo_instancia.soporta_lote:
+            try:
+                return await self._extraer_entidades_lote_batch(
+                    textos, idioma, nombre_algoritmo, algoritmo_instancia, tipos_entidades
+                )
+            except Exception as e:
+                self.logger.error(f"Error en extracción por lotes, procesando texto a texto: {str(e)}")
+        
+        # Procesar texto a texto con un grupo fijo de trabajadores
+        async def _extraer_texto(texto: str) -> List[EntidadNombrada]:
+            return await self._extraer_filtrado(
+                texto, idioma, nombre_algoritmo, algoritmo_instancia, tipos_entidades
+            )
         
-        # Filtrar errores
-        resultados_validos = []
+        # Los errores conservan una lista vacía en su posición
+        resultados_validos: List[List[EntidadNombrada]] = [[] for _ in textos]
         errores = 0
+        num_trabajadores = min(self.configuracion_final["max_concurrencia"], len(textos))
         
-        for i, resultado in enumerate(resultados):
+        async for i, resultado in procesar_en_cola(textos, _extraer_texto, num_trabajadores):
             if isinstance(resultado, Exception):
                 self.logger.error(f"Error en texto {i}: {str(resultado)}")
                 errores += 1
-                resultados_validos.append([])
             else:
-                resultados_validos.append(resultado)
+                resultados_validos[i] = resultado
         
         self.logger.info(
             f"Extracción de lote completada: {len(resultados_validos)} exitosos, {errores} errores"
@@ -219,6 +359,298 @@ class ServicioEntidades:
         
         return resultados_validos
     
+    async def extraer_entidades_stream(
+        self, 
+        textos: Iterable[str], 
+        idioma: str = "es",
+        algoritmo: Optional[str] = None,
+        tipos_entidades: Optional[List[str]] = None
+    ) -> AsyncIterator[Tuple[int, List[EntidadNombrada]]]:
+        """
+        Extraer entidades de múltiples textos entregando cada resultado al terminar
+        
+        Args:
+            textos: Textos a analizar (puede ser un iterable perezoso)
+            idioma: Idioma de los textos
+            algoritmo: Algoritmo específico a usar
+            tipos_entidades: Tipos de entidades a extraer
+        
+        Yields:
+            Tuplas (índice del texto, entidades) en orden de finalización;
+            los textos con error entregan una lista vacía
+        
+        Raises:
+            ValueError: Si el algoritmo no existe o no está habilitado
+        """
+        nombre_algoritmo = algoritmo or self._algoritmo_default
+        algoritmo_instancia = self._resolver_algoritmo(nombre_algoritmo)
+        
+        if tipos_entidades:
+            tipos_entidades = frozenset(tipos_entidades)
+        
+        async def _extraer_texto(texto: str) -> List[EntidadNombrada]:
+            return await self._extraer_filtrado(
+                texto, idioma, nombre_algoritmo, algoritmo_instancia, tipos_entidades
+            )
+        
+        num_trabajadores = self.configuracion_final["max_concurrencia"]
+        
+        # aclosing detiene los trabajadores aunque el consumidor abandone la iteración
+        async with aclosing(procesar_en_cola(textos, _extraer_texto, num_trabajadores)) as resultados:
+            async for i, resultado in resultados:
+                if isinstance(resultado, Exception):
+                    self.logger.error(f"Error en texto {i}: {str(resultado)}")
+                    resultado = []
+                yield i, resultado
+    
+    async def _extraer_filtrado(
+        self, 
+        texto: str, 
+        idioma: str,
+        nombre_algoritmo: str,
+        algoritmo_instancia: AlgoritmoEntidades,
+        tipos_entidades: Optional[Iterable[str]]
+    ) -> List[EntidadNombrada]:
+        """
+        Extraer y filtrar las entidades de un texto de un lote
+        
+        Args:
+            texto: Texto a analizar
+            idioma: Idioma del texto
+            nombre_algoritmo: Nombre del algoritmo
+            algoritmo_instancia: Algoritmo ya resuelto
+            tipos_entidades: Tipos de entidades a extraer
+        
+        Returns:
+            Lista de entidades filtradas
+        
+        Raises:
+            ValueError: Si el texto está vacío o se agota el tiempo
+        """
+        if not texto or not texto.strip():
+            raise ValueError("El texto no puede estar vacío")
+        
+        try:
+            entidades = await self._extraer_fast(texto, idioma, nombre_algoritmo, algoritmo_instancia)
+        except asyncio.TimeoutError:
+            raise ValueError(f"Timeout en extracción de entidades con {nombre_algoritmo}")
+        
+        return self._filtrar_entidades(entidades, tipos_entidades, self._umbral)
+    
+    async def _extraer_entidades_lote_batch(
+        self, 
+        textos: List[str], 
+        idioma: str,
+        nombre_algoritmo: str,
+        algoritmo_instancia: AlgoritmoEntidades,
+        tipos_entidades: Optional[Iterable[str]]
+    ) -> List[List[EntidadNombrada]]:
+        """
+        Extraer entidades de múltiples textos con el lote nativo del algoritmo
+        
+        Args:
+            textos: Lista de textos a analizar
+            idioma: Idioma de los textos
+            nombre_algoritmo: Nombre del algoritmo
+            algoritmo_instancia: Algoritmo con soporte de lotes
+            tipos_entidades: Tipos de entidades a extraer
+        
+        Returns:
+            Lista de listas de entidades por texto
+        """
+        umbral_confianza = self._umbral
+        cache_habilitado = self._cache_habilitado
+        
+        # Los textos vacíos no se procesan y devuelven una lista vacía
+        indices_validos = [i for i, texto in enumerate(textos) if texto and texto.strip()]
+        resultados: List[List[EntidadNombrada]] = [[] for _ in textos]
+        
+        # Solo los textos distintos que no están en caché pasan por el modelo;
+        # los repetidos dentro del lote se procesan una vez
+        entidades_por_texto: Dict[str, List[EntidadNombrada]] = {}
+        pendientes: Dict[str, Optional[Tuple[str, str, str]]] = {}
+        for i in indices_validos:
+            texto = textos[i]
+            if texto in entidades_por_texto or texto in pendientes:
+                continue
+            
+            clave_cache = None
+            if cache_habilitado:
+                clave_cache = CacheResultados.generar_clave(nombre_algoritmo, idioma, texto)
+                entidades = self._cache.obtener(clave_cache)
+                if entidades is not None:
+                    entidades_por_texto[texto] = entidades
+                    continue
+            pendientes[texto] = clave_cache
+        
+        if pendientes:
+            entidades_lote = await algoritmo_instancia.extraer_lote(list(pendientes), idioma)
+            
+            for (texto, clave_cache), entidades in zip(pendientes.items(), entidades_lote):
+                entidades_por_texto[texto] = entidades
+                if cache_habilitado:
+                    self._cache.guardar(clave_cache, entidades)
+        
+        textos_entregados = set()
+        for i in indices_validos:
+            texto = textos[i]
+            entidades = self._filtrar_entidades(
+                entidades_por_texto[texto], tipos_entidades, umbral_confianza
+            )
+            # Cada posición necesita sus propias entidades: las del caché y las de
+            # un texto repetido no deben compartirse con quien modifique el resultado
+            if cache_habilitado or texto in textos_entregados:
+                entidades = [copy.copy(entidad) for entidad in entidades]
+            textos_entregados.add(texto)
+            resultados[i] = entidades
+        
+        errores = len(textos) - len(indices_validos)
+        self.logger.info(
+            f"Extracción de lote completada: {len(indices_validos)} exitosos, {errores} errores"
+        )
+        
+        return resultados
+    
+    def _info_habilitado(self) -> bool:
+        """
+        Indicar si el logger emitirá mensajes de nivel INFO
+        
+        Returns:
+            False solo si el logger confirma que INFO está filtrado
+        """
+        # Solo el BoundLogger de stdlib expone isEnabledFor
+        es_habilitado = getattr(self.logger, "isEnabledFor", None)
+        return es_habilitado is None or es_habilitado(logging.INFO)
+    
+    def _resolver_algoritmo(self, algoritmo: str) -> AlgoritmoEntidades:
+        """
+        Obtener un algoritmo registrado y habilitado
+        
+        Args:
+            algoritmo: Nombre del algoritmo
+        
+        Returns:
+            Instancia del algoritmo
+        
+        Raises:
+            ValueError: Si el algoritmo no existe o no está habilitado
+        """
+        algoritmo_instancia = self.obtener_algoritmo(algoritmo)
+        if not algoritmo_instancia:
+            raise ValueError(f"Algoritmo no encontrado: {algoritmo}")
+        
+        # Verificar si está habilitado
+        if algoritmo not in self._habilitados:
+            raise ValueError(f"Algoritmo no habilitado: {algoritmo}")
+        
+        return algoritmo_instancia
+    
+    async def _extraer_fast(
+        self, 
+        texto: str, 
+        idioma: str,
+        nombre_algoritmo: str,
+        algoritmo_instancia: AlgoritmoEntidades
+    ) -> List[EntidadNombrada]:
+        """
+        Extraer entidades sin decoradores ni validación (entradas ya validadas)
+        
+        Args:
+            texto: Texto a analizar
+            idioma: Idioma del texto
+            nombre_algoritmo: Nombre del algoritmo
+            algoritmo_instancia: Algoritmo ya resuelto
+        
+        Returns:
+            Entidades extraídas sin filtrar
+        """
+        # Consultar caché antes de ejecutar el algoritmo
+        if self._cache_habilitado:
+            clave_cache = CacheResultados.generar_clave(nombre_algoritmo, idioma, texto)
+            entidades = self._cache.obtener(clave_cache)
+            if entidades is not None:
+                return [copy.copy(entidad) for entidad in entidades]
+        
+        if algoritmo_instancia.soporta_sync:
+            # Inferencia en un hilo para no bloquear el event loop
+            extraccion = asyncio.to_thread(algoritmo_instancia.extraer_sync, texto, idioma)
+        else:
+            extraccion = algoritmo_instancia.extraer(texto, idioma)
+        
+        # Un timeout no positivo desactiva wait_for y su temporizador
+        if self._timeout and self._timeout > 0:
+            entidades = await asyncio.wait_for(extraccion, timeout=self._timeout)
+        else:
+            entidades = await extraccion
+        
+        # Quien reciba el resultado no debe modificar las entidades en caché
+        if self._cache_habilitado:
+            self._cache.guardar(clave_cache, entidades)
+            entidades = [copy.copy(entidad) for entidad in entidades]
+        
+        return entidades
+    
+    def _filtrar_entidades(
+        self, 
+        entidades: List[EntidadNombrada],
+        tipos_entidades: Optional[Iterable[str]],
+        umbral_confianza: float
+    ) -> List[EntidadNombrada]:
+        """
+        Aplicar filtros de tipo, confianza y duplicados
+        
+        Args:
+            entidades: Entidades extraídas
+            tipos_entidades: Tipos de entidades a conservar (opcional)
+            umbral_confianza: Umbral mínimo de confianza
+        
+        Returns:
+            Lista de entidades filtradas
+        """
+        # Filtrar por tipos si se especifica
+        if tipos_entidades:
+            tipos = frozenset(tipos_entidades)
+            entidades = [
+                entidad for entidad in entidades
+                if entidad.tipo_value in tipos
+            ]
+        
+        # Filtrar por confianza
+        entidades = [
+            entidad for entidad in entidades
+            if entidad.confianza >= umbral_confianza
+        ]
+        
+        # Filtrar duplicados si está habilitado
+        if self._filtrar_dup:
+            entidades = self._dedup(entidades)
+        
+        return entidades
+    
+    @staticmethod
+    def _dedup(entidades: List[EntidadNombrada]) -> List[EntidadNombrada]:
+        """
+        Eliminar entidades repetidas sobre el mismo tramo en una pasada
+        
+        La deduplicación aproximada por similitud de texto la aplica el
+        algoritmo durante la extracción; aquí solo se descartan repeticiones
+        exactas de (tipo, inicio, fin), conservando la de mayor confianza
+        
+        Args:
+            entidades: Entidades a deduplicar
+        
+        Returns:
+            Lista de entidades sin repeticiones, en orden de primera aparición
+        """
+        vistas: Dict[Tuple[str, int, int], EntidadNombrada] = {}
+        for entidad in entidades:
+            clave = (entidad.tipo_value, entidad.inicio, entidad.fin)
+            previa = vistas.get(clave)
+            if previa is None or entidad.confianza > previa.confianza:
+                vistas[clave] = entidad
+        
+        return list(vistas.values())
+    
     @logging_metodo(nombre_logger="servicio_entidades", incluir_tiempo=True)
     async def obtener_entidades_por_tipo(
         self, 
@@ -243,51 +675,46 @@ class ServicioEntidades:
         return entidades
     
     @logging_metodo(nombre_logger="servicio_entidades", incluir_tiempo=True)
-    async def obtener_estadisticas_entidades(
+    def obtener_estadisticas_entidades(
         self, 
-        entidades: List[EntidadNombrada]
+        entidades: Union[List[EntidadNombrada], EntidadBatch]
     ) -> Dict[str, Any]:
         """
         Obtener estadísticas de una lista de entidades
         
         Args:
-            entidades: Lista de entidades
-            
+            entidades: Lista de entidades o su vista en columnas
+        
         Returns:
             Diccionario con estadísticas
         """
-        if not entidades:
+        if not len(entidades):
             return {}
         
+        lote = self._como_lote(entidades)
+        
         # Estadísticas básicas
-        total_entidades = len(entidades)
+        total_entidades = len(lote)
         
         # Distribución por tipo
-        tipos = {}
-        for entidad in entidades:
-            tipo = entidad.tipo.value
-            tipos[tipo] = tipos.get(tipo, 0) + 1
+        tipos = lote.distribucion_tipos()
         
         # Estadísticas de confianza
-        confianzas = [entidad.confianza for entidad in entidades]
-        confianza_promedio = sum(confianzas) / len(confianzas)
-        confianza_min = min(confianzas)
-        confianza_max = max(confianzas)
+        confianza_promedio = float(lote.confianza.mean())
+        confianza_min = float(lote.confianza.min())
+        confianza_max = float(lote.confianza.max())
         
         # Estadísticas de calidad
-        calidades = [entidad.calidad_extraccion for entidad in entidades]
-        calidad_promedio = sum(calidades) / len(calidades)
+        calidad_promedio = float(lote.calidad.mean())
         
         # Entidades más confiables
-        entidades_confiables = [e for e in entidades if e.es_confiable()]
-        porcentaje_confiables = (len(entidades_confiables) / total_entidades) * 100
+        cantidad_confiables = int(np.count_nonzero(lote.mascara_confiables()))
+        porcentaje_confiables = (cantidad_confiables / total_entidades) * 100
         
         # Entidades más importantes
-        entidades_importantes = sorted(
-            entidades, 
-            key=lambda e: e.calcular_puntuacion_compuesta(), 
-            reverse=True
-        )[:5]
+        entidades_importantes = heapq.nlargest(
+            5, zip(lote.puntuaciones_compuestas().tolist(), lote.entidades), key=itemgetter(0)
+        )
         
         estadisticas = {
             "total_entidades": total_entidades,
@@ -301,17 +728,17 @@ class ServicioEntidades:
                 "promedio": round(calidad_promedio, 3)
             },
             "entidades_confiables": {
-                "cantidad": len(entidades_confiables),
+                "cantidad": cantidad_confiables,
                 "porcentaje": round(porcentaje_confiables, 2)
             },
             "entidades_mas_importantes": [
                 {
                     "texto": e.texto,
-                    "tipo": e.tipo.value,
+                    "tipo": e.tipo_value,
                     "confianza": e.confianza,
-                    "puntuacion": e.calcular_puntuacion_compuesta()
+                    "puntuacion": puntuacion
                 }
-                for e in entidades_importantes
+                for puntuacion, e in entidades_importantes
             ]
         }
         
@@ -320,28 +747,38 @@ class ServicioEntidades:
         return estadisticas
     
     @logging_metodo(nombre_logger="servicio_entidades", incluir_tiempo=True)
-    async def buscar_entidades_similares(
+    def buscar_entidades_similares(
         self, 
         entidad_referencia: EntidadNombrada,
-        entidades: List[EntidadNombrada],
-        umbral_similitud: float = 0.8
+        entidades: Union[List[EntidadNombrada], EntidadBatch],
+        umbral_similitud: float = 0.8,
+        similitud_difusa: bool = False
     ) -> List[EntidadNombrada]:
         """
         Buscar entidades similares a una entidad de referencia
         
         Args:
             entidad_referencia: Entidad de referencia
-            entidades: Lista de entidades donde buscar
+            entidades: Lista de entidades donde buscar o su vista en columnas
             umbral_similitud: Umbral de similitud
+            similitud_difusa: Aceptar también textos con similitud de edición
+                >= umbral_similitud (requiere rapidfuzz)
             
         Returns:
             Lista de entidades similares
         """
-        entidades_similares = []
-        
-        for entidad in entidades:
-            if entidad.es_similar_a(entidad_referencia, umbral_similitud):
-                entidades_similares.append(entidad)
+        # El tipo se compara antes para evitar la llamada en las que no coinciden
+        tipo_referencia = entidad_referencia.tipo
+        if isinstance(entidades, EntidadBatch):
+            mascara_tipo = entidades.tipo_id == EntidadBatch.id_de_tipo(tipo_referencia)
+            candidatos = [entidades.entidades[i] for i in np.flatnonzero(mascara_tipo)]
+        else:
+            candidatos = [entidad for entidad in entidades if entidad.tipo is tipo_referencia]
+        
+        entidades_similares = [
+            entidad for entidad in candidatos
+            if entidad.es_similar_a(entidad_referencia, umbral_similitud, similitud_difusa)
+        ]
         
         # Ordenar por similitud (confianza)
         entidades_similares.sort(key=lambda e: e.confianza, reverse=True)
@@ -351,35 +788,48 @@ class ServicioEntidades:
         return entidades_similares
     
     @logging_metodo(nombre_logger="servicio_entidades", incluir_tiempo=True)
-    async def agrupar_entidades_por_tipo(
+    def agrupar_entidades_por_tipo(
         self, 
-        entidades: List[EntidadNombrada]
+        entidades: Union[List[EntidadNombrada], EntidadBatch]
     ) -> Dict[str, List[EntidadNombrada]]:
         """
         Agrupar entidades por tipo
         
         Args:
-            entidades: Lista de entidades
-            
+            entidades: Lista de entidades o su vista en columnas
+        
         Returns:
             Diccionario con entidades agrupadas por tipo
         """
-        grupos = {}
+        lote = self._como_lote(entidades)
         
-        for entidad in entidades:
-            tipo = entidad.tipo.value
-            if tipo not in grupos:
-                grupos[tipo] = []
-            grupos[tipo].append(entidad)
+        # Un único ordenamiento estable por tipo y confianza descendente
+        orden = np.lexsort((-lote.confianza, lote.tipo_id))
+        ids_tipo, inicios = np.unique(lote.tipo_id[orden], return_index=True)
+        finales = np.append(inicios[1:], len(orden))
         
-        # Ordenar cada grupo por confianza
-        for tipo in grupos:
-            grupos[tipo].sort(key=lambda e: e.confianza, reverse=True)
+        grupos = {
+            EntidadBatch.TIPOS[id_tipo].value: [lote.entidades[i] for i in orden[inicio:fin]]
+            for id_tipo, inicio, fin in zip(ids_tipo, inicios, finales)
+        }
         
         self.logger.info(f"Entidades agrupadas en {len(grupos)} tipos")
         
         return grupos
     
+    @staticmethod
+    def _como_lote(entidades: Union[List[EntidadNombrada], EntidadBatch]) -> EntidadBatch:
+        """
+        Obtener la vista en columnas, construyéndola si se recibe una lista
+        
+        Args:
+            entidades: Lista de entidades o su vista en columnas
+        
+        Returns:
+            Vista en columnas de las entidades
+        """
+        return EntidadBatch.como_lote(entidades)
+    
     def obtener_configuracion(self) -> Dict[str, Any]:
         """
         Obtener configuración actual del servicio
@@ -397,4 +847,8 @@ class ServicioEntidades:
             nueva_configuracion: Nueva configuración
         """
         self.configuracion_final.update(nueva_configuracion)
+        self._cargar_parametros()
+        
+        # Los resultados en caché pueden no corresponder a la nueva configuración
+        self._cache = self._crear_cache()
         self.logger.info("Configuración actualizada", nueva_configuracion=nueva_configuracion)
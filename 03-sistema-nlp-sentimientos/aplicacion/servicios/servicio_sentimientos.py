@@ -3,12 +3,19 @@ Servicio de Análisis de Sentimientos - Capa de Aplicación
 Servicio principal para análisis de sentimientos
 """
 import asyncio
-from typing import Dict, Any, List, Optional
+import copy
+import logging
+from collections import Counter
+from contextlib import aclosing
+from typing import Dict, Any, AsyncIterator, Iterable, List, Optional, Tuple
+import numpy as np
 import structlog
 from datetime import datetime
 
 from dominio.entidades.analisis_sentimiento import AnalisisSentimiento, CategoriaSentimiento, ModeloSentimiento
 from dominio.algoritmos.algoritmo_sentimientos import AlgoritmoSentimientos
+from .cache_resultados import CacheResultados
+from .procesamiento_cola import procesar_en_cola
 from ...utilidades.decoradores.decorador_logging import logging_metodo
 from ...utilidades.decoradores.decorador_validacion import validar_parametros
 
@@ -38,13 +45,40 @@ class ServicioSentimientos:
             "algoritmos_habilitados": ["spacy", "textblob", "vader"],
             "cache_habilitado": True,
             "cache_ttl": 3600,  # 1 hora
+            "cache_tamano_maximo": 1000,
             "timeout_analisis": 30,  # segundos
+            "max_concurrencia": 10,
             "incluir_emociones": True,
             "incluir_palabras_clave": True
         }
         
         # Combinar configuración
         self.configuracion_final = {**self.configuracion_default, **self.configuracion}
+        
+        # Parámetros de uso frecuente y caché de resultados por (algoritmo, idioma, texto)
+        self._cargar_parametros()
+        self._cache = self._crear_cache()
+    
+    def _cargar_parametros(self) -> None:
+        """Copiar a atributos los parámetros que se consultan en cada llamada"""
+        self._algoritmo_default = self.configuracion_final["algoritmo_por_defecto"]
+        self._habilitados = frozenset(self.configuracion_final["algoritmos_habilitados"])
+        self._timeout = self.configuracion_final["timeout_analisis"]
+        self._incluir_emociones = self.configuracion_final["incluir_emociones"]
+        self._incluir_palabras_clave = self.configuracion_final["incluir_palabras_clave"]
+        self._cache_habilitado = self.configuracion_final["cache_habilitado"]
+    
+    def _crear_cache(self) -> CacheResultados:
+        """
+        Crear la caché de resultados según la configuración
+        
+        Returns:
+            Caché vacía
+        """
+        return CacheResultados(
+            ttl=self.configuracion_final["cache_ttl"],
+            tamano_maximo=self.configuracion_final["cache_tamano_maximo"]
+        )
     
     def registrar_algoritmo(self, nombre: str, algoritmo: AlgoritmoSentimientos) -> None:
         """
@@ -108,49 +142,104 @@ class ServicioSentimientos:
             
             # Usar configuración por defecto si no se especifica
             if algoritmo is None:
-                algoritmo = self.configuracion_final["algoritmo_por_defecto"]
+                algoritmo = self._algoritmo_default
             
             if incluir_emociones is None:
-                incluir_emociones = self.configuracion_final["incluir_emociones"]
+                incluir_emociones = self._incluir_emociones
             
             if incluir_palabras_clave is None:
-                incluir_palabras_clave = self.configuracion_final["incluir_palabras_clave"]
+                incluir_palabras_clave = self._incluir_palabras_clave
             
-            # Obtener algoritmo
-            algoritmo_instancia = self.obtener_algoritmo(algoritmo)
-            if not algoritmo_instancia:
-                raise ValueError(f"Algoritmo no encontrado: {algoritmo}")
+            algoritmo_instancia = self._resolver_algoritmo(algoritmo)
             
-            # Verificar si está habilitado
-            if algoritmo not in self.configuracion_final["algoritmos_habilitados"]:
-                raise ValueError(f"Algoritmo no habilitado: {algoritmo}")
+            # Evitar construir el preview y los campos si INFO está filtrado
+            registrar_info = self._info_habilitado()
             
-            self.logger.info(
-                "Iniciando análisis de sentimientos",
-                texto_preview=texto[:100] + "..." if len(texto) > 100 else texto,
-                idioma=idioma,
-                algoritmo=algoritmo
-            )
+            if registrar_info:
+                self.logger.info(
+                    "Iniciando análisis de sentimientos",
+                    texto_preview=texto[:100] + "..." if len(texto) > 100 else texto,
+                    idioma=idioma,
+                    algoritmo=algoritmo
+                )
             
-            # Ejecutar análisis con timeout
-            timeout = self.configuracion_final["timeout_analisis"]
-            resultado = await asyncio.wait_for(
-                algoritmo_instancia.analizar(texto, idioma),
-                timeout=timeout
+            resultado = await self._analizar_fast(texto, idioma, algoritmo, algoritmo_instancia)
+            
+            self._enriquecer_resultado(
+                resultado, algoritmo_instancia, incluir_emociones, incluir_palabras_clave
             )
             
-            # Enriquecer resultado si es necesario
-            if incluir_emociones and not resultado.emociones_detectadas:
-                resultado.emociones_detectadas = algoritmo_instancia._detectar_emociones(texto)
+            if registrar_info:
+                self.logger.info(
+                    "Análisis de sentimientos completado",
+                    categoria=resultado.categoria.value,
+                    polaridad=resultado.polaridad,
+                    confianza=resultado.confianza
+                )
             
-            if incluir_palabras_clave and not resultado.palabras_clave:
-                resultado.palabras_clave = algoritmo_instancia._extraer_palabras_clave(texto)
+            return resultado
+            
+        except asyncio.TimeoutError:
+            self.logger.error(f"Timeout en análisis de sentimientos: {algoritmo}")
+            raise ValueError(f"Timeout en análisis de sentimientos con {algoritmo}")
+        
+        except Exception as e:
+            self.logger.error(f"Error en análisis de sentimientos: {str(e)}")
+            raise
+    
+    @logging_metodo(nombre_logger="servicio_sentimientos", incluir_tiempo=True)
+    async def analizar_sentimiento_doc(
+        self, 
+        doc: Any, 
+        idioma: str = "es",
+        algoritmo: Optional[str] = None,
+        incluir_emociones: Optional[bool] = None,
+        incluir_palabras_clave: Optional[bool] = None
+    ) -> AnalisisSentimiento:
+        """
+        Analizar sentimientos de un documento ya procesado
+        Permite reutilizar el mismo Doc de spaCy en varios análisis y procesar
+        el texto una sola vez; no usa la caché porque el resultado depende del
+        pipeline que produjo el documento
+        
+        Args:
+            doc: Documento procesado (p. ej. spacy.tokens.Doc)
+            idioma: Idioma del texto
+            algoritmo: Algoritmo específico a usar (opcional)
+            incluir_emociones: Si incluir análisis de emociones
+            incluir_palabras_clave: Si incluir palabras clave
+            
+        Returns:
+            Resultado del análisis de sentimientos
+        """
+        if algoritmo is None:
+            algoritmo = self._algoritmo_default
+        
+        try:
+            if not doc.text.strip():
+                raise ValueError("El texto no puede estar vacío")
             
-            self.logger.info(
-                "Análisis de sentimientos completado",
-                categoria=resultado.categoria.value,
-                polaridad=resultado.polaridad,
-                confianza=resultado.confianza
+            if incluir_emociones is None:
+                incluir_emociones = self._incluir_emociones
+            
+            if incluir_palabras_clave is None:
+                incluir_palabras_clave = self._incluir_palabras_clave
+            
+            algoritmo_instancia = self._resolver_algoritmo(algoritmo)
+            if not algoritmo_instancia.soporta_doc:
+                raise ValueError(f"El algoritmo {algoritmo} no admite documentos procesados")
+            
+            # Construcción del resultado en un hilo para no bloquear el event loop
+            analisis = asyncio.to_thread(algoritmo_instancia.analizar_doc, doc, idioma)
+            
+            # Un timeout no positivo desactiva wait_for y su temporizador
+            if self._timeout and self._timeout > 0:
+                resultado = await asyncio.wait_for(analisis, timeout=self._timeout)
+            else:
+                resultado = await analisis
+            
+            self._enriquecer_resultado(
+                resultado, algoritmo_instancia, incluir_emociones, incluir_palabras_clave
             )
             
             return resultado
@@ -183,24 +272,40 @@ class ServicioSentimientos:
         """
         self.logger.info(f"Iniciando análisis de lote: {len(textos)} textos")
         
-        # Procesar en paralelo
-        tareas = [
-            self.analizar_sentimiento(texto, idioma, algoritmo)
-            for texto in textos
-        ]
+        # El algoritmo se valida una sola vez para todo el lote
+        nombre_algoritmo = algoritmo or self._algoritmo_default
+        try:
+            algoritmo_instancia = self._resolver_algoritmo(nombre_algoritmo)
+        except ValueError as e:
+            self.logger.error(f"Error en análisis de lote: {str(e)}")
+            return []
+        
+        # Ruta por lotes: una sola pasada del modelo para todos los textos
+        if algoritmo_instancia.soporta_lote:
+            try:
+                return await self._analizar_sentimientos_lote_batch(
+                    textos, idioma, nombre_algoritmo, algoritmo_instancia
+                )
+            except Exception as e:
+                self.logger.error(f"Error en análisis por lotes, procesando texto a texto: {str(e)}")
         
-        resultados = await asyncio.gather(*tareas, return_exceptions=True)
+        # Procesar texto a texto con un grupo fijo de trabajadores
+        async def _analizar_texto(texto: str) -> AnalisisSentimiento:
+            return await self._analizar_enriquecido(texto, idioma, nombre_algoritmo, algoritmo_instancia)
         
-        # Filtrar errores
-        resultados_validos = []
+        resultados: List[Optional[AnalisisSentimiento]] = [None] * len(textos)
         errores = 0
+        num_trabajadores = min(self.configuracion_final["max_concurrencia"], len(textos))
         
-        for i, resultado in enumerate(resultados):
+        async for i, resultado in procesar_en_cola(textos, _analizar_texto, num_trabajadores):
             if isinstance(resultado, Exception):
                 self.logger.error(f"Error en texto {i}: {str(resultado)}")
                 errores += 1
             else:
-                resultados_validos.append(resultado)
+                resultados[i] = resultado
+        
+        # Los textos con error no aparecen en el resultado
+        resultados_validos = [resultado for resultado in resultados if resultado is not None]
         
         self.logger.info(
             f"Análisis de lote completado: {len(resultados_validos)} exitosos, {errores} errores"
@@ -208,6 +313,264 @@ class ServicioSentimientos:
         
         return resultados_validos
     
+    async def analizar_sentimientos_stream(
+        self, 
+        textos: Iterable[str], 
+        idioma: str = "es",
+        algoritmo: Optional[str] = None
+    ) -> AsyncIterator[Tuple[int, AnalisisSentimiento]]:
+        """
+        Analizar múltiples textos entregando cada resultado al terminar
+        
+        Args:
+            textos: Textos a analizar (puede ser un iterable perezoso)
+            idioma: Idioma de los textos
+            algoritmo: Algoritmo específico a usar
+        
+        Yields:
+            Tuplas (índice del texto, resultado) en orden de finalización;
+            los textos con error se omiten
+        
+        Raises:
+            ValueError: Si el algoritmo no existe o no está habilitado
+        """
+        nombre_algoritmo = algoritmo or self._algoritmo_default
+        algoritmo_instancia = self._resolver_algoritmo(nombre_algoritmo)
+        
+        async def _analizar_texto(texto: str) -> AnalisisSentimiento:
+            return await self._analizar_enriquecido(texto, idioma, nombre_algoritmo, algoritmo_instancia)
+        
+        num_trabajadores = self.configuracion_final["max_concurrencia"]
+        
+        # aclosing detiene los trabajadores aunque el consumidor abandone la iteración
+        async with aclosing(procesar_en_cola(textos, _analizar_texto, num_trabajadores)) as resultados:
+            async for i, resultado in resultados:
+                if isinstance(resultado, Exception):
+                    self.logger.error(f"Error en texto {i}: {str(resultado)}")
+                    continue
+                yield i, resultado
+    
+    async def _analizar_enriquecido(
+        self, 
+        texto: str, 
+        idioma: str,
+        nombre_algoritmo: str,
+        algoritmo_instancia: AlgoritmoSentimientos
+    ) -> AnalisisSentimiento:
+        """
+        Analizar y enriquecer un texto de un lote con la configuración por defecto
+        
+        Args:
+            texto: Texto a analizar
+            idioma: Idioma del texto
+            nombre_algoritmo: Nombre del algoritmo
+            algoritmo_instancia: Algoritmo ya resuelto
+        
+        Returns:
+            Resultado del análisis
+        
+        Raises:
+            ValueError: Si el texto está vacío o se agota el tiempo
+        """
+        if not texto or not texto.strip():
+            raise ValueError("El texto no puede estar vacío")
+        
+        try:
+            resultado = await self._analizar_fast(texto, idioma, nombre_algoritmo, algoritmo_instancia)
+        except asyncio.TimeoutError:
+            raise ValueError(f"Timeout en análisis de sentimientos con {nombre_algoritmo}")
+        
+        self._enriquecer_resultado(
+            resultado, algoritmo_instancia, self._incluir_emociones, self._incluir_palabras_clave
+        )
+        return resultado
+    
+    async def _analizar_sentimientos_lote_batch(
+        self, 
+        textos: List[str], 
+        idioma: str,
+        nombre_algoritmo: str,
+        algoritmo_instancia: AlgoritmoSentimientos
+    ) -> List[AnalisisSentimiento]:
+        """
+        Analizar sentimientos de múltiples textos con el lote nativo del algoritmo
+        
+        Args:
+            textos: Lista de textos a analizar
+            idioma: Idioma de los textos
+            nombre_algoritmo: Nombre del algoritmo
+            algoritmo_instancia: Algoritmo con soporte de lotes
+        
+        Returns:
+            Lista de resultados de análisis
+        """
+        incluir_emociones = self._incluir_emociones
+        incluir_palabras_clave = self._incluir_palabras_clave
+        cache_habilitado = self._cache_habilitado
+        
+        # Los textos vacíos se descartan igual que en el análisis individual
+        textos_validos = [texto for texto in textos if texto and texto.strip()]
+        resultados: List[Optional[AnalisisSentimiento]] = [None] * len(textos_validos)
+        
+        # Solo los textos distintos que no están en caché pasan por el modelo;
+        # los repetidos dentro del lote se procesan una vez
+        pendientes: Dict[str, Tuple[Optional[Tuple[str, str, str]], List[int]]] = {}
+        for i, texto in enumerate(textos_validos):
+            if texto in pendientes:
+                pendientes[texto][1].append(i)
+                continue
+            
+            clave_cache = None
+            if cache_habilitado:
+                clave_cache = CacheResultados.generar_clave(nombre_algoritmo, idioma, texto)
+                resultados[i] = self._cache.obtener(clave_cache)
+                if resultados[i] is not None:
+                    continue
+            pendientes[texto] = (clave_cache, [i])
+        
+        if pendientes:
+            resultados_lote = await asyncio.to_thread(
+                algoritmo_instancia.analizar_batch, list(pendientes), idioma
+            )
+            
+            for (clave_cache, indices), resultado in zip(pendientes.values(), resultados_lote):
+                resultados[indices[0]] = resultado
+                for i in indices[1:]:
+                    # Cada posición necesita su propio objeto: el enriquecimiento lo modifica
+                    # (con caché todos se copian más abajo)
+                    resultados[i] = resultado if cache_habilitado else copy.copy(resultado)
+                if cache_habilitado:
+                    self._cache.guardar(clave_cache, resultado)
+        
+        # El enriquecimiento no debe modificar las entradas en caché
+        if cache_habilitado:
+            resultados = [copy.copy(resultado) for resultado in resultados]
+        
+        for resultado in resultados:
+            self._enriquecer_resultado(
+                resultado, algoritmo_instancia, incluir_emociones, incluir_palabras_clave
+            )
+        
+        errores = len(textos) - len(textos_validos)
+        self.logger.info(
+            f"Análisis de lote completado: {len(resultados)} exitosos, {errores} errores"
+        )
+        
+        return resultados
+    
+    def _info_habilitado(self) -> bool:
+        """
+        Indicar si el logger emitirá mensajes de nivel INFO
+        
+        Returns:
+            False solo si el logger confirma que INFO está filtrado
+        """
+        # Solo el BoundLogger de stdlib expone isEnabledFor
+        es_habilitado = getattr(self.logger, "isEnabledFor", None)
+        return es_habilitado is None or es_habilitado(logging.INFO)
+    
+    def _resolver_algoritmo(self, algoritmo: str) -> AlgoritmoSentimientos:
+        """
+        Obtener un algoritmo registrado y habilitado
+        
+        Args:
+            algoritmo: Nombre del algoritmo
+        
+        Returns:
+            Instancia del algoritmo
+        
+        Raises:
+            ValueError: Si el algoritmo no existe o no está habilitado
+        """
+        algoritmo_instancia = self.obtener_algoritmo(algoritmo)
+        if not algoritmo_instancia:
+            raise ValueError(f"Algoritmo no encontrado: {algoritmo}")
+        
+        # Verificar si está habilitado
+        if algoritmo not in self._habilitados:
+            raise ValueError(f"Algoritmo no habilitado: {algoritmo}")
+        
+        return algoritmo_instancia
+    
+    async def _analizar_fast(
+        self, 
+        texto: str, 
+        idioma: str,
+        nombre_algoritmo: str,
+        algoritmo_instancia: AlgoritmoSentimientos
+    ) -> AnalisisSentimiento:
+        """
+        Analizar un texto sin decoradores ni validación (entradas ya validadas)
+        
+        Args:
+            texto: Texto a analizar
+            idioma: Idioma del texto
+            nombre_algoritmo: Nombre del algoritmo
+            algoritmo_instancia: Algoritmo ya resuelto
+        
+        Returns:
+            Resultado sin enriquecer; si proviene de la caché es una copia
+        """
+        # Consultar caché antes de ejecutar el algoritmo
+        if self._cache_habilitado:
+            clave_cache = CacheResultados.generar_clave(nombre_algoritmo, idioma, texto)
+            resultado = self._cache.obtener(clave_cache)
+            if resultado is not None:
+                return copy.copy(resultado)
+        
+        if algoritmo_instancia.soporta_sync:
+            # Inferencia en un hilo para no bloquear el event loop
+            analisis = asyncio.to_thread(algoritmo_instancia.analizar_sync, texto, idioma)
+        else:
+            analisis = algoritmo_instancia.analizar(texto, idioma)
+        
+        # Un timeout no positivo desactiva wait_for y su temporizador
+        if self._timeout and self._timeout > 0:
+            resultado = await asyncio.wait_for(analisis, timeout=self._timeout)
+        else:
+            resultado = await analisis
+        
+        # El enriquecimiento posterior no debe modificar la entrada en caché
+        if self._cache_habilitado:
+            self._cache.guardar(clave_cache, resultado)
+            resultado = copy.copy(resultado)
+        
+        return resultado
+    
+    def _enriquecer_resultado(
+        self, 
+        resultado: AnalisisSentimiento,
+        algoritmo_instancia: AlgoritmoSentimientos,
+        incluir_emociones: bool,
+        incluir_palabras_clave: bool
+    ) -> None:
+        """
+        Completar emociones y palabras clave si el algoritmo no las aportó
+        
+        Args:
+            resultado: Resultado del análisis
+            algoritmo_instancia: Algoritmo que generó el resultado
+            incluir_emociones: Si incluir análisis de emociones
+            incluir_palabras_clave: Si incluir palabras clave
+        """
+        completar_emociones = incluir_emociones and not resultado.emociones_detectadas
+        completar_palabras_clave = incluir_palabras_clave and not resultado.palabras_clave
+        if not (completar_emociones or completar_palabras_clave):
+            return
+        
+        # Ambos helpers trabajan sobre el texto en minúsculas: se calcula una vez
+        texto_lower = resultado.texto.lower()
+        
+        if completar_emociones:
+            resultado.emociones_detectadas = algoritmo_instancia._detectar_emociones(
+                resultado.texto, texto_lower
+            )
+        
+        if completar_palabras_clave:
+            resultado.palabras_clave = algoritmo_instancia._extraer_palabras_clave(
+                resultado.texto, texto_lower=texto_lower
+            )
+    
     @logging_metodo(nombre_logger="servicio_sentimientos", incluir_tiempo=True)
     async def comparar_algoritmos(
         self, 
@@ -231,20 +594,24 @@ class ServicioSentimientos:
         
         self.logger.info(f"Comparando algoritmos: {algoritmos}")
         
-        resultados = {}
+        # Cada algoritmo se ejecuta una vez; gather conserva el orden solicitado
+        nombres = list(dict.fromkeys(algoritmos))
+        respuestas = await asyncio.gather(
+            *(self.analizar_sentimiento(texto, idioma, algoritmo) for algoritmo in nombres),
+            return_exceptions=True
+        )
         
-        for algoritmo in algoritmos:
-            try:
-                resultado = await self.analizar_sentimiento(texto, idioma, algoritmo)
-                resultados[algoritmo] = resultado
-            except Exception as e:
-                self.logger.error(f"Error con algoritmo {algoritmo}: {str(e)}")
-                resultados[algoritmo] = None
+        resultados = {}
+        for algoritmo, respuesta in zip(nombres, respuestas):
+            if isinstance(respuesta, Exception):
+                self.logger.error(f"Error con algoritmo {algoritmo}: {str(respuesta)}")
+                respuesta = None
+            resultados[algoritmo] = respuesta
         
         return resultados
     
     @logging_metodo(nombre_logger="servicio_sentimientos", incluir_tiempo=True)
-    async def obtener_estadisticas_analisis(
+    def obtener_estadisticas_analisis(
         self, 
         analisis: List[AnalisisSentimiento]
     ) -> Dict[str, Any]:
@@ -264,38 +631,34 @@ class ServicioSentimientos:
         total_analisis = len(analisis)
         
         # Distribución por categoría
-        categorias = {}
-        for analisis_item in analisis:
-            categoria = analisis_item.categoria.value
-            categorias[categoria] = categorias.get(categoria, 0) + 1
+        categorias = dict(Counter(a.categoria.value for a in analisis))
         
         # Estadísticas de polaridad
-        polaridades = [a.polaridad for a in analisis]
-        polaridad_promedio = sum(polaridades) / len(polaridades)
-        polaridad_min = min(polaridades)
-        polaridad_max = max(polaridades)
+        polaridades = np.fromiter((a.polaridad for a in analisis), dtype=np.float64, count=total_analisis)
+        polaridad_promedio = float(polaridades.mean())
+        polaridad_min = float(polaridades.min())
+        polaridad_max = float(polaridades.max())
         
         # Estadísticas de subjetividad
-        subjetividades = [a.subjetividad for a in analisis]
-        subjetividad_promedio = sum(subjetividades) / len(subjetividades)
+        subjetividades = np.fromiter((a.subjetividad for a in analisis), dtype=np.float64, count=total_analisis)
+        subjetividad_promedio = float(subjetividades.mean())
         
         # Estadísticas de confianza
-        confianzas = [a.confianza for a in analisis]
-        confianza_promedio = sum(confianzas) / len(confianzas)
+        confianzas = np.fromiter((a.confianza for a in analisis), dtype=np.float64, count=total_analisis)
+        confianza_promedio = float(confianzas.mean())
         
         # Análisis de emociones
-        emociones_totales = {}
+        emociones_totales = Counter()
         for analisis_item in analisis:
-            for emocion, intensidad in analisis_item.emociones_detectadas.items():
-                emociones_totales[emocion] = emociones_totales.get(emocion, 0) + intensidad
+            emociones_totales.update(analisis_item.emociones_detectadas)
         
         # Normalizar emociones
         if emociones_totales:
-            total_emociones = sum(emociones_totales.values())
-            emociones_normalizadas = {
-                emocion: intensidad / total_emociones
-                for emocion, intensidad in emociones_totales.items()
-            }
+            intensidades = np.fromiter(emociones_totales.values(), dtype=np.float64, count=len(emociones_totales))
+            total_emociones = intensidades.sum()
+            if total_emociones > 0:
+                intensidades /= total_emociones
+            emociones_normalizadas = dict(zip(emociones_totales.keys(), intensidades.tolist()))
         else:
             emociones_normalizadas = {}
         
@@ -337,4 +700,8 @@ class ServicioSentimientos:
             nueva_configuracion: Nueva configuración
         """
         self.configuracion_final.update(nueva_configuracion)
+        self._cargar_parametros()
+        
+        # Los resultados en caché pueden no corresponder a la nueva configuración
+        self._cache = self._crear_cache()
         self.logger.info("Configuración actualizada", nueva_configuracion=nueva_configuracion)
@@ -2,12 +2,86 @@
 Algoritmo de Extracción de Entidades - Capa de Dominio
 Implementa diferentes algoritmos para extracción de entidades nombradas
 """
+import asyncio
+import re
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Optional, Tuple
+from bisect import bisect_left
+from typing import Dict, Any, List, Optional, Tuple, Union
+import numpy as np
 import structlog
 from enum import Enum
 
-from ..entidades.entidad_nombrada import EntidadNombrada, TipoEntidad
+from ..entidades.entidad_nombrada import EntidadNombrada, EntidadBatch, TipoEntidad
+
+
+# Mapeo de etiquetas de spaCy a tipos internos
+_MAPEO_TIPO_SPACY: Dict[str, TipoEntidad] = {
+    'PERSON': TipoEntidad.PERSONA,
+    'PER': TipoEntidad.PERSONA,
+    'ORG': TipoEntidad.ORGANIZACION,
+    'ORGANIZATION': TipoEntidad.ORGANIZACION,
+    'GPE': TipoEntidad.LUGAR,
+    'LOC': TipoEntidad.LOC,
+    'FAC': TipoEntidad.FAC,
+    'DATE': TipoEntidad.FECHA,
+    'TIME': TipoEntidad.TIEMPO,
+    'MONEY': TipoEntidad.DINERO,
+    'PERCENT': TipoEntidad.PORCENTAJE,
+    'QUANTITY': TipoEntidad.CANTIDAD,
+    'EVENT': TipoEntidad.EVENTO,
+    'WORK_OF_ART': TipoEntidad.OBRA_ARTE,
+    'LAW': TipoEntidad.LEY,
+    'LANGUAGE': TipoEntidad.IDIOMA,
+    'NORP': TipoEntidad.NORP,
+    'PRODUCT': TipoEntidad.PRODUCTO,
+    'TECHNOLOGY': TipoEntidad.TECNOLOGIA,
+    'MEDICINE': TipoEntidad.MEDICINA,
+    'SCIENCE': TipoEntidad.CIENCIA,
+    'MISC': TipoEntidad.OTRO
+}
+
+# Tipos cuya extracción se considera más fiable y que deben ir capitalizados
+_TIPOS_CONFIABLES = frozenset({TipoEntidad.PERSONA, TipoEntidad.ORGANIZACION, TipoEntidad.LUGAR})
+
+# Caracteres que se ignoran al comprobar que una entidad es alfanumérica
+_SEPARADORES_PERMITIDOS = str.maketrans('', '', ' -.')
+
+# Delimitadores de fin de oración
+_RE_FIN_ORACION = re.compile(r'[.!?]')
+
+
+def _recortar_espacios(texto: str, inicio: int, fin: int) -> Tuple[int, int]:
+    """
+    Ajustar un rango para excluir los espacios de sus extremos, sin copiar
+    
+    Args:
+        texto: Texto completo
+        inicio: Inicio del rango
+        fin: Fin del rango (exclusivo)
+    
+    Returns:
+        Rango equivalente a texto[inicio:fin].strip()
+    """
+    while inicio < fin and texto[inicio].isspace():
+        inicio += 1
+    while fin > inicio and texto[fin - 1].isspace():
+        fin -= 1
+    return inicio, fin
+
+
+def _posiciones_fin_oracion(texto: str) -> Tuple[int, ...]:
+    """
+    Posiciones de los delimitadores de oración de un texto
+    Se calculan una vez por texto y se pasan a _obtener_oracion_completa
+    para cada entidad
+    
+    Args:
+        texto: Texto completo
+    
+    Returns:
+        Posiciones ordenadas de '.', '!' y '?'
+    """
+    return tuple(coincidencia.start() for coincidencia in _RE_FIN_ORACION.finditer(texto))
 
 
 class AlgoritmoEntidades(ABC):
@@ -16,6 +90,18 @@ class AlgoritmoEntidades(ABC):
     Implementa el patrón Strategy para diferentes algoritmos
     """
     
+    # Indica si el algoritmo implementa extraer_batch
+    soporta_lote: bool = False
+    
+    # Indica si el algoritmo implementa extraer_sync (ejecutable en un hilo)
+    soporta_sync: bool = False
+    
+    # Indica si el algoritmo implementa extraer_doc (documento ya procesado)
+    soporta_doc: bool = False
+    
+    # Componentes del pipeline que necesita el algoritmo (None = todos)
+    componentes_requeridos: Optional[List[str]] = None
+    
     def __init__(self, nombre: str, configuracion: Optional[Dict[str, Any]] = None):
         """
         Inicializar algoritmo de entidades
@@ -27,6 +113,14 @@ class AlgoritmoEntidades(ABC):
         self.nombre = nombre
         self.configuracion = configuracion or {}
         self.logger = structlog.get_logger()
+        
+        # Componentes que no deben cargarse (None = todos los no requeridos)
+        # Las implementaciones spaCy los pasan como exclude a spacy.load
+        self.componentes_excluir: Optional[List[str]] = self.configuracion.get("excluir_componentes")
+        
+        # Filtro de duplicados: además de igualdad y contención, aceptar textos
+        # con similitud de edición alta (requiere rapidfuzz, desactivado por defecto)
+        self.similitud_difusa: bool = self.configuracion.get("similitud_difusa", False)
     
     @abstractmethod
     async def extraer(self, texto: str, idioma: str = "es") -> List[EntidadNombrada]:
@@ -42,6 +136,64 @@ class AlgoritmoEntidades(ABC):
         """
         pass
     
+    def extraer_sync(self, texto: str, idioma: str = "es") -> List[EntidadNombrada]:
+        """
+        Extraer entidades de un texto de forma síncrona
+        
+        Args:
+            texto: Texto a analizar
+            idioma: Idioma del texto
+        
+        Returns:
+            Lista de entidades extraídas
+        """
+        raise NotImplementedError(f"{type(self).__name__} no soporta extracción síncrona")
+    
+    def extraer_doc(self, doc: Any, idioma: str = "es") -> List[EntidadNombrada]:
+        """
+        Extraer entidades de un documento ya procesado (síncrono)
+        
+        Args:
+            doc: Documento procesado por el pipeline del algoritmo
+            idioma: Idioma del texto
+        
+        Returns:
+            Lista de entidades extraídas
+        """
+        raise NotImplementedError(f"{type(self).__name__} no soporta documentos procesados")
+    
+    def extraer_batch(self, textos: List[str], idioma: str = "es") -> List[List[EntidadNombrada]]:
+        """
+        Extraer entidades de múltiples textos en una sola pasada (síncrono)
+        
+        Args:
+            textos: Lista de textos a analizar
+            idioma: Idioma de los textos
+        
+        Returns:
+            Lista de listas de entidades por texto
+        """
+        raise NotImplementedError(f"{type(self).__name__} no soporta extracción por lotes")
+    
+    async def extraer_lote(self, textos: List[str], idioma: str = "es") -> List[List[EntidadNombrada]]:
+        """
+        Extraer entidades de múltiples textos sin bloquear el event loop
+        
+        Si el algoritmo soporta lotes, extraer_batch se ejecuta en un hilo con
+        una sola pasada del modelo; en otro caso se usa extraer por texto
+        
+        Args:
+            textos: Lista de textos a analizar
+            idioma: Idioma de los textos
+        
+        Returns:
+            Lista de listas de entidades por texto
+        """
+        if self.soporta_lote:
+            return await asyncio.to_thread(self.extraer_batch, textos, idioma)
+        
+        return list(await asyncio.gather(*(self.extraer(texto, idioma) for texto in textos)))
+    
     @abstractmethod
     def validar_configuracion(self) -> bool:
         """
@@ -75,38 +227,13 @@ class AlgoritmoEntidades(ABC):
         Returns:
             Tipo de entidad interno
         """
-        mapeo = {
-            'PERSON': TipoEntidad.PERSONA,
-            'PER': TipoEntidad.PERSONA,
-            'ORG': TipoEntidad.ORGANIZACION,
-            'ORGANIZATION': TipoEntidad.ORGANIZACION,
-            'GPE': TipoEntidad.LUGAR,
-            'LOC': TipoEntidad.LOC,
-            'FAC': TipoEntidad.FAC,
-            'DATE': TipoEntidad.FECHA,
-            'TIME': TipoEntidad.TIEMPO,
-            'MONEY': TipoEntidad.DINERO,
-            'PERCENT': TipoEntidad.PORCENTAJE,
-            'QUANTITY': TipoEntidad.CANTIDAD,
-            'EVENT': TipoEntidad.EVENTO,
-            'WORK_OF_ART': TipoEntidad.OBRA_ARTE,
-            'LAW': TipoEntidad.LEY,
-            'LANGUAGE': TipoEntidad.IDIOMA,
-            'NORP': TipoEntidad.NORP,
-            'PRODUCT': TipoEntidad.PRODUCTO,
-            'TECHNOLOGY': TipoEntidad.TECNOLOGIA,
-            'MEDICINE': TipoEntidad.MEDICINA,
-            'SCIENCE': TipoEntidad.CIENCIA,
-            'MISC': TipoEntidad.OTRO
-        }
-        
-        return mapeo.get(tipo_spacy, TipoEntidad.OTRO)
+        return _MAPEO_TIPO_SPACY.get(tipo_spacy, TipoEntidad.OTRO)
     
     def _calcular_confianza_entidad(
         self, 
         texto: str, 
         tipo: TipoEntidad, 
-        contexto: str = ""
+        len_contexto: int = 0
     ) -> float:
         """
         Calcular confianza de una entidad extraída
@@ -114,38 +241,36 @@ class AlgoritmoEntidades(ABC):
         Args:
             texto: Texto de la entidad
             tipo: Tipo de entidad
-            contexto: Contexto de la entidad
-            
+            len_contexto: Longitud del contexto de la entidad (ver _rango_contexto_entidad)
+        
         Returns:
             Valor de confianza (0.0 a 1.0)
         """
-        factores = []
+        # Suma y número de factores acumulados sin lista intermedia
+        # (mismo orden de suma que la media original)
+        suma_factores = 0.0
+        num_factores = 0
         
         # Factor de longitud del texto
         longitud = len(texto.strip())
         if longitud > 0:
-            factor_longitud = min(1.0, longitud / 20)  # Normalizar a 20 caracteres
-            factores.append(factor_longitud)
+            suma_factores += min(1.0, longitud / 20)  # Normalizar a 20 caracteres
+            num_factores += 1
         
         # Factor de tipo de entidad
-        tipos_confiables = [TipoEntidad.PERSONA, TipoEntidad.ORGANIZACION, TipoEntidad.LUGAR]
-        if tipo in tipos_confiables:
-            factor_tipo = 1.0
-        else:
-            factor_tipo = 0.8
-        
-        factores.append(factor_tipo)
+        suma_factores += 1.0 if tipo in _TIPOS_CONFIABLES else 0.8
+        num_factores += 1
         
         # Factor de contexto
-        if contexto:
-            factor_contexto = min(1.0, len(contexto) / 100)  # Normalizar a 100 caracteres
-            factores.append(factor_contexto)
+        if len_contexto > 0:
+            suma_factores += min(1.0, len_contexto / 100)  # Normalizar a 100 caracteres
+            num_factores += 1
         
         # Factor de formato (capitalización, etc.)
-        factor_formato = self._evaluar_formato_entidad(texto, tipo)
-        factores.append(factor_formato)
+        suma_factores += self._evaluar_formato_entidad(texto, tipo)
+        num_factores += 1
         
-        return sum(factores) / len(factores) if factores else 0.5
+        return suma_factores / num_factores
     
     def _evaluar_formato_entidad(self, texto: str, tipo: TipoEntidad) -> float:
         """
@@ -161,30 +286,29 @@ class AlgoritmoEntidades(ABC):
         puntuacion = 0.5  # Base
         
         # Verificar capitalización apropiada
-        if tipo in [TipoEntidad.PERSONA, TipoEntidad.ORGANIZACION, TipoEntidad.LUGAR]:
-            if texto.istitle() or texto.isupper():
-                puntuacion += 0.3
+        if tipo in _TIPOS_CONFIABLES and (texto.istitle() or texto.isupper()):
+            puntuacion += 0.3
         
         # Verificar longitud apropiada
         if 2 <= len(texto) <= 50:
             puntuacion += 0.2
         
-        # Verificar caracteres apropiados
-        if texto.replace(' ', '').replace('-', '').replace('.', '').isalnum():
+        # Verificar caracteres apropiados (sin espacios, guiones ni puntos)
+        if texto.translate(_SEPARADORES_PERMITIDOS).isalnum():
             puntuacion += 0.2
         
         return min(1.0, puntuacion)
     
     def _calcular_calidad_extraccion(
         self, 
-        entidades: List[EntidadNombrada], 
+        entidades: Union[List[EntidadNombrada], EntidadBatch], 
         texto: str
     ) -> float:
         """
         Calcular calidad general de la extracción
         
         Args:
-            entidades: Lista de entidades extraídas
+            entidades: Lista de entidades extraídas o su vista en columnas
             texto: Texto original
             
         Returns:
@@ -195,56 +319,62 @@ class AlgoritmoEntidades(ABC):
         
         factores = []
         
+        # Los atributos se materializan una vez en columnas y cada factor es una reducción
+        lote = EntidadBatch.como_lote(entidades)
+        
         # Factor de cobertura (porcentaje del texto cubierto por entidades)
-        caracteres_cubiertos = sum(entidad.fin - entidad.inicio for entidad in entidades)
+        caracteres_cubiertos = int(lote.longitud.sum())
         cobertura = caracteres_cubiertos / len(texto) if len(texto) > 0 else 0
         factor_cobertura = min(1.0, cobertura * 2)  # Normalizar
         factores.append(factor_cobertura)
         
         # Factor de diversidad de tipos
-        tipos_unicos = len(set(entidad.tipo for entidad in entidades))
+        tipos_unicos = len(np.unique(lote.tipo_id))
         factor_diversidad = min(1.0, tipos_unicos / 5)  # Normalizar a 5 tipos
         factores.append(factor_diversidad)
         
         # Factor de confianza promedio
-        confianza_promedio = sum(entidad.confianza for entidad in entidades) / len(entidades)
+        confianza_promedio = float(lote.confianza.mean())
         factores.append(confianza_promedio)
         
         # Factor de solapamiento (penalizar entidades que se solapan)
-        factor_solapamiento = self._calcular_factor_solapamiento(entidades)
+        factor_solapamiento = self._calcular_factor_solapamiento(lote)
         factores.append(factor_solapamiento)
         
         return sum(factores) / len(factores)
     
-    def _calcular_factor_solapamiento(self, entidades: List[EntidadNombrada]) -> float:
+    def _calcular_factor_solapamiento(
+        self, 
+        entidades: Union[List[EntidadNombrada], EntidadBatch]
+    ) -> float:
         """
         Calcular factor de solapamiento entre entidades
         
         Args:
-            entidades: Lista de entidades
-            
+            entidades: Lista de entidades o su vista en columnas
+        
         Returns:
             Factor de solapamiento (0.0 a 1.0, donde 1.0 es sin solapamiento)
         """
         if len(entidades) <= 1:
             return 1.0
         
-        solapamientos = 0
-        total_comparaciones = 0
-        
-        for i in range(len(entidades)):
-            for j in range(i + 1, len(entidades)):
-                entidad1 = entidades[i]
-                entidad2 = entidades[j]
-                
-                # Verificar si hay solapamiento
-                if (entidad1.inicio < entidad2.fin and entidad2.inicio < entidad1.fin):
-                    solapamientos += 1
-                
-                total_comparaciones += 1
-        
-        if total_comparaciones == 0:
-            return 1.0
+        n = len(entidades)
+        lote = EntidadBatch.como_lote(entidades)
+        inicios, fines = lote.inicio, lote.fin
+        total_comparaciones = n * (n - 1) // 2
+        
+        if np.all(inicios < fines):
+            # Con rangos no vacíos, dos entidades no se solapan si y solo si una
+            # termina antes de que empiece la otra: basta contar, para cada inicio,
+            # cuántos fines quedan a su izquierda (O(n log n) y memoria O(n))
+            fines_ordenados = np.sort(fines)
+            no_solapadas = int(np.searchsorted(fines_ordenados, inicios, side='right').sum())
+            solapamientos = total_comparaciones - no_solapadas
+        else:
+            # Rangos vacíos o invertidos: matriz por pares, solo el triángulo superior (i < j)
+            solapa = (inicios[:, None] < fines[None, :]) & (inicios[None, :] < fines[:, None])
+            solapamientos = int(np.triu(solapa, k=1).sum())
         
         factor_solapamiento = 1.0 - (solapamientos / total_comparaciones)
         return max(0.0, factor_solapamiento)
@@ -262,24 +392,60 @@ class AlgoritmoEntidades(ABC):
         if not entidades:
             return []
         
-        entidades_filtradas = []
+        # Diccionarios por id: conservan el orden de inserción y eliminan en O(1)
+        entidades_filtradas: Dict[int, EntidadNombrada] = {}
+        
+        # Solo se comparan entidades del mismo tipo (es_similar_a lo exige)
+        filtradas_por_tipo: Dict[TipoEntidad, Dict[int, EntidadNombrada]] = {}
         
         for entidad in entidades:
             es_duplicada = False
+            mismo_tipo = filtradas_por_tipo.setdefault(entidad.tipo, {})
             
-            for entidad_existente in entidades_filtradas:
-                if entidad.es_similar_a(entidad_existente):
+            for clave_existente, entidad_existente in mismo_tipo.items():
+                if entidad.es_similar_a(entidad_existente, similitud_difusa=self.similitud_difusa):
                     # Mantener la entidad con mayor confianza
                     if entidad.confianza > entidad_existente.confianza:
-                        entidades_filtradas.remove(entidad_existente)
-                        entidades_filtradas.append(entidad)
+                        del entidades_filtradas[clave_existente]
+                        del mismo_tipo[clave_existente]
+                        entidades_filtradas[id(entidad)] = entidad
+                        mismo_tipo[id(entidad)] = entidad
                     es_duplicada = True
                     break
             
             if not es_duplicada:
-                entidades_filtradas.append(entidad)
+                entidades_filtradas[id(entidad)] = entidad
+                mismo_tipo[id(entidad)] = entidad
         
-        return entidades_filtradas
+        return list(entidades_filtradas.values())
+    
+    def _rango_contexto_entidad(
+        self, 
+        texto: str, 
+        inicio: int, 
+        fin: int, 
+        ventana: int = 50
+    ) -> Tuple[int, int, int, int]:
+        """
+        Obtener los rangos del contexto anterior y posterior de una entidad
+        sin copiar subcadenas; los bordes ya excluyen los espacios (como strip)
+        
+        Args:
+            texto: Texto completo
+            inicio: Posición de inicio de la entidad
+            fin: Posición de fin de la entidad
+            ventana: Tamaño de la ventana de contexto
+        
+        Returns:
+            Tupla (inicio_anterior, fin_anterior, inicio_posterior, fin_posterior)
+        """
+        # Contexto anterior
+        inicio_anterior, fin_anterior = _recortar_espacios(texto, max(0, inicio - ventana), inicio)
+        
+        # Contexto posterior
+        inicio_posterior, fin_posterior = _recortar_espacios(texto, fin, min(len(texto), fin + ventana))
+        
+        return inicio_anterior, fin_anterior, inicio_posterior, fin_posterior
     
     def _obtener_contexto_entidad(
         self, 
@@ -300,20 +466,17 @@ class AlgoritmoEntidades(ABC):
         Returns:
             Tupla con (contexto_anterior, contexto_posterior)
         """
-        # Contexto anterior
-        inicio_contexto_anterior = max(0, inicio - ventana)
-        contexto_anterior = texto[inicio_contexto_anterior:inicio].strip()
+        inicio_anterior, fin_anterior, inicio_posterior, fin_posterior = self._rango_contexto_entidad(
+            texto, inicio, fin, ventana
+        )
         
-        # Contexto posterior
-        fin_contexto_posterior = min(len(texto), fin + ventana)
-        contexto_posterior = texto[fin:fin_contexto_posterior].strip()
-        
-        return contexto_anterior, contexto_posterior
+        return texto[inicio_anterior:fin_anterior], texto[inicio_posterior:fin_posterior]
     
     def _obtener_oracion_completa(
         self, 
         texto: str, 
-        posicion: int
+        posicion: int,
+        delimitadores: Optional[Tuple[int, ...]] = None
     ) -> Optional[str]:
         """
         Obtener la oración completa que contiene una posición
@@ -321,19 +484,20 @@ class AlgoritmoEntidades(ABC):
         Args:
             texto: Texto completo
             posicion: Posición en el texto
+            delimitadores: Resultado de _posiciones_fin_oracion(texto); quien busca
+                varias entidades del mismo texto lo calcula una vez y lo reutiliza
             
         Returns:
             Oración completa o None si no se encuentra
         """
-        # Buscar inicio de la oración
-        inicio_oracion = posicion
-        while inicio_oracion > 0 and texto[inicio_oracion - 1] not in '.!?':
-            inicio_oracion -= 1
+        if delimitadores is None:
+            delimitadores = _posiciones_fin_oracion(texto)
+        
+        indice = bisect_left(delimitadores, posicion)
         
-        # Buscar fin de la oración
-        fin_oracion = posicion
-        while fin_oracion < len(texto) and texto[fin_oracion] not in '.!?':
-            fin_oracion += 1
+        # Inicio: justo después del último delimitador previo; fin: primer delimitador desde la posición
+        inicio_oracion = delimitadores[indice - 1] + 1 if indice > 0 else 0
+        fin_oracion = delimitadores[indice] if indice < len(delimitadores) else len(texto)
         
         if inicio_oracion < fin_oracion:
             return texto[inicio_oracion:fin_oracion].strip()
@@ -3,12 +3,138 @@ Algoritmo de Análisis de Sentimientos - Capa de Dominio
 Implementa diferentes algoritmos para análisis de sentimientos
 """
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Optional, Tuple
+from collections import Counter
+from typing import Dict, Any, FrozenSet, Iterable, List, Optional, Set, Tuple
 import structlog
 from enum import Enum
 
 from ..entidades.analisis_sentimiento import AnalisisSentimiento, CategoriaSentimiento, ModeloSentimiento
 
+try:
+    import ahocorasick
+    AHOCORASICK_DISPONIBLE = True
+except ImportError:  # pyahocorasick es opcional: sin él se busca palabra a palabra
+    AHOCORASICK_DISPONIBLE = False
+
+
+# Lista básica de palabras de sentimiento (se puede expandir)
+# Las palabras repetidas cuentan una vez por aparición en la lista
+_PALABRAS_POSITIVAS: Tuple[str, ...] = (
+    'bueno', 'excelente', 'fantástico', 'genial', 'perfecto', 'maravilloso',
+    'increíble', 'asombroso', 'magnífico', 'estupendo', 'formidable',
+    'good', 'excellent', 'fantastic', 'great', 'perfect', 'wonderful',
+    'amazing', 'awesome', 'magnificent', 'terrific', 'outstanding'
+)
+
+_PALABRAS_NEGATIVAS: Tuple[str, ...] = (
+    'malo', 'terrible', 'horrible', 'pésimo', 'fatal', 'desastroso',
+    'abominable', 'atroz', 'espantoso', 'repugnante', 'odioso',
+    'bad', 'terrible', 'awful', 'horrible', 'disgusting', 'hateful',
+    'atrocious', 'abominable', 'repugnant', 'odious'
+)
+
+# Palabras clave para cada emoción (se puede expandir)
+_PALABRAS_EMOCIONES: Dict[str, Tuple[str, ...]] = {
+    'alegria': ('feliz', 'contento', 'alegre', 'gozoso', 'dichoso', 'happy', 'joyful', 'cheerful'),
+    'tristeza': ('triste', 'melancólico', 'deprimido', 'apenado', 'sad', 'melancholy', 'depressed'),
+    'ira': ('enojado', 'furioso', 'irritado', 'molesto', 'angry', 'furious', 'irritated'),
+    'miedo': ('asustado', 'aterrorizado', 'nervioso', 'ansioso', 'afraid', 'terrified', 'nervous'),
+    'sorpresa': ('sorprendido', 'asombrado', 'impresionado', 'surprised', 'amazed', 'impressed'),
+    'disgusto': ('disgustado', 'repugnado', 'asqueado', 'disgusted', 'repulsed', 'revolted')
+}
+
+_VOCABULARIO_SENTIMIENTO: FrozenSet[str] = frozenset(_PALABRAS_POSITIVAS + _PALABRAS_NEGATIVAS)
+_VOCABULARIO_EMOCIONES: FrozenSet[str] = frozenset(
+    palabra for palabras in _PALABRAS_EMOCIONES.values() for palabra in palabras
+)
+_VOCABULARIO_COMPLETO: FrozenSet[str] = _VOCABULARIO_SENTIMIENTO | _VOCABULARIO_EMOCIONES
+
+# Palabras comunes (stopwords) excluidas de las palabras clave
+_STOPWORDS_ES: FrozenSet[str] = frozenset({
+    'el', 'la', 'de', 'que', 'y', 'a', 'en', 'un', 'es', 'se', 'no', 'te', 'lo',
+    'le', 'da', 'su', 'por', 'son', 'con', 'para', 'al', 'del', 'los', 'las',
+    'una', 'pero', 'sus', 'ha', 'me', 'si', 'sin', 'sobre', 'este', 'ya',
+    'entre', 'cuando', 'todo', 'esta', 'ser', 'dos', 'también', 'fue', 'había',
+    'era', 'muy', 'años', 'hasta', 'desde', 'está', 'mi', 'porque', 'qué',
+    'sólo', 'han', 'yo', 'hay', 'vez', 'puede', 'todos', 'así', 'nos', 'ni',
+    'parte', 'tiene', 'él', 'uno', 'donde', 'bien', 'tiempo', 'mismo', 'ese',
+    'ahora', 'cada', 'e', 'vida', 'otro', 'después', 'otros', 'aunque', 'esa',
+    'esos', 'estas', 'estos', 'otra', 'otras', 'poco', 'tan', 'tanto', 'toda',
+    'todas', 'tres', 'tu', 'tus', 'tuya', 'tuyas', 'tuyo', 'tuyos'
+})
+
+
+def _construir_automata(palabras: Iterable[str]) -> "ahocorasick.Automaton":
+    """
+    Construir un autómata Aho-Corasick cuyo valor es la propia palabra
+    
+    Args:
+        palabras: Vocabulario a reconocer
+    
+    Returns:
+        Autómata listo para buscar
+    """
+    automata = ahocorasick.Automaton()
+    for palabra in palabras:
+        automata.add_word(palabra, palabra)
+    automata.make_automaton()
+    return automata
+
+
+# Un único autómata para todo el vocabulario: una pasada lineal por el texto
+_AUTOMATA_PALABRAS = (
+    _construir_automata(_VOCABULARIO_COMPLETO)
+    if AHOCORASICK_DISPONIBLE else None
+)
+
+
+def _palabras_presentes(texto_lower: str, vocabulario: FrozenSet[str]) -> Set[str]:
+    """
+    Palabras del vocabulario contenidas en el texto (como subcadena)
+    
+    Args:
+        texto_lower: Texto en minúsculas
+        vocabulario: Palabras a buscar
+    
+    Returns:
+        Conjunto de palabras encontradas
+    """
+    if _AUTOMATA_PALABRAS is not None:
+        return {palabra for _, palabra in _AUTOMATA_PALABRAS.iter(texto_lower) if palabra in vocabulario}
+    
+    return {palabra for palabra in vocabulario if palabra in texto_lower}
+
+
+def _contar_sentimiento(presentes: Set[str]) -> int:
+    """
+    Contar palabras de sentimiento a partir de las palabras encontradas
+    
+    Args:
+        presentes: Palabras del vocabulario encontradas en el texto
+    
+    Returns:
+        Número de palabras de sentimiento
+    """
+    positivas = sum(1 for palabra in _PALABRAS_POSITIVAS if palabra in presentes)
+    negativas = sum(1 for palabra in _PALABRAS_NEGATIVAS if palabra in presentes)
+    return positivas + negativas
+
+
+def _puntuar_emociones(presentes: Set[str]) -> Dict[str, float]:
+    """
+    Calcular la intensidad de cada emoción a partir de las palabras encontradas
+    
+    Args:
+        presentes: Palabras del vocabulario encontradas en el texto
+    
+    Returns:
+        Diccionario con emociones y sus intensidades
+    """
+    return {
+        emocion: min(1.0, sum(1 for palabra in palabras if palabra in presentes) / 3)  # Normalizar a 3 palabras
+        for emocion, palabras in _PALABRAS_EMOCIONES.items()
+    }
+
 
 class AlgoritmoSentimientos(ABC):
     """
@@ -16,6 +142,23 @@ class AlgoritmoSentimientos(ABC):
     Implementa el patrón Strategy para diferentes algoritmos
     """
     
+    # Indica si el algoritmo implementa analizar_batch
+    soporta_lote: bool = False
+    
+    # Indica si el algoritmo implementa analizar_sync (ejecutable en un hilo)
+    soporta_sync: bool = False
+    
+    # Indica si el algoritmo implementa analizar_doc (documento ya procesado)
+    soporta_doc: bool = False
+    
+    # Componentes del pipeline que necesita el algoritmo (None = todos)
+    componentes_requeridos: Optional[List[str]] = None
+    
+    # Léxicos de sentimiento para búsquedas por token; se construyen una vez
+    # y los comparten todas las instancias
+    lexico_positivo: FrozenSet[str] = frozenset(_PALABRAS_POSITIVAS)
+    lexico_negativo: FrozenSet[str] = frozenset(_PALABRAS_NEGATIVAS)
+    
     def __init__(self, nombre: str, configuracion: Optional[Dict[str, Any]] = None):
         """
         Inicializar algoritmo de sentimientos
@@ -27,6 +170,10 @@ class AlgoritmoSentimientos(ABC):
         self.nombre = nombre
         self.configuracion = configuracion or {}
         self.logger = structlog.get_logger()
+        
+        # Componentes que no deben cargarse (None = todos los no requeridos)
+        # Las implementaciones spaCy los pasan como exclude a spacy.load
+        self.componentes_excluir: Optional[List[str]] = self.configuracion.get("excluir_componentes")
     
     @abstractmethod
     async def analizar(self, texto: str, idioma: str = "es") -> AnalisisSentimiento:
@@ -42,6 +189,45 @@ class AlgoritmoSentimientos(ABC):
         """
         pass
     
+    def analizar_sync(self, texto: str, idioma: str = "es") -> AnalisisSentimiento:
+        """
+        Analizar sentimientos de un texto de forma síncrona
+        
+        Args:
+            texto: Texto a analizar
+            idioma: Idioma del texto
+        
+        Returns:
+            Resultado del análisis de sentimientos
+        """
+        raise NotImplementedError(f"{type(self).__name__} no soporta análisis síncrono")
+    
+    def analizar_doc(self, doc: Any, idioma: str = "es") -> AnalisisSentimiento:
+        """
+        Analizar sentimientos de un documento ya procesado (síncrono)
+        
+        Args:
+            doc: Documento procesado por el pipeline del algoritmo
+            idioma: Idioma del texto
+        
+        Returns:
+            Resultado del análisis de sentimientos
+        """
+        raise NotImplementedError(f"{type(self).__name__} no soporta documentos procesados")
+    
+    def analizar_batch(self, textos: List[str], idioma: str = "es") -> List[AnalisisSentimiento]:
+        """
+        Analizar sentimientos de múltiples textos en una sola pasada (síncrono)
+        
+        Args:
+            textos: Lista de textos a analizar
+            idioma: Idioma de los textos
+        
+        Returns:
+            Lista de resultados de análisis
+        """
+        raise NotImplementedError(f"{type(self).__name__} no soporta análisis por lotes")
+    
     @abstractmethod
     def validar_configuracion(self) -> bool:
         """
@@ -109,14 +295,20 @@ class AlgoritmoSentimientos(ABC):
         
         return min(1.0, max(0.0, confianza))
     
-    def _calcular_calidad(self, texto: str, polaridad: float) -> float:
+    def _calcular_calidad(
+        self, 
+        texto: str, 
+        polaridad: float, 
+        palabras_sentimiento: Optional[int] = None
+    ) -> float:
         """
         Calcular calidad del análisis
         
         Args:
             texto: Texto analizado
             polaridad: Valor de polaridad obtenido
-            
+            palabras_sentimiento: Conteo ya calculado de palabras de sentimiento (opcional)
+        
         Returns:
             Valor de calidad (0.0 a 1.0)
         """
@@ -137,7 +329,8 @@ class AlgoritmoSentimientos(ABC):
         factores.append(factor_consistencia)
         
         # Factor de presencia de palabras de sentimiento
-        palabras_sentimiento = self._contar_palabras_sentimiento(texto)
+        if palabras_sentimiento is None:
+            palabras_sentimiento = self._contar_palabras_sentimiento(texto)
         factor_palabras = min(1.0, palabras_sentimiento / 5)  # Normalizar a 5 palabras
         factores.append(factor_palabras)
         
@@ -146,6 +339,7 @@ class AlgoritmoSentimientos(ABC):
     def _contar_palabras_sentimiento(self, texto: str) -> int:
         """
         Contar palabras relacionadas con sentimientos
+        Trabaja sobre el texto plano y no debe provocar la carga de modelos
         
         Args:
             texto: Texto a analizar
@@ -153,92 +347,65 @@ class AlgoritmoSentimientos(ABC):
         Returns:
             Número de palabras de sentimiento
         """
-        # Lista básica de palabras de sentimiento (se puede expandir)
-        palabras_positivas = [
-            'bueno', 'excelente', 'fantástico', 'genial', 'perfecto', 'maravilloso',
-            'increíble', 'asombroso', 'magnífico', 'estupendo', 'formidable',
-            'good', 'excellent', 'fantastic', 'great', 'perfect', 'wonderful',
-            'amazing', 'awesome', 'magnificent', 'terrific', 'outstanding'
-        ]
-        
-        palabras_negativas = [
-            'malo', 'terrible', 'horrible', 'pésimo', 'fatal', 'desastroso',
-            'abominable', 'atroz', 'espantoso', 'repugnante', 'odioso',
-            'bad', 'terrible', 'awful', 'horrible', 'disgusting', 'hateful',
-            'atrocious', 'abominable', 'repugnant', 'odious'
-        ]
+        return _contar_sentimiento(_palabras_presentes(texto.lower(), _VOCABULARIO_SENTIMIENTO))
+    
+    def _analizar_palabras(self, texto: str) -> Tuple[int, Dict[str, float]]:
+        """
+        Contar palabras de sentimiento y detectar emociones en una sola pasada
+        Trabaja sobre el texto plano y no debe provocar la carga de modelos
         
-        texto_lower = texto.lower()
-        palabras_positivas_encontradas = sum(1 for palabra in palabras_positivas if palabra in texto_lower)
-        palabras_negativas_encontradas = sum(1 for palabra in palabras_negativas if palabra in texto_lower)
+        Args:
+            texto: Texto a analizar
         
-        return palabras_positivas_encontradas + palabras_negativas_encontradas
+        Returns:
+            Tupla (número de palabras de sentimiento, emociones con sus intensidades)
+        """
+        presentes = _palabras_presentes(texto.lower(), _VOCABULARIO_COMPLETO)
+        return _contar_sentimiento(presentes), _puntuar_emociones(presentes)
     
-    def _extraer_palabras_clave(self, texto: str, limite: int = 10) -> List[str]:
+    def _extraer_palabras_clave(
+        self,
+        texto: str,
+        limite: int = 10,
+        texto_lower: Optional[str] = None
+    ) -> List[str]:
         """
         Extraer palabras clave del texto
         
         Args:
             texto: Texto a analizar
             limite: Número máximo de palabras clave
+            texto_lower: texto.lower() si quien llama ya lo calculó
             
         Returns:
             Lista de palabras clave
         """
+        if texto_lower is None:
+            texto_lower = texto.lower()
+        
         # Implementación simple (se puede mejorar con TF-IDF, etc.)
-        palabras = texto.lower().split()
+        palabras = texto_lower.split()
         
         # Filtrar palabras comunes
-        palabras_comunes = {
-            'el', 'la', 'de', 'que', 'y', 'a', 'en', 'un', 'es', 'se', 'no', 'te', 'lo', 'le', 'da', 'su', 'por', 'son', 'con', 'para', 'al', 'del', 'los', 'las', 'una', 'pero', 'sus', 'le', 'ha', 'me', 'si', 'sin', 'sobre', 'este', 'ya', 'entre', 'cuando', 'todo', 'esta', 'ser', 'son', 'dos', 'también', 'fue', 'había', 'era', 'muy', 'años', 'hasta', 'desde', 'está', 'mi', 'porque', 'qué', 'sólo', 'han', 'yo', 'hay', 'vez', 'puede', 'todos', 'así', 'nos', 'ni', 'parte', 'tiene', 'él', 'uno', 'donde', 'bien', 'tiempo', 'mismo', 'ese', 'ahora', 'cada', 'e', 'vida', 'otro', 'después', 'te', 'otros', 'aunque', 'esa', 'esos', 'estas', 'estos', 'otra', 'otras', 'otro', 'otros', 'poco', 'tan', 'tanto', 'toda', 'todas', 'todo', 'todos', 'tres', 'tu', 'tus', 'tuya', 'tuyas', 'tuyo', 'tuyos', 'tu', 'tus', 'tuya', 'tuyas', 'tuyo', 'tuyos', 'tu', 'tus', 'tuya', 'tuyas', 'tuyo', 'tuyos'
-        }
-        
-        palabras_filtradas = [palabra for palabra in palabras if palabra not in palabras_comunes and len(palabra) > 2]
-        
-        # Contar frecuencia
-        frecuencia = {}
-        for palabra in palabras_filtradas:
-            frecuencia[palabra] = frecuencia.get(palabra, 0) + 1
-        
-        # Ordenar por frecuencia y devolver las más frecuentes
-        palabras_ordenadas = sorted(frecuencia.items(), key=lambda x: x[1], reverse=True)
+        palabras_filtradas = [palabra for palabra in palabras if palabra not in _STOPWORDS_ES and len(palabra) > 2]
         
-        return [palabra for palabra, _ in palabras_ordenadas[:limite]]
+        # Contar frecuencia y quedarse con las más frecuentes (selección parcial
+        # con heapq; los empates conservan el orden de aparición)
+        return [palabra for palabra, _ in Counter(palabras_filtradas).most_common(limite)]
     
-    def _detectar_emociones(self, texto: str) -> Dict[str, float]:
+    def _detectar_emociones(self, texto: str, texto_lower: Optional[str] = None) -> Dict[str, float]:
         """
         Detectar emociones en el texto
+        Trabaja sobre el texto plano y no debe provocar la carga de modelos
         
         Args:
             texto: Texto a analizar
+            texto_lower: texto.lower() si quien llama ya lo calculó
             
         Returns:
             Diccionario con emociones y sus intensidades
         """
-        # Implementación básica de detección de emociones
-        emociones = {
-            'alegria': 0.0,
-            'tristeza': 0.0,
-            'ira': 0.0,
-            'miedo': 0.0,
-            'sorpresa': 0.0,
-            'disgusto': 0.0
-        }
-        
-        # Palabras clave para cada emoción (se puede expandir)
-        palabras_emociones = {
-            'alegria': ['feliz', 'contento', 'alegre', 'gozoso', 'dichoso', 'happy', 'joyful', 'cheerful'],
-            'tristeza': ['triste', 'melancólico', 'deprimido', 'apenado', 'sad', 'melancholy', 'depressed'],
-            'ira': ['enojado', 'furioso', 'irritado', 'molesto', 'angry', 'furious', 'irritated'],
-            'miedo': ['asustado', 'aterrorizado', 'nervioso', 'ansioso', 'afraid', 'terrified', 'nervous'],
-            'sorpresa': ['sorprendido', 'asombrado', 'impresionado', 'surprised', 'amazed', 'impressed'],
-            'disgusto': ['disgustado', 'repugnado', 'asqueado', 'disgusted', 'repulsed', 'revolted']
-        }
-        
-        texto_lower = texto.lower()
-        
-        for emocion, palabras in palabras_emociones.items():
-            conteo = sum(1 for palabra in palabras if palabra in texto_lower)
-            emociones[emocion] = min(1.0, conteo / 3)  # Normalizar a 3 palabras
+        if texto_lower is None:
+            texto_lower = texto.lower()
         
-        return emociones
+        return _puntuar_emociones(_palabras_presentes(texto_lower, _VOCABULARIO_EMOCIONES))
@@ -2,6 +2,7 @@
 Entidad Análisis de Sentimiento - Capa de Dominio
 Representa el resultado de un análisis de sentimientos
 """
+from bisect import bisect_right
 from dataclasses import dataclass
 from typing import Optional, List, Dict, Any
 from datetime import datetime
@@ -24,11 +25,17 @@ class ModeloSentimiento(Enum):
     SPACY = "spacy"
 
 
-@dataclass
+# Umbrales (inclusivos) de intensidad y su etiqueta: |polaridad| >= umbral
+_UMBRALES_INTENSIDAD = (0.2, 0.4, 0.6, 0.8)
+_ETIQUETAS_INTENSIDAD = ("muy_baja", "baja", "media", "alta", "muy_alta")
+
+
+@dataclass(slots=True)
 class AnalisisSentimiento:
     """
     Entidad que representa el resultado de un análisis de sentimientos
     Encapsula toda la información del análisis realizado
+    Usa __slots__ (sin __dict__ por instancia) porque se acumula en lotes
     """
     
     # Información básica
@@ -81,18 +88,8 @@ class AnalisisSentimiento:
     
     def obtener_intensidad(self) -> str:
         """Obtener intensidad del sentimiento"""
-        intensidad_absoluta = abs(self.polaridad)
-        
-        if intensidad_absoluta >= 0.8:
-            return "muy_alta"
-        elif intensidad_absoluta >= 0.6:
-            return "alta"
-        elif intensidad_absoluta >= 0.4:
-            return "media"
-        elif intensidad_absoluta >= 0.2:
-            return "baja"
-        else:
-            return "muy_baja"
+        # bisect_right: un valor igual al umbral pertenece al tramo superior
+        return _ETIQUETAS_INTENSIDAD[bisect_right(_UMBRALES_INTENSIDAD, abs(self.polaridad))]
     
     def obtener_resumen(self) -> str:
         """Obtener resumen del análisis"""
@@ -110,7 +107,8 @@ class AnalisisSentimiento:
         if not self.emociones_detectadas:
             return None
         
-        return max(self.emociones_detectadas.items(), key=lambda x: x[1])[0]
+        # Recorre las claves sin crear tuplas (clave, valor) ni lambdas
+        return max(self.emociones_detectadas, key=self.emociones_detectadas.get)
     
     def obtener_palabras_mas_importantes(self, limite: int = 5) -> List[str]:
         """Obtener las palabras más importantes del análisis"""
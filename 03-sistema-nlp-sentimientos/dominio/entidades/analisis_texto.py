@@ -2,13 +2,17 @@
 Entidad Análisis de Texto - Capa de Dominio
 Representa el resultado de un análisis completo de texto
 """
-from dataclasses import dataclass
+from bisect import bisect_right
+import heapq
+from collections import defaultdict
+from dataclasses import dataclass, field
+from itertools import islice
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
 
 from .analisis_sentimiento import AnalisisSentimiento
-from .entidad_nombrada import EntidadNombrada
+from .entidad_nombrada import EntidadNombrada, TipoEntidad
 
 
 class TipoAnalisis(Enum):
@@ -33,11 +37,17 @@ class CategoriaTexto(Enum):
     OTRO = "otro"
 
 
-@dataclass
+# Umbrales (inclusivos) de complejidad y su nivel: complejidad >= umbral
+_UMBRALES_COMPLEJIDAD = (0.2, 0.4, 0.6, 0.8)
+_NIVELES_COMPLEJIDAD = ("muy_baja", "baja", "media", "alta", "muy_alta")
+
+
+@dataclass(slots=True)
 class AnalisisTexto:
     """
     Entidad que representa el resultado de un análisis completo de texto
     Agrupa todos los análisis realizados sobre un texto
+    Usa __slots__ (sin __dict__ por instancia)
     """
     
     # Información básica
@@ -49,7 +59,7 @@ class AnalisisTexto:
     analisis_sentimiento: Optional[AnalisisSentimiento] = None
     
     # Entidades extraídas
-    entidades: List[EntidadNombrada] = None
+    entidades: List[EntidadNombrada] = field(default_factory=list)
     
     # Clasificación de texto
     categoria: Optional[CategoriaTexto] = None
@@ -57,36 +67,39 @@ class AnalisisTexto:
     
     # Resumen
     resumen: Optional[str] = None
-    palabras_clave: List[str] = None
+    palabras_clave: List[str] = field(default_factory=list)
     
     # Estadísticas del texto
-    estadisticas: Dict[str, Any] = None
+    estadisticas: Dict[str, Any] = field(default_factory=dict)
     
     # Metadatos
     fecha_analisis: Optional[datetime] = None
     tiempo_procesamiento_ms: float = 0.0
-    version_modelos: Dict[str, str] = None
+    version_modelos: Dict[str, str] = field(default_factory=dict)
     
     def __post_init__(self):
         """Inicialización post-construcción"""
         if self.fecha_analisis is None:
             self.fecha_analisis = datetime.utcnow()
-        
-        if self.entidades is None:
-            self.entidades = []
-        
-        if self.palabras_clave is None:
-            self.palabras_clave = []
-        
-        if self.estadisticas is None:
-            self.estadisticas = {}
-        
-        if self.version_modelos is None:
-            self.version_modelos = {}
+    
+    def _indice_por_tipo(self) -> Dict[str, List[EntidadNombrada]]:
+        """
+        Agrupar las entidades por tipo en una sola pasada, en orden de primera aparición
+        Se construye en cada llamada: entidades es una lista pública que puede
+        modificarse in situ, así que el índice no se guarda entre llamadas
+        """
+        indice = defaultdict(list)
+        for entidad in self.entidades:
+            indice[entidad.tipo_value].append(entidad)
+        return indice
+    
+    def agregar_entidad(self, entidad: EntidadNombrada) -> None:
+        """Agregar una entidad al análisis"""
+        self.entidades.append(entidad)
     
     def obtener_entidades_por_tipo(self, tipo: str) -> List[EntidadNombrada]:
         """Obtener entidades de un tipo específico"""
-        return [entidad for entidad in self.entidades if entidad.tipo.value == tipo]
+        return [entidad for entidad in self.entidades if entidad.tipo_value == tipo]
     
     def obtener_entidades_confiables(self, umbral: float = 0.7) -> List[EntidadNombrada]:
         """Obtener entidades confiables"""
@@ -94,11 +107,11 @@ class AnalisisTexto:
     
     def obtener_personas(self) -> List[EntidadNombrada]:
         """Obtener entidades de tipo persona"""
-        return self.obtener_entidades_por_tipo("PERSON")
+        return [entidad for entidad in self.entidades if entidad.tipo is TipoEntidad.PERSONA]
     
     def obtener_organizaciones(self) -> List[EntidadNombrada]:
         """Obtener entidades de tipo organización"""
-        return self.obtener_entidades_por_tipo("ORG")
+        return [entidad for entidad in self.entidades if entidad.tipo is TipoEntidad.ORGANIZACION]
     
     def obtener_lugares(self) -> List[EntidadNombrada]:
         """Obtener entidades de tipo lugar"""
@@ -110,11 +123,11 @@ class AnalisisTexto:
     
     def obtener_fechas(self) -> List[EntidadNombrada]:
         """Obtener entidades de tipo fecha"""
-        return self.obtener_entidades_por_tipo("DATE")
+        return [entidad for entidad in self.entidades if entidad.tipo is TipoEntidad.FECHA]
     
     def obtener_dinero(self) -> List[EntidadNombrada]:
         """Obtener entidades de tipo dinero"""
-        return self.obtener_entidades_por_tipo("MONEY")
+        return [entidad for entidad in self.entidades if entidad.tipo is TipoEntidad.DINERO]
     
     def tiene_sentimiento_positivo(self) -> bool:
         """Verificar si el texto tiene sentimiento positivo"""
@@ -136,20 +149,16 @@ class AnalisisTexto:
     
     def obtener_resumen_entidades(self) -> Dict[str, int]:
         """Obtener resumen de entidades por tipo"""
-        resumen = {}
-        for entidad in self.entidades:
-            tipo = entidad.tipo.value
-            resumen[tipo] = resumen.get(tipo, 0) + 1
-        return resumen
+        return {tipo: len(entidades) for tipo, entidades in self._indice_por_tipo().items()}
     
     def obtener_entidades_mas_importantes(self, limite: int = 5) -> List[EntidadNombrada]:
         """Obtener las entidades más importantes"""
-        entidades_ordenadas = sorted(
+        # Selección parcial O(N log limite); conserva el orden de sorted(..., reverse=True)[:limite]
+        return heapq.nlargest(
+            limite,
             self.entidades,
-            key=lambda e: e.calcular_puntuacion_compuesta(),
-            reverse=True
+            key=lambda e: e.calcular_puntuacion_compuesta()
         )
-        return entidades_ordenadas[:limite]
     
     def calcular_complejidad(self) -> float:
         """Calcular complejidad del análisis"""
@@ -166,7 +175,7 @@ class AnalisisTexto:
         factores.append(factor_entidades)
         
         # Factor de diversidad de tipos de entidades
-        tipos_unicos = len(set(entidad.tipo for entidad in self.entidades))
+        tipos_unicos = len({entidad.tipo for entidad in self.entidades})
         factor_diversidad = min(1.0, tipos_unicos / 10)  # Normalizar a 10 tipos
         factores.append(factor_diversidad)
         
@@ -179,18 +188,7 @@ class AnalisisTexto:
     
     def obtener_nivel_complejidad(self) -> str:
         """Obtener nivel de complejidad del análisis"""
-        complejidad = self.calcular_complejidad()
-        
-        if complejidad >= 0.8:
-            return "muy_alta"
-        elif complejidad >= 0.6:
-            return "alta"
-        elif complejidad >= 0.4:
-            return "media"
-        elif complejidad >= 0.2:
-            return "baja"
-        else:
-            return "muy_baja"
+        return _NIVELES_COMPLEJIDAD[bisect_right(_UMBRALES_COMPLEJIDAD, self.calcular_complejidad())]
     
     def es_analisis_completo(self) -> bool:
         """Verificar si es un análisis completo"""
@@ -211,8 +209,9 @@ class AnalisisTexto:
         # Entidades
         if self.entidades:
             num_entidades = len(self.entidades)
-            resumen_entidades = self.obtener_resumen_entidades()
-            entidades_principales = list(resumen_entidades.keys())[:3]
+            # Los tres primeros tipos en orden de aparición, sin construir el conteo completo
+            tipos_en_orden = dict.fromkeys(entidad.tipo_value for entidad in self.entidades)
+            entidades_principales = list(islice(tipos_en_orden, 3))
             resumen_partes.append(f"Entidades encontradas: {num_entidades} ({', '.join(entidades_principales)})")
         
         # Categoría
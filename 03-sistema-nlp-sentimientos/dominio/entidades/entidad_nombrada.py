@@ -2,10 +2,18 @@
 Entidad Entidad Nombrada - Capa de Dominio
 Representa una entidad extraída del texto
 """
-from dataclasses import dataclass
-from typing import Optional, List, Dict, Any
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import Optional, List, Dict, Any, Union
 from datetime import datetime
 from enum import Enum
+import numpy as np
+
+try:
+    from rapidfuzz import fuzz
+    RAPIDFUZZ_DISPONIBLE = True
+except ImportError:  # rapidfuzz es opcional: solo lo usa la similitud difusa (similitud_difusa)
+    RAPIDFUZZ_DISPONIBLE = False
 
 
 class TipoEntidad(Enum):
@@ -32,11 +40,23 @@ class TipoEntidad(Enum):
     OTRO = "MISC"
 
 
-@dataclass
+# Umbrales (inclusivos) de importancia y su etiqueta: confianza y calidad >= umbral
+_UMBRALES_IMPORTANCIA = (0.6, 0.7, 0.8, 0.9)
+_NIVELES_IMPORTANCIA = ("muy_baja", "baja", "media", "alta", "muy_alta")
+
+# Tipos en orden alfabético de valor; su posición es el identificador numérico
+# (EntidadNombrada.tipo_id y columna tipo_id de EntidadBatch)
+_TIPOS_ORDENADOS: List[TipoEntidad] = sorted(TipoEntidad, key=lambda t: t.value)
+_ID_POR_TIPO: Dict[TipoEntidad, int] = {tipo: i for i, tipo in enumerate(_TIPOS_ORDENADOS)}
+
+
+@dataclass(slots=True)
 class EntidadNombrada:
     """
     Entidad que representa una entidad extraída del texto
     Contiene información sobre la entidad y su contexto
+    Usa __slots__ (sin __dict__ por instancia) porque un documento largo
+    produce miles de entidades
     """
     
     # Información básica
@@ -57,7 +77,7 @@ class EntidadNombrada:
     # Información adicional
     lema: Optional[str] = None
     etiqueta_pos: Optional[str] = None
-    dependencias: List[Dict[str, Any]] = None
+    dependencias: List[Dict[str, Any]] = field(default_factory=list)
     
     # Metadatos
     modelo_usado: Optional[str] = None
@@ -68,9 +88,16 @@ class EntidadNombrada:
         """Inicialización post-construcción"""
         if self.fecha_extraccion is None:
             self.fecha_extraccion = datetime.utcnow()
-        
-        if self.dependencias is None:
-            self.dependencias = []
+    
+    @property
+    def tipo_value(self) -> str:
+        """Valor del tipo; se deriva de tipo para seguir sus reasignaciones"""
+        return self.tipo.value
+    
+    @property
+    def tipo_id(self) -> int:
+        """Identificador numérico del tipo (posición en EntidadBatch.TIPOS)"""
+        return _ID_POR_TIPO[self.tipo]
     
     def es_persona(self) -> bool:
         """Verificar si es una persona"""
@@ -124,16 +151,9 @@ class EntidadNombrada:
     
     def obtener_importancia(self) -> str:
         """Obtener nivel de importancia de la entidad"""
-        if self.confianza >= 0.9 and self.calidad_extraccion >= 0.9:
-            return "muy_alta"
-        elif self.confianza >= 0.8 and self.calidad_extraccion >= 0.8:
-            return "alta"
-        elif self.confianza >= 0.7 and self.calidad_extraccion >= 0.7:
-            return "media"
-        elif self.confianza >= 0.6 and self.calidad_extraccion >= 0.6:
-            return "baja"
-        else:
-            return "muy_baja"
+        # Ambos valores superan un umbral si y solo si lo supera el menor
+        minimo = min(self.confianza, self.calidad_extraccion)
+        return _NIVELES_IMPORTANCIA[bisect_right(_UMBRALES_IMPORTANCIA, minimo)]
     
     def obtener_resumen(self) -> str:
         """Obtener resumen de la entidad"""
@@ -149,14 +169,35 @@ class EntidadNombrada:
         
         return (factor_confianza * factor_calidad * factor_longitud)
     
-    def es_similar_a(self, otra_entidad: 'EntidadNombrada', umbral: float = 0.8) -> bool:
-        """Verificar si es similar a otra entidad"""
+    @property
+    def texto_normalizado(self) -> str:
+        """Texto en minúsculas y sin espacios extremos; se deriva de texto en cada acceso"""
+        return self.texto.lower().strip()
+    
+    def es_similar_a(
+        self,
+        otra_entidad: 'EntidadNombrada',
+        umbral: float = 0.8,
+        similitud_difusa: bool = False
+    ) -> bool:
+        """
+        Verificar si es similar a otra entidad
+        
+        Args:
+            otra_entidad: Entidad con la que comparar
+            umbral: Similitud mínima (0-1) de la comparación difusa
+            similitud_difusa: Si además de igualdad y contención se acepta una
+                similitud de edición >= umbral (requiere rapidfuzz)
+            
+        Returns:
+            True si ambas entidades son del mismo tipo y sus textos coinciden
+        """
         if self.tipo != otra_entidad.tipo:
             return False
         
         # Comparar texto (similitud simple)
-        texto1 = self.texto.lower().strip()
-        texto2 = otra_entidad.texto.lower().strip()
+        texto1 = self.texto_normalizado
+        texto2 = otra_entidad.texto_normalizado
         
         if texto1 == texto2:
             return True
@@ -165,10 +206,16 @@ class EntidadNombrada:
         if texto1 in texto2 or texto2 in texto1:
             return True
         
-        # Aquí se podría implementar similitud más sofisticada
-        # usando embeddings o algoritmos de distancia
+        if not similitud_difusa:
+            return False
         
-        return False
+        if not RAPIDFUZZ_DISPONIBLE:
+            raise ImportError("similitud_difusa requiere rapidfuzz (pip install rapidfuzz)")
+        
+        # Similitud por distancia de edición normalizada (0-100) en código nativo;
+        # con score_cutoff rapidfuzz abandona en cuanto no puede alcanzar el umbral
+        corte = umbral * 100
+        return fuzz.ratio(texto1, texto2, score_cutoff=corte) >= corte
     
     def __str__(self) -> str:
         """Representación string de la entidad"""
@@ -180,3 +227,71 @@ class EntidadNombrada:
             f"EntidadNombrada(texto='{self.texto}', tipo={self.tipo.value}, "
             f"posicion=({self.inicio}, {self.fin}), confianza={self.confianza:.2f})"
         )
+
+
+@dataclass
+class EntidadBatch:
+    """
+    Vista en columnas (estructura de arrays) de una lista de entidades
+    Permite calcular estadísticas y filtros sobre arrays contiguos de NumPy
+    """
+    
+    entidades: List[EntidadNombrada]
+    confianza: np.ndarray  # float64[N]
+    calidad: np.ndarray    # float64[N]
+    inicio: np.ndarray     # int64[N]
+    fin: np.ndarray        # int64[N]
+    longitud: np.ndarray   # int64[N]
+    tipo_id: np.ndarray    # uint8[N], índice en TIPOS (EntidadNombrada.tipo_id)
+    
+    # Mapa identificador -> tipo de entidad
+    TIPOS = _TIPOS_ORDENADOS
+    
+    @classmethod
+    def desde_entidades(cls, entidades: List[EntidadNombrada]) -> 'EntidadBatch':
+        """Construir las columnas a partir de una lista de entidades"""
+        n = len(entidades)
+        inicio = np.fromiter((e.inicio for e in entidades), dtype=np.int64, count=n)
+        fin = np.fromiter((e.fin for e in entidades), dtype=np.int64, count=n)
+        return cls(
+            entidades=entidades,
+            confianza=np.fromiter((e.confianza for e in entidades), dtype=np.float64, count=n),
+            calidad=np.fromiter((e.calidad_extraccion for e in entidades), dtype=np.float64, count=n),
+            inicio=inicio,
+            fin=fin,
+            longitud=fin - inicio,
+            tipo_id=np.fromiter((e.tipo_id for e in entidades), dtype=np.uint8, count=n)
+        )
+    
+    @classmethod
+    def como_lote(cls, entidades: Union[List[EntidadNombrada], 'EntidadBatch']) -> 'EntidadBatch':
+        """Obtener la vista en columnas, construyéndola si se recibe una lista"""
+        if isinstance(entidades, cls):
+            return entidades
+        return cls.desde_entidades(entidades)
+    
+    @staticmethod
+    def id_de_tipo(tipo: TipoEntidad) -> int:
+        """Obtener el identificador numérico de un tipo"""
+        return _ID_POR_TIPO[tipo]
+    
+    def __len__(self) -> int:
+        return len(self.entidades)
+    
+    def puntuaciones_compuestas(self) -> np.ndarray:
+        """Equivalente vectorizado de EntidadNombrada.calcular_puntuacion_compuesta"""
+        factor_longitud = np.minimum(1.0, self.longitud / 50)
+        return self.confianza * self.calidad * factor_longitud
+    
+    def mascara_confiables(self, umbral: float = 0.7) -> np.ndarray:
+        """Equivalente vectorizado de EntidadNombrada.es_confiable"""
+        return (self.confianza >= umbral) & (self.calidad >= umbral)
+    
+    def distribucion_tipos(self) -> Dict[str, int]:
+        """Conteo por tipo en orden de primera aparición"""
+        ids, primeros, conteos = np.unique(self.tipo_id, return_index=True, return_counts=True)
+        orden = np.argsort(primeros)
+        return {
+            self.TIPOS[ids[i]].value: int(conteos[i])
+            for i in orden
+        }
@@ -22,7 +22,9 @@ async def configurar_servicios():
     
     # Crear algoritmos
     algoritmo_sentimientos = AlgoritmoSpacySentimientos()
-    algoritmo_entidades = AlgoritmoSpacyEntidades()
+    # Entidades conserva también los componentes de etiquetas POS que usa
+    # sentimientos, para que ejemplo_analisis_completo comparta un solo Doc
+    algoritmo_entidades = AlgoritmoSpacyEntidades({"excluir_componentes": ["parser", "lemmatizer"]})
     
     # Registrar algoritmos
     servicio_sentimientos.registrar_algoritmo("spacy", algoritmo_sentimientos)
@@ -133,7 +135,7 @@ async def ejemplo_extraccion_entidades(servicio_entidades):
             # Agrupar por tipo
             tipos_entidades = {}
             for entidad in entidades:
-                tipo = entidad.tipo.value
+                tipo = entidad.tipo_value
                 if tipo not in tipos_entidades:
                     tipos_entidades[tipo] = []
                 tipos_entidades[tipo].append(entidad)
@@ -176,13 +178,20 @@ async def ejemplo_analisis_completo(servicio_sentimientos, servicio_entidades):
     print(f"   {texto_ejemplo.strip()}")
     
     try:
-        # Análisis de sentimientos
-        print(f"\n📊 Análisis de Sentimientos:")
-        resultado_sentimientos = await servicio_sentimientos.analizar_sentimiento(
-            texto=texto_ejemplo,
-            idioma="es"
+        # El Doc sale del pipeline del algoritmo de entidades, con su configuración,
+        # así que da las mismas entidades que extraer_entidades; además incluye las
+        # etiquetas POS que usa sentimientos (ver configurar_servicios)
+        nlp = servicio_entidades.obtener_algoritmo("spacy").obtener_modelo("es")
+        doc = await asyncio.to_thread(nlp, texto_ejemplo)
+        
+        # Sentimientos y entidades son independientes: se lanzan a la vez
+        resultado_sentimientos, entidades = await asyncio.gather(
+            servicio_sentimientos.analizar_sentimiento_doc(doc, idioma="es"),
+            servicio_entidades.extraer_entidades_doc(doc, idioma="es")
         )
         
+        # Análisis de sentimientos
+        print(f"\n📊 Análisis de Sentimientos:")
         print(f"   • Categoría: {resultado_sentimientos.categoria.value}")
         print(f"   • Polaridad: {resultado_sentimientos.polaridad:.3f}")
         print(f"   • Subjetividad: {resultado_sentimientos.subjetividad:.3f}")
@@ -190,17 +199,12 @@ async def ejemplo_analisis_completo(servicio_sentimientos, servicio_entidades):
         
         # Extracción de entidades
         print(f"\n🏷️ Extracción de Entidades:")
-        entidades = await servicio_entidades.extraer_entidades(
-            texto=texto_ejemplo,
-            idioma="es"
-        )
-        
         print(f"   • Total de entidades: {len(entidades)}")
         
         # Mostrar entidades por tipo
         tipos_entidades = {}
         for entidad in entidades:
-            tipo = entidad.tipo.value
+            tipo = entidad.tipo_value
             if tipo not in tipos_entidades:
                 tipos_entidades[tipo] = []
             tipos_entidades[tipo].append(entidad)
@@ -0,0 +1,82 @@
+"""
+Selección de Dispositivo para spaCy - Infraestructura
+Activa la GPU antes de cargar modelos cuando está disponible
+"""
+import os
+from typing import Optional
+import spacy
+import structlog
+
+
+# Dispositivo activo una vez configurado ("cpu" o "gpu")
+_dispositivo_activo: Optional[str] = None
+
+
+def _hay_gpu_cuda() -> bool:
+    """
+    Detectar si hay alguna GPU CUDA disponible
+    
+    Returns:
+        True si CuPy detecta al menos un dispositivo
+    """
+    try:
+        import cupy
+        return cupy.cuda.runtime.getDeviceCount() > 0
+    except Exception:
+        return False
+
+
+def configurar_dispositivo_spacy(dispositivo: str = "auto") -> str:
+    """
+    Configurar el dispositivo de spaCy; debe llamarse antes de spacy.load
+    
+    Args:
+        dispositivo: "cpu", "gpu" o "auto" (GPU si hay CUDA)
+        
+    Returns:
+        Dispositivo activo ("cpu" o "gpu")
+    """
+    global _dispositivo_activo
+    
+    # spaCy fija el dispositivo a nivel de proceso; solo se configura una vez
+    if _dispositivo_activo is not None:
+        return _dispositivo_activo
+    
+    logger = structlog.get_logger()
+    dispositivo = dispositivo.lower()
+    
+    if dispositivo == "gpu":
+        spacy.require_gpu()
+        _dispositivo_activo = "gpu"
+    elif dispositivo == "auto" and _hay_gpu_cuda():
+        _dispositivo_activo = "gpu" if spacy.prefer_gpu() else "cpu"
+    else:
+        _dispositivo_activo = "cpu"
+    
+    logger.info(f"Dispositivo spaCy configurado: {_dispositivo_activo}")
+    
+    return _dispositivo_activo
+
+
+def calcular_procesos_pipe(procesos: int, num_textos: int, tamano_lote: int) -> int:
+    """
+    Número de procesos para nlp.pipe según el dispositivo y el tamaño del lote
+    
+    Args:
+        procesos: Procesos configurados (0 o negativo = todos los núcleos)
+        num_textos: Número de textos del lote
+        tamano_lote: Textos por lote de nlp.pipe
+        
+    Returns:
+        Procesos a usar (1 = sin multiproceso)
+    """
+    # La GPU no admite varios procesos y arrancarlos no compensa con un solo lote
+    if _dispositivo_activo == "gpu" or num_textos <= tamano_lote:
+        return 1
+    
+    if procesos <= 0:
+        procesos = os.cpu_count() or 1
+    
+    # No tiene sentido lanzar más procesos que lotes
+    num_lotes = -(-num_textos // tamano_lote)
+    return max(1, min(procesos, num_lotes))
@@ -2,6 +2,8 @@
 Algoritmo de Extracción de Entidades con spaCy - Infraestructura
 Implementación concreta usando spaCy para extracción de entidades
 """
+import os
+from bisect import bisect_left
 import spacy
 from typing import Dict, Any, List, Optional, Tuple
 import structlog
@@ -9,6 +11,57 @@ from datetime import datetime
 
 from dominio.algoritmos.algoritmo_entidades import AlgoritmoEntidades
 from dominio.entidades.entidad_nombrada import EntidadNombrada, TipoEntidad
+from .dispositivo_spacy import calcular_procesos_pipe, configurar_dispositivo_spacy
+
+
+# Componentes estándar de los pipelines de spaCy que se pueden desactivar
+_COMPONENTES_ESTANDAR = frozenset({
+    "tok2vec", "transformer", "tagger", "morphologizer", "parser",
+    "senter", "attribute_ruler", "lemmatizer", "ner"
+})
+
+# Signos que se eliminan al comprobar que una entidad no es solo puntuación
+_PUNTUACION_IGNORADA = str.maketrans('', '', '.,!?')
+
+# Palabras del contexto que refuerzan o debilitan una entidad
+_CONTEXTO_POSITIVO = frozenset({'el', 'la', 'de', 'en', 'con', 'por', 'para'})
+_CONTEXTO_NEGATIVO = frozenset({'no', 'sin', 'contra', 'anti'})
+
+# Indicadores (en mayúsculas) de organizaciones y lugares
+_INDICADORES_ORG = ('INC', 'CORP', 'LTD', 'S.A.', 'S.L.')
+_INDICADORES_GPE = ('CIUDAD', 'PAÍS', 'ESTADO', 'REGIÓN')
+
+# Meses y monedas (en minúsculas) para los patrones de fechas y cantidades
+_MESES = [
+    "enero", "febrero", "marzo", "abril", "mayo", "junio", "julio", "agosto",
+    "septiembre", "setiembre", "octubre", "noviembre", "diciembre",
+    "january", "february", "march", "april", "may", "june", "july", "august",
+    "september", "october", "november", "december"
+]
+_SIMBOLOS_MONEDA = ["$", "€", "£", "US$"]
+_NOMBRES_MONEDA = ["usd", "eur", "gbp", "dólares", "dolares", "dollars", "euros", "libras"]
+
+# Dinero, porcentajes y fechas siguen formatos fijos: se marcan con reglas
+# (entity_ruler) antes del NER estadístico, que respeta esas entidades
+_PATRONES_NUMERICOS: List[Dict[str, Any]] = [
+    # $50,000 / $999 USD / 20 euros
+    {"label": "MONEY", "pattern": [
+        {"ORTH": {"IN": _SIMBOLOS_MONEDA}}, {"LIKE_NUM": True},
+        {"LOWER": {"IN": _NOMBRES_MONEDA}, "OP": "?"}
+    ]},
+    {"label": "MONEY", "pattern": [{"LIKE_NUM": True}, {"LOWER": {"IN": _NOMBRES_MONEDA + ["€"]}}]},
+    # 80% / 15,5% (un solo token en español) / 30 por ciento
+    {"label": "PERCENT", "pattern": [{"LIKE_NUM": True}, {"ORTH": "%"}]},
+    {"label": "PERCENT", "pattern": [{"TEXT": {"REGEX": r"^\d+(?:[.,]\d+)?%$"}}]},
+    {"label": "PERCENT", "pattern": [{"LIKE_NUM": True}, {"LOWER": "por"}, {"LOWER": "ciento"}]},
+    # January 15, 2024 / 15 de septiembre de 2024
+    {"label": "DATE", "pattern": [
+        {"LOWER": {"IN": _MESES}}, {"IS_DIGIT": True}, {"ORTH": ",", "OP": "?"}, {"SHAPE": "dddd"}
+    ]},
+    {"label": "DATE", "pattern": [
+        {"IS_DIGIT": True}, {"LOWER": "de"}, {"LOWER": {"IN": _MESES}}, {"LOWER": "de"}, {"SHAPE": "dddd"}
+    ]},
+]
 
 
 class AlgoritmoSpacyEntidades(AlgoritmoEntidades):
@@ -17,6 +70,10 @@ class AlgoritmoSpacyEntidades(AlgoritmoEntidades):
     Utiliza modelos pre-entrenados de spaCy para NER
     """
     
+    soporta_lote = True
+    soporta_sync = True
+    soporta_doc = True
+    
     def __init__(self, configuracion: Optional[Dict[str, Any]] = None):
         """
         Inicializar algoritmo de spaCy
@@ -36,12 +93,20 @@ class AlgoritmoSpacyEntidades(AlgoritmoEntidades):
             "incluir_contexto": True,
             "ventana_contexto": 50,
             "incluir_dependencias": False,
-            "filtro_duplicados": True
+            "incluir_lema": False,
+            "filtro_duplicados": True,
+            "patrones_numericos": False,
+            "tamano_lote_pipe": int(os.getenv("SPACY_BATCH_SIZE", "64")),
+            "procesos_pipe": int(os.getenv("SPACY_N_PROCESS", "1")),
+            "dispositivo": os.getenv("DEVICE", "auto")
         }
         
         # Combinar configuración
         self.configuracion_final = {**self.configuracion_default, **self.configuracion}
         
+        # La GPU debe activarse antes de cargar cualquier modelo
+        self.dispositivo = configurar_dispositivo_spacy(self.configuracion_final["dispositivo"])
+        
         # Modelos cargados
         self.modelos: Dict[str, spacy.Language] = {}
         
@@ -49,6 +114,28 @@ class AlgoritmoSpacyEntidades(AlgoritmoEntidades):
         if self.configuracion_final["cargar_modelos"]:
             self._cargar_modelos()
     
+    @property
+    def componentes_requeridos(self) -> List[str]:
+        """
+        Componentes del pipeline necesarios según la configuración
+        
+        Returns:
+            Lista de nombres de componentes
+        """
+        componentes = ["tok2vec", "transformer", "ner"]
+        
+        # Las dependencias salen del parser; si solo hacen falta oraciones basta
+        # con senter, mucho más barato que el parser
+        if self.configuracion_final["incluir_dependencias"]:
+            componentes.append("parser")
+        elif self.configuracion_final["incluir_contexto"]:
+            componentes.append("senter")
+        
+        if self.configuracion_final["incluir_lema"]:
+            componentes.extend(["tagger", "morphologizer", "attribute_ruler", "lemmatizer"])
+        
+        return componentes
+    
     def validar_configuracion(self) -> bool:
         """
         Validar configuración del algoritmo
@@ -77,28 +164,81 @@ class AlgoritmoSpacyEntidades(AlgoritmoEntidades):
         """Cargar modelos de spaCy"""
         try:
             # Cargar modelo español
-            self.modelos["es"] = spacy.load(self.configuracion_final["modelo_es"])
+            self.modelos["es"] = self._cargar_modelo_spacy(self.configuracion_final["modelo_es"])
             self.logger.info(f"Modelo español cargado: {self.configuracion_final['modelo_es']}")
             
             # Cargar modelo inglés
-            self.modelos["en"] = spacy.load(self.configuracion_final["modelo_en"])
+            self.modelos["en"] = self._cargar_modelo_spacy(self.configuracion_final["modelo_en"])
             self.logger.info(f"Modelo inglés cargado: {self.configuracion_final['modelo_en']}")
             
             # Cargar modelo francés
-            self.modelos["fr"] = spacy.load(self.configuracion_final["modelo_fr"])
+            self.modelos["fr"] = self._cargar_modelo_spacy(self.configuracion_final["modelo_fr"])
             self.logger.info(f"Modelo francés cargado: {self.configuracion_final['modelo_fr']}")
             
             # Cargar modelo alemán
-            self.modelos["de"] = spacy.load(self.configuracion_final["modelo_de"])
+            self.modelos["de"] = self._cargar_modelo_spacy(self.configuracion_final["modelo_de"])
             self.logger.info(f"Modelo alemán cargado: {self.configuracion_final['modelo_de']}")
             
         except Exception as e:
             self.logger.error(f"Error cargando modelos spaCy: {str(e)}")
             raise
     
-    def _obtener_modelo(self, idioma: str) -> spacy.Language:
+    def _componentes_excluidos(self) -> List[str]:
+        """
+        Componentes que no se cargan: los configurados o, por defecto,
+        los estándar que el algoritmo no requiere
+        
+        Returns:
+            Lista de nombres de componentes
+        """
+        if self.componentes_excluir is not None:
+            return list(self.componentes_excluir)
+        
+        return sorted(_COMPONENTES_ESTANDAR.difference(self.componentes_requeridos))
+    
+    def _cargar_modelo_spacy(self, nombre_modelo: str) -> spacy.Language:
+        """
+        Cargar un modelo de spaCy sin los componentes que no se usan
+        A diferencia de disable, exclude evita también leer sus pesos
+        
+        Args:
+            nombre_modelo: Nombre del modelo de spaCy
+        
+        Returns:
+            Modelo de spaCy
+        """
+        modelo = spacy.load(nombre_modelo, exclude=self._componentes_excluidos())
+        
+        # Los modelos que incluyen senter lo traen desactivado por defecto
+        if "senter" in modelo.disabled:
+            modelo.enable_pipe("senter")
+        
+        # Sin parser ni senter (p. ej. modelos transformer) las oraciones salen de la puntuación
+        if (
+            self.configuracion_final["incluir_contexto"]
+            and not modelo.has_pipe("parser")
+            and not modelo.has_pipe("senter")
+        ):
+            modelo.add_pipe("sentencizer")
+        
+        # Reglas para dinero, porcentajes y fechas delante del NER (también
+        # aportan estos tipos a modelos cuyo NER no los etiqueta, como los de español)
+        if self.configuracion_final["patrones_numericos"]:
+            reglas = modelo.add_pipe(
+                "entity_ruler",
+                name="patrones_numericos",
+                before="ner" if modelo.has_pipe("ner") else None
+            )
+            reglas.add_patterns(_PATRONES_NUMERICOS)
+        
+        return modelo
+    
+    def obtener_modelo(self, idioma: str) -> spacy.Language:
         """
-        Obtener modelo de spaCy para un idioma
+        Obtener el modelo de spaCy que usa el algoritmo para un idioma
+        Está cargado con su configuración (componentes excluidos, senter,
+        patrones_numericos): un Doc procesado con él da en extraer_doc las
+        mismas entidades que extraer
         
         Args:
             idioma: Código del idioma
@@ -120,13 +260,13 @@ class AlgoritmoSpacyEntidades(AlgoritmoEntidades):
             # Cargar modelo bajo demanda
             try:
                 if codigo_modelo == "es":
-                    self.modelos["es"] = spacy.load(self.configuracion_final["modelo_es"])
+                    self.modelos["es"] = self._cargar_modelo_spacy(self.configuracion_final["modelo_es"])
                 elif codigo_modelo == "en":
-                    self.modelos["en"] = spacy.load(self.configuracion_final["modelo_en"])
+                    self.modelos["en"] = self._cargar_modelo_spacy(self.configuracion_final["modelo_en"])
                 elif codigo_modelo == "fr":
-                    self.modelos["fr"] = spacy.load(self.configuracion_final["modelo_fr"])
+                    self.modelos["fr"] = self._cargar_modelo_spacy(self.configuracion_final["modelo_fr"])
                 elif codigo_modelo == "de":
-                    self.modelos["de"] = spacy.load(self.configuracion_final["modelo_de"])
+                    self.modelos["de"] = self._cargar_modelo_spacy(self.configuracion_final["modelo_de"])
             except Exception as e:
                 self.logger.error(f"Error cargando modelo {codigo_modelo}: {str(e)}")
                 # Usar modelo por defecto
@@ -142,79 +282,162 @@ class AlgoritmoSpacyEntidades(AlgoritmoEntidades):
             texto: Texto a analizar
             idioma: Idioma del texto
             
+        Returns:
+            Lista de entidades extraídas
+        """
+        return self.extraer_sync(texto, idioma)
+    
+    def extraer_sync(self, texto: str, idioma: str = "es") -> List[EntidadNombrada]:
+        """
+        Extraer entidades de un texto usando spaCy de forma síncrona
+        
+        Args:
+            texto: Texto a analizar
+            idioma: Idioma del texto
+        
         Returns:
             Lista de entidades extraídas
         """
         try:
             # Obtener modelo
-            modelo = self._obtener_modelo(idioma)
+            modelo = self.obtener_modelo(idioma)
             
             # Procesar texto
             doc = modelo(texto)
             
-            # Extraer entidades
-            entidades = []
+            return self._construir_entidades(doc, idioma)
+        
+        except Exception as e:
+            self.logger.error(f"Error en extracción spaCy: {str(e)}")
+            raise
+    
+    def extraer_doc(self, doc: spacy.tokens.Doc, idioma: str = "es") -> List[EntidadNombrada]:
+        """
+        Extraer entidades de un documento ya procesado por spaCy
+        El documento debe incluir las anotaciones de componentes_requeridos
+        
+        Args:
+            doc: Documento procesado por spaCy
+            idioma: Idioma del texto
+        
+        Returns:
+            Lista de entidades extraídas
+        """
+        return self._construir_entidades(doc, idioma)
+    
+    def extraer_batch(self, textos: List[str], idioma: str = "es") -> List[List[EntidadNombrada]]:
+        """
+        Extraer entidades de múltiples textos con nlp.pipe
+        
+        Args:
+            textos: Lista de textos a analizar
+            idioma: Idioma de los textos
+        
+        Returns:
+            Lista de listas de entidades por texto
+        """
+        try:
+            modelo = self.obtener_modelo(idioma)
+            tamano_lote = self.configuracion_final["tamano_lote_pipe"]
+            docs = modelo.pipe(
+                textos,
+                batch_size=tamano_lote,
+                n_process=calcular_procesos_pipe(
+                    self.configuracion_final["procesos_pipe"], len(textos), tamano_lote
+                )
+            )
+            
+            return [self._construir_entidades(doc, idioma) for doc in docs]
+        
+        except Exception as e:
+            self.logger.error(f"Error en extracción spaCy por lotes: {str(e)}")
+            raise
+    
+    def _construir_entidades(self, doc: spacy.tokens.Doc, idioma: str) -> List[EntidadNombrada]:
+        """
+        Construir entidades a partir de un documento procesado
+        
+        Args:
+            doc: Documento procesado por spaCy
+            idioma: Idioma del texto
+        
+        Returns:
+            Lista de entidades extraídas
+        """
+        # Extraer entidades
+        entidades = []
+        
+        # Las oraciones y el texto (doc.text se reconstruye en cada acceso)
+        # se obtienen una sola vez para todas las entidades del documento
+        incluir_contexto = self.configuracion_final["incluir_contexto"]
+        indice_oraciones = None
+        texto_doc = None
+        if incluir_contexto and doc.ents:
+            indice_oraciones = self._indexar_oraciones_spacy(doc)
+            texto_doc = doc.text
+        
+        # Todas las entidades de un documento comparten fecha y versión de modelo
+        fecha_extraccion = datetime.utcnow()
+        version_modelo = self.configuracion_final.get(f"modelo_{idioma}")
+        
+        for ent in doc.ents:
+            # Mapear tipo de entidad
+            tipo_entidad = self._mapear_tipo_entidad(ent.label_)
+            
+            # Calcular confianza
+            confianza = self._calcular_confianza_entidad_spacy(ent, doc)
+            
+            # Calcular calidad
+            calidad = self._calcular_calidad_entidad_spacy(ent, doc)
+            
+            # Obtener contexto si está habilitado
+            contexto_anterior = None
+            contexto_posterior = None
+            oracion_completa = None
             
-            for ent in doc.ents:
-                # Mapear tipo de entidad
-                tipo_entidad = self._mapear_tipo_entidad(ent.label_)
-                
-                # Calcular confianza
-                confianza = self._calcular_confianza_entidad_spacy(ent, doc)
-                
-                # Calcular calidad
-                calidad = self._calcular_calidad_entidad_spacy(ent, doc)
-                
-                # Obtener contexto si está habilitado
-                contexto_anterior = None
-                contexto_posterior = None
-                oracion_completa = None
-                
-                if self.configuracion_final["incluir_contexto"]:
-                    contexto_anterior, contexto_posterior = self._obtener_contexto_entidad_spacy(
-                        doc, ent.start_char, ent.end_char
-                    )
-                    oracion_completa = self._obtener_oracion_completa_spacy(doc, ent.start_char)
-                
-                # Obtener lema y POS tag
-                lema = ent.lemma_ if hasattr(ent, 'lemma_') else None
-                etiqueta_pos = None
-                
-                # Obtener dependencias si está habilitado
-                dependencias = []
-                if self.configuracion_final["incluir_dependencias"]:
-                    dependencias = self._obtener_dependencias_entidad_spacy(ent, doc)
-                
-                # Crear entidad
-                entidad = EntidadNombrada(
-                    texto=ent.text,
-                    tipo=tipo_entidad,
-                    inicio=ent.start_char,
-                    fin=ent.end_char,
-                    confianza=confianza,
-                    calidad_extraccion=calidad,
-                    contexto_anterior=contexto_anterior,
-                    contexto_posterior=contexto_posterior,
-                    oracion_completa=oracion_completa,
-                    lema=lema,
-                    etiqueta_pos=etiqueta_pos,
-                    dependencias=dependencias,
-                    modelo_usado="spacy",
-                    fecha_extraccion=datetime.utcnow(),
-                    version_modelo=self.configuracion_final.get(f"modelo_{idioma}")
+            if incluir_contexto:
+                contexto_anterior, contexto_posterior = self._obtener_contexto_entidad_spacy(
+                    doc, ent.start_char, ent.end_char, texto_doc
+                )
+                oracion_completa = self._obtener_oracion_completa_spacy(
+                    doc, ent.start_char, indice_oraciones
                 )
-                
-                entidades.append(entidad)
             
-            # Filtrar duplicados si está habilitado
-            if self.configuracion_final["filtro_duplicados"]:
-                entidades = self._filtrar_entidades_duplicadas(entidades)
+            # Obtener lema y POS tag
+            lema = ent.lemma_ if self.configuracion_final["incluir_lema"] else None
+            etiqueta_pos = None
             
-            return entidades
+            # Obtener dependencias si está habilitado
+            dependencias = []
+            if self.configuracion_final["incluir_dependencias"]:
+                dependencias = self._obtener_dependencias_entidad_spacy(ent, doc)
             
-        except Exception as e:
-            self.logger.error(f"Error en extracción spaCy: {str(e)}")
-            raise
+            # Crear entidad
+            entidad = EntidadNombrada(
+                texto=ent.text,
+                tipo=tipo_entidad,
+                inicio=ent.start_char,
+                fin=ent.end_char,
+                confianza=confianza,
+                calidad_extraccion=calidad,
+                contexto_anterior=contexto_anterior,
+                contexto_posterior=contexto_posterior,
+                oracion_completa=oracion_completa,
+                lema=lema,
+                etiqueta_pos=etiqueta_pos,
+                dependencias=dependencias,
+                modelo_usado="spacy",
+                fecha_extraccion=fecha_extraccion,
+                version_modelo=version_modelo
+            )
+            
+            entidades.append(entidad)
+        
+        # Filtrar duplicados si está habilitado
+        if self.configuracion_final["filtro_duplicados"]:
+            entidades = self._filtrar_entidades_duplicadas(entidades)
+        
+        return entidades
     
     def _calcular_confianza_entidad_spacy(
         self, 
@@ -309,16 +532,14 @@ class AlgoritmoSpacyEntidades(AlgoritmoEntidades):
         fin = min(len(doc), entidad.end + 3)
         contexto_tokens = doc[inicio:fin]
         
-        # Verificar palabras clave en el contexto
-        palabras_clave_positivas = ['el', 'la', 'de', 'en', 'con', 'por', 'para']
-        palabras_clave_negativas = ['no', 'sin', 'contra', 'anti']
-        
         puntuacion = 0.5  # Base
         
+        # Verificar palabras clave en el contexto
         for token in contexto_tokens:
-            if token.text.lower() in palabras_clave_positivas:
+            token_text = token.text.lower()
+            if token_text in _CONTEXTO_POSITIVO:
                 puntuacion += 0.1
-            elif token.text.lower() in palabras_clave_negativas:
+            elif token_text in _CONTEXTO_NEGATIVO:
                 puntuacion -= 0.1
         
         return max(0.0, min(1.0, puntuacion))
@@ -353,7 +574,8 @@ class AlgoritmoSpacyEntidades(AlgoritmoEntidades):
         
         elif tipo == 'ORG':
             # Verificar si parece una organización
-            if any(palabra in texto.upper() for palabra in ['INC', 'CORP', 'LTD', 'S.A.', 'S.L.']):
+            texto_mayusculas = texto.upper()
+            if any(palabra in texto_mayusculas for palabra in _INDICADORES_ORG):
                 puntuacion += 0.3
             if texto.istitle():
                 puntuacion += 0.2
@@ -362,7 +584,8 @@ class AlgoritmoSpacyEntidades(AlgoritmoEntidades):
             # Verificar si parece un lugar
             if texto.istitle():
                 puntuacion += 0.2
-            if any(palabra in texto.upper() for palabra in ['CIUDAD', 'PAÍS', 'ESTADO', 'REGIÓN']):
+            texto_mayusculas = texto.upper()
+            if any(palabra in texto_mayusculas for palabra in _INDICADORES_GPE):
                 puntuacion += 0.3
         
         return max(0.0, min(1.0, puntuacion))
@@ -385,16 +608,19 @@ class AlgoritmoSpacyEntidades(AlgoritmoEntidades):
         # Verificar si la entidad tiene sentido en el contexto
         puntuacion = 0.5  # Base
         
-        # Verificar si no contiene solo puntuación
-        if entidad.text.replace('.', '').replace(',', '').replace('!', '').replace('?', '').strip():
+        # Span.text construye la cadena en cada acceso
+        texto = entidad.text
+        
+        # Verificar si no contiene solo puntuación (una sola copia con translate)
+        if texto.translate(_PUNTUACION_IGNORADA).strip():
             puntuacion += 0.2
         
         # Verificar si tiene al menos una letra
-        if any(c.isalpha() for c in entidad.text):
+        if any(c.isalpha() for c in texto):
             puntuacion += 0.2
         
         # Verificar longitud apropiada
-        if 2 <= len(entidad.text) <= 50:
+        if 2 <= len(texto) <= 50:
             puntuacion += 0.1
         
         return max(0.0, min(1.0, puntuacion))
@@ -434,7 +660,8 @@ class AlgoritmoSpacyEntidades(AlgoritmoEntidades):
         self, 
         doc: spacy.tokens.Doc, 
         inicio: int, 
-        fin: int
+        fin: int,
+        texto: Optional[str] = None
     ) -> Tuple[str, str]:
         """
         Obtener contexto de una entidad usando spaCy
@@ -443,27 +670,39 @@ class AlgoritmoSpacyEntidades(AlgoritmoEntidades):
             doc: Documento procesado
             inicio: Posición de inicio de la entidad
             fin: Posición de fin de la entidad
-            ventana: Tamaño de la ventana de contexto
-            
+            texto: Texto del documento ya materializado (opcional)
+        
         Returns:
             Tupla con (contexto_anterior, contexto_posterior)
         """
-        ventana = self.configuracion_final["ventana_contexto"]
+        if texto is None:
+            texto = doc.text
         
-        # Contexto anterior
-        inicio_contexto = max(0, inicio - ventana)
-        contexto_anterior = doc.text[inicio_contexto:inicio].strip()
+        return self._obtener_contexto_entidad(
+            texto, inicio, fin, self.configuracion_final["ventana_contexto"]
+        )
+    
+    def _indexar_oraciones_spacy(
+        self, 
+        doc: spacy.tokens.Doc
+    ) -> Tuple[List[spacy.tokens.Span], List[int]]:
+        """
+        Indexar las oraciones de un documento para búsquedas por posición
         
-        # Contexto posterior
-        fin_contexto = min(len(doc.text), fin + ventana)
-        contexto_posterior = doc.text[fin:fin_contexto].strip()
+        Args:
+            doc: Documento procesado
         
-        return contexto_anterior, contexto_posterior
+        Returns:
+            Tupla (oraciones, posición de fin de cada oración)
+        """
+        oraciones = list(doc.sents)
+        return oraciones, [sent.end_char for sent in oraciones]
     
     def _obtener_oracion_completa_spacy(
         self, 
         doc: spacy.tokens.Doc, 
-        posicion: int
+        posicion: int,
+        indice_oraciones: Optional[Tuple[List[spacy.tokens.Span], List[int]]] = None
     ) -> Optional[str]:
         """
         Obtener oración completa usando spaCy
@@ -471,14 +710,20 @@ class AlgoritmoSpacyEntidades(AlgoritmoEntidades):
         Args:
             doc: Documento procesado
             posicion: Posición en el texto
-            
+            indice_oraciones: Resultado de _indexar_oraciones_spacy (opcional)
+        
         Returns:
             Oración completa o None
         """
-        # Encontrar la oración que contiene la posición
-        for sent in doc.sents:
-            if sent.start_char <= posicion <= sent.end_char:
-                return sent.text.strip()
+        if indice_oraciones is None:
+            indice_oraciones = self._indexar_oraciones_spacy(doc)
+        
+        oraciones, fines = indice_oraciones
+        
+        # Primera oración que termina en o después de la posición
+        indice = bisect_left(fines, posicion)
+        if indice < len(oraciones) and oraciones[indice].start_char <= posicion:
+            return oraciones[indice].text.strip()
         
         return None
     
@@ -521,7 +766,7 @@ class AlgoritmoSpacyEntidades(AlgoritmoEntidades):
             Diccionario con estadísticas del modelo
         """
         try:
-            modelo = self._obtener_modelo(idioma)
+            modelo = self.obtener_modelo(idioma)
             
             return {
                 "idioma": idioma,
@@ -2,6 +2,8 @@
 Algoritmo de Sentimientos con spaCy - Infraestructura
 Implementación concreta usando spaCy para análisis de sentimientos
 """
+import os
+from collections import Counter
 import spacy
 from typing import Dict, Any, List, Optional
 import structlog
@@ -9,6 +11,14 @@ from datetime import datetime
 
 from dominio.algoritmos.algoritmo_sentimientos import AlgoritmoSentimientos
 from dominio.entidades.analisis_sentimiento import AnalisisSentimiento, CategoriaSentimiento, ModeloSentimiento
+from .dispositivo_spacy import calcular_procesos_pipe, configurar_dispositivo_spacy
+
+
+# Componentes estándar de los pipelines de spaCy que se pueden desactivar
+_COMPONENTES_ESTANDAR = frozenset({
+    "tok2vec", "transformer", "tagger", "morphologizer", "parser",
+    "senter", "attribute_ruler", "lemmatizer", "ner"
+})
 
 
 class AlgoritmoSpacySentimientos(AlgoritmoSentimientos):
@@ -17,6 +27,13 @@ class AlgoritmoSpacySentimientos(AlgoritmoSentimientos):
     Utiliza modelos pre-entrenados de spaCy
     """
     
+    soporta_lote = True
+    soporta_sync = True
+    soporta_doc = True
+    
+    # Las palabras clave usan token.pos_; parser, NER y lematizador no se usan
+    componentes_requeridos = ["tok2vec", "transformer", "tagger", "morphologizer", "attribute_ruler"]
+    
     def __init__(self, configuracion: Optional[Dict[str, Any]] = None):
         """
         Inicializar algoritmo de spaCy
@@ -33,12 +50,18 @@ class AlgoritmoSpacySentimientos(AlgoritmoSentimientos):
             "modelo_fr": "fr_core_news_sm",
             "modelo_de": "de_core_news_sm",
             "cargar_modelos": True,
-            "usar_pipe_sentimientos": True
+            "usar_pipe_sentimientos": True,
+            "tamano_lote_pipe": int(os.getenv("SPACY_BATCH_SIZE", "64")),
+            "procesos_pipe": int(os.getenv("SPACY_N_PROCESS", "1")),
+            "dispositivo": os.getenv("DEVICE", "auto")
         }
         
         # Combinar configuración
         self.configuracion_final = {**self.configuracion_default, **self.configuracion}
         
+        # La GPU debe activarse antes de cargar cualquier modelo
+        self.dispositivo = configurar_dispositivo_spacy(self.configuracion_final["dispositivo"])
+        
         # Modelos cargados
         self.modelos: Dict[str, spacy.Language] = {}
         
@@ -74,28 +97,56 @@ class AlgoritmoSpacySentimientos(AlgoritmoSentimientos):
         """Cargar modelos de spaCy"""
         try:
             # Cargar modelo español
-            self.modelos["es"] = spacy.load(self.configuracion_final["modelo_es"])
+            self.modelos["es"] = self._cargar_modelo_spacy(self.configuracion_final["modelo_es"])
             self.logger.info(f"Modelo español cargado: {self.configuracion_final['modelo_es']}")
             
             # Cargar modelo inglés
-            self.modelos["en"] = spacy.load(self.configuracion_final["modelo_en"])
+            self.modelos["en"] = self._cargar_modelo_spacy(self.configuracion_final["modelo_en"])
             self.logger.info(f"Modelo inglés cargado: {self.configuracion_final['modelo_en']}")
             
             # Cargar modelo francés
-            self.modelos["fr"] = spacy.load(self.configuracion_final["modelo_fr"])
+            self.modelos["fr"] = self._cargar_modelo_spacy(self.configuracion_final["modelo_fr"])
             self.logger.info(f"Modelo francés cargado: {self.configuracion_final['modelo_fr']}")
             
             # Cargar modelo alemán
-            self.modelos["de"] = spacy.load(self.configuracion_final["modelo_de"])
+            self.modelos["de"] = self._cargar_modelo_spacy(self.configuracion_final["modelo_de"])
             self.logger.info(f"Modelo alemán cargado: {self.configuracion_final['modelo_de']}")
             
         except Exception as e:
             self.logger.error(f"Error cargando modelos spaCy: {str(e)}")
             raise
     
-    def _obtener_modelo(self, idioma: str) -> spacy.Language:
+    def _componentes_excluidos(self) -> List[str]:
+        """
+        Componentes que no se cargan: los configurados o, por defecto,
+        los estándar que el algoritmo no requiere
+        
+        Returns:
+            Lista de nombres de componentes
+        """
+        if self.componentes_excluir is not None:
+            return list(self.componentes_excluir)
+        
+        return sorted(_COMPONENTES_ESTANDAR.difference(self.componentes_requeridos))
+    
+    def _cargar_modelo_spacy(self, nombre_modelo: str) -> spacy.Language:
+        """
+        Cargar un modelo de spaCy sin los componentes que no se usan
+        A diferencia de disable, exclude evita también leer sus pesos
+        
+        Args:
+            nombre_modelo: Nombre del modelo de spaCy
+            
+        Returns:
+            Modelo de spaCy
+        """
+        return spacy.load(nombre_modelo, exclude=self._componentes_excluidos())
+    
+    def obtener_modelo(self, idioma: str) -> spacy.Language:
         """
-        Obtener modelo de spaCy para un idioma
+        Obtener el modelo de spaCy que usa el algoritmo para un idioma
+        Está cargado con su configuración de componentes excluidos: un Doc
+        procesado con él tiene las anotaciones que espera analizar_doc
         
         Args:
             idioma: Código del idioma
@@ -117,13 +168,13 @@ class AlgoritmoSpacySentimientos(AlgoritmoSentimientos):
             # Cargar modelo bajo demanda
             try:
                 if codigo_modelo == "es":
-                    self.modelos["es"] = spacy.load(self.configuracion_final["modelo_es"])
+                    self.modelos["es"] = self._cargar_modelo_spacy(self.configuracion_final["modelo_es"])
                 elif codigo_modelo == "en":
-                    self.modelos["en"] = spacy.load(self.configuracion_final["modelo_en"])
+                    self.modelos["en"] = self._cargar_modelo_spacy(self.configuracion_final["modelo_en"])
                 elif codigo_modelo == "fr":
-                    self.modelos["fr"] = spacy.load(self.configuracion_final["modelo_fr"])
+                    self.modelos["fr"] = self._cargar_modelo_spacy(self.configuracion_final["modelo_fr"])
                 elif codigo_modelo == "de":
-                    self.modelos["de"] = spacy.load(self.configuracion_final["modelo_de"])
+                    self.modelos["de"] = self._cargar_modelo_spacy(self.configuracion_final["modelo_de"])
             except Exception as e:
                 self.logger.error(f"Error cargando modelo {codigo_modelo}: {str(e)}")
                 # Usar modelo por defecto
@@ -135,6 +186,19 @@ class AlgoritmoSpacySentimientos(AlgoritmoSentimientos):
         """
         Analizar sentimientos de un texto usando spaCy
         
+        Args:
+            texto: Texto a analizar
+            idioma: Idioma del texto
+            
+        Returns:
+            Resultado del análisis de sentimientos
+        """
+        return self.analizar_sync(texto, idioma)
+    
+    def analizar_sync(self, texto: str, idioma: str = "es") -> AnalisisSentimiento:
+        """
+        Analizar sentimientos de un texto usando spaCy de forma síncrona
+        
         Args:
             texto: Texto a analizar
             idioma: Idioma del texto
@@ -144,50 +208,112 @@ class AlgoritmoSpacySentimientos(AlgoritmoSentimientos):
         """
         try:
             # Obtener modelo
-            modelo = self._obtener_modelo(idioma)
+            modelo = self.obtener_modelo(idioma)
             
             # Procesar texto
             doc = modelo(texto)
             
-            # Calcular polaridad y subjetividad
-            polaridad, subjetividad = self._calcular_sentimientos_spacy(doc)
-            
-            # Categorizar sentimiento
-            categoria = self._categorizar_sentimiento(polaridad, subjetividad)
+            return self._construir_analisis(doc, texto, idioma)
             
-            # Calcular confianza y calidad
-            confianza = self._calcular_confianza(polaridad, subjetividad)
-            calidad = self._calcular_calidad(texto, polaridad)
-            
-            # Extraer palabras clave
-            palabras_clave = self._extraer_palabras_clave_spacy(doc)
+        except Exception as e:
+            self.logger.error(f"Error en análisis spaCy: {str(e)}")
+            raise
+    
+    def analizar_doc(self, doc: spacy.tokens.Doc, idioma: str = "es") -> AnalisisSentimiento:
+        """
+        Analizar sentimientos de un documento ya procesado por spaCy
+        El documento debe incluir las anotaciones de componentes_requeridos
+        
+        Args:
+            doc: Documento procesado por spaCy
+            idioma: Idioma del texto
             
-            # Detectar emociones
-            emociones = self._detectar_emociones(texto)
+        Returns:
+            Resultado del análisis de sentimientos
+        """
+        return self._construir_analisis(doc, doc.text, idioma)
+    
+    def analizar_batch(self, textos: List[str], idioma: str = "es") -> List[AnalisisSentimiento]:
+        """
+        Analizar sentimientos de múltiples textos con nlp.pipe
+        
+        Args:
+            textos: Lista de textos a analizar
+            idioma: Idioma de los textos
             
-            # Crear resultado
-            resultado = AnalisisSentimiento(
-                texto=texto,
-                idioma=idioma,
-                modelo_usado=ModeloSentimiento.SPACY,
-                polaridad=polaridad,
-                subjetividad=subjetividad,
-                categoria=categoria,
-                confianza=confianza,
-                calidad_analisis=calidad,
-                palabras_clave=palabras_clave,
-                emociones_detectadas=emociones,
-                fecha_analisis=datetime.utcnow(),
-                tiempo_procesamiento_ms=0.0,  # Se calculará externamente
-                version_modelo=self.configuracion_final.get(f"modelo_{idioma}")
+        Returns:
+            Lista de resultados de análisis
+        """
+        try:
+            modelo = self.obtener_modelo(idioma)
+            tamano_lote = self.configuracion_final["tamano_lote_pipe"]
+            docs = modelo.pipe(
+                textos,
+                batch_size=tamano_lote,
+                n_process=calcular_procesos_pipe(
+                    self.configuracion_final["procesos_pipe"], len(textos), tamano_lote
+                )
             )
             
-            return resultado
+            return [
+                self._construir_analisis(doc, texto, idioma)
+                for doc, texto in zip(docs, textos)
+            ]
             
         except Exception as e:
-            self.logger.error(f"Error en análisis spaCy: {str(e)}")
+            self.logger.error(f"Error en análisis spaCy por lotes: {str(e)}")
             raise
     
+    def _construir_analisis(
+        self, 
+        doc: spacy.tokens.Doc, 
+        texto: str, 
+        idioma: str
+    ) -> AnalisisSentimiento:
+        """
+        Construir el resultado del análisis a partir de un documento procesado
+        
+        Args:
+            doc: Documento procesado por spaCy
+            texto: Texto original
+            idioma: Idioma del texto
+            
+        Returns:
+            Resultado del análisis de sentimientos
+        """
+        # Calcular polaridad y subjetividad
+        polaridad, subjetividad = self._calcular_sentimientos_spacy(doc)
+        
+        # Categorizar sentimiento
+        categoria = self._categorizar_sentimiento(polaridad, subjetividad)
+        
+        # Palabras de sentimiento y emociones en una sola pasada por el texto
+        palabras_sentimiento, emociones = self._analizar_palabras(texto)
+        
+        # Calcular confianza y calidad
+        confianza = self._calcular_confianza(polaridad, subjetividad)
+        calidad = self._calcular_calidad(texto, polaridad, palabras_sentimiento)
+        
+        # Extraer palabras clave
+        palabras_clave = self._extraer_palabras_clave_spacy(doc)
+        
+        # Crear resultado
+        return AnalisisSentimiento(
+            texto=texto,
+            idioma=idioma,
+            modelo_usado=ModeloSentimiento.SPACY,
+            polaridad=polaridad,
+            subjetividad=subjetividad,
+            categoria=categoria,
+            confianza=confianza,
+            calidad_analisis=calidad,
+            palabras_clave=palabras_clave,
+            emociones_detectadas=emociones,
+            fecha_analisis=datetime.utcnow(),
+            tiempo_procesamiento_ms=0.0,  # Se calculará externamente
+            version_modelo=self.configuracion_final.get(f"modelo_{idioma}")
+        )
+    
     def _calcular_sentimientos_spacy(self, doc: spacy.tokens.Doc) -> tuple[float, float]:
         """
         Calcular sentimientos usando spaCy
@@ -209,29 +335,18 @@ class AlgoritmoSpacySentimientos(AlgoritmoSentimientos):
         palabras_negativas = 0
         palabras_totales = 0
         
-        # Listas de palabras de sentimiento (se pueden expandir)
-        palabras_positivas_lista = [
-            'bueno', 'excelente', 'fantástico', 'genial', 'perfecto', 'maravilloso',
-            'increíble', 'asombroso', 'magnífico', 'estupendo', 'formidable',
-            'good', 'excellent', 'fantastic', 'great', 'perfect', 'wonderful',
-            'amazing', 'awesome', 'magnificent', 'terrific', 'outstanding'
-        ]
-        
-        palabras_negativas_lista = [
-            'malo', 'terrible', 'horrible', 'pésimo', 'fatal', 'desastroso',
-            'abominable', 'atroz', 'espantoso', 'repugnante', 'odioso',
-            'bad', 'terrible', 'awful', 'horrible', 'disgusting', 'hateful',
-            'atrocious', 'abominable', 'repugnant', 'odious'
-        ]
+        # Léxicos compartidos de la clase base (frozensets construidos una vez)
+        lexico_positivo = self.lexico_positivo
+        lexico_negativo = self.lexico_negativo
         
         for token in doc:
             if not token.is_stop and not token.is_punct and token.is_alpha:
                 palabras_totales += 1
                 token_text = token.text.lower()
                 
-                if token_text in palabras_positivas_lista:
+                if token_text in lexico_positivo:
                     palabras_positivas += 1
-                elif token_text in palabras_negativas_lista:
+                elif token_text in lexico_negativo:
                     palabras_negativas += 1
         
         if palabras_totales > 0:
@@ -269,15 +384,9 @@ class AlgoritmoSpacySentimientos(AlgoritmoSentimientos):
                 len(token.text) > 2):
                 palabras_clave.append(token.text.lower())
         
-        # Contar frecuencia
-        frecuencia = {}
-        for palabra in palabras_clave:
-            frecuencia[palabra] = frecuencia.get(palabra, 0) + 1
-        
-        # Ordenar por frecuencia y devolver las más frecuentes
-        palabras_ordenadas = sorted(frecuencia.items(), key=lambda x: x[1], reverse=True)
-        
-        return [palabra for palabra, _ in palabras_ordenadas[:limite]]
+        # Contar frecuencia y quedarse con las más frecuentes (selección parcial
+        # con heapq; los empates conservan el orden de aparición)
+        return [palabra for palabra, _ in Counter(palabras_clave).most_common(limite)]
     
     def _analizar_entidades_sentimiento(self, doc: spacy.tokens.Doc) -> Dict[str, float]:
         """
@@ -340,7 +449,7 @@ class AlgoritmoSpacySentimientos(AlgoritmoSentimientos):
             Diccionario con estadísticas del modelo
         """
         try:
-            modelo = self._obtener_modelo(idioma)
+            modelo = self.obtener_modelo(idioma)
             
             return {
                 "idioma": idioma,